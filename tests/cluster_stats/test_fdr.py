@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the in-process FDR correction in unravel.cluster_stats.fdr (parity with scipy and FSL's ``fdr``).
+"""
+
+import numpy as np
+import pytest
+from scipy.stats import false_discovery_control
+
+from unravel.cluster_stats.fdr import fdr_adjust
+
+
+@pytest.mark.parametrize("method", ["bh", "by"])
+def test_fdr_adjust_matches_scipy(method):
+    """Adjusted p values match scipy.stats.false_discovery_control (including ties)."""
+    rng = np.random.default_rng(0)
+    p_values = np.concatenate([rng.random(500) ** 4, rng.random(500), [0.01] * 20])
+    rng.shuffle(p_values)
+    adjusted, _ = fdr_adjust(p_values, method=method)
+    np.testing.assert_allclose(adjusted, false_discovery_control(p_values, method=method), rtol=1e-12)
+
+
+@pytest.mark.parametrize("method", ["bh", "by"])
+def test_probability_thresholds(method):
+    """Each threshold is the largest p value with an adjusted p value <= q (0 if no p value is significant)."""
+    rng = np.random.default_rng(1)
+    p_values = np.concatenate([rng.random(200) * 1e-3, rng.random(800)])
+    q_values = [0.001, 0.01, 0.05, 0.1]
+    adjusted, thresholds = fdr_adjust(p_values, q_values, method=method)
+    expected_adjusted = false_discovery_control(p_values, method=method)
+    for q, threshold in zip(q_values, thresholds):
+        significant = p_values[expected_adjusted <= q]
+        assert threshold == (significant.max() if significant.size else 0)
+        np.testing.assert_array_equal(p_values <= threshold, (adjusted <= q) if threshold > 0 else np.zeros(p_values.size, dtype=bool))
+
+
+def test_no_significant_p_values():
+    """The threshold is 0 when no p value is significant."""
+    p_values = np.linspace(0.5, 1, 100)
+    _, thresholds = fdr_adjust(p_values, [0.05, 0.01])
+    np.testing.assert_array_equal(thresholds, [0, 0])
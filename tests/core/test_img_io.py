@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+"""
+Tests for .nii.gz reading and writing in unravel.core.img_io with the optional block-gzip codec (unravel.core.parallel_gzip).
+"""
+
+import gzip
+import shutil
+import subprocess
+
+import nibabel as nib
+import numpy as np
+import pytest
+
+from unravel.core.config import Configuration
+from unravel.core.img_io import load_3D_img, save_as_nii
+from unravel.core.parallel_gzip import BLOCK_SIZE, ParallelGzipFile, is_block_gzip, parallel_gzip_open, use_parallel_gzip
+
+
+@pytest.fixture
+def parallel_gzip():
+    """Enable the codec with 4 threads and restore nibabel's gzip opener afterwards."""
+    Configuration.gzip_threads = 4
+    use_parallel_gzip()
+    yield
+    Configuration.gzip_threads = None
+    use_parallel_gzip(enable=False)
+
+
+def test_codec_disabled_by_default(tmp_path):
+    """Without UNRAVEL_GZIP_THREADS or Configuration.gzip_threads, .nii.gz files are written by nibabel's gzip."""
+    ndarray = np.arange(24, dtype=np.uint16).reshape(2, 3, 4)
+    save_as_nii(ndarray, tmp_path / 'img.nii.gz', data_type=np.uint16)
+    assert not is_block_gzip(tmp_path / 'img.nii.gz')
+    np.testing.assert_array_equal(load_3D_img(tmp_path / 'img.nii.gz'), ndarray)
+
+
+def test_save_as_nii_round_trip(tmp_path, parallel_gzip):
+    """Files written with the codec (several gzip members) are standard gzip streams."""
+    ndarray = np.random.default_rng(0).integers(0, 2**16, size=(64, 80, 500), dtype=np.uint16)  # More than one BLOCK_SIZE
+    assert ndarray.nbytes > BLOCK_SIZE
+    output = tmp_path / 'img.nii.gz'
+    save_as_nii(ndarray, output, data_type=np.uint16)
+    assert is_block_gzip(output)
+
+    # Decompress with the standard library and parse the NIfTI from the bytes
+    with gzip.open(output, 'rb') as f:
+        nii = nib.Nifti1Image.from_bytes(f.read())
+    np.testing.assert_array_equal(np.asanyarray(nii.dataobj), ndarray)
+
+    # Read back with the codec
+    np.testing.assert_array_equal(load_3D_img(output), ndarray)
+
+    if shutil.which('gzip'):
+        subprocess.run(['gzip', '-t', str(output)], check=True)
+
+
+def test_read_single_member_gzip(tmp_path, parallel_gzip):
+    """Foreign .nii.gz files (one gzip member, e.g., from FSL) are read through the fallback."""
+    ndarray = np.random.default_rng(1).random((20, 30, 40)).astype(np.float32)
+    nii = nib.Nifti1Image(ndarray, np.eye(4))
+    output = tmp_path / 'foreign.nii.gz'
+    with gzip.open(output, 'wb') as f:
+        f.write(nii.to_bytes())
+    assert not is_block_gzip(output)
+
+    assert not isinstance(parallel_gzip_open(output, 'rb'), ParallelGzipFile)
+    np.testing.assert_array_equal(load_3D_img(output), ndarray)
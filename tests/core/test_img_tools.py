@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+"""
+Tests for the resampling, relabeling, and label statistics engines in unravel.core.img_tools.
+"""
+
+import numpy as np
+import pytest
+from scipy import ndimage
+
+from unravel.core.img_tools import label_stats, relabel, zoom_blockwise
+
+
+@pytest.mark.parametrize("zoom_order", [0, 1, 3])
+@pytest.mark.parametrize("zoom_factors", [(0.5, 0.4, 0.3), (1.7, 1.3, 2.0)])
+def test_zoom_blockwise_matches_ndimage_zoom(zoom_order, zoom_factors):
+    """Small blocks (many blocks with halos) give the same result as scipy.ndimage.zoom()."""
+    ndarray = np.random.default_rng(0).random((23, 31, 17)).astype(np.float32)
+    expected = ndimage.zoom(ndarray, zoom_factors, order=zoom_order)
+    result = zoom_blockwise(ndarray, zoom_factors, zoom_order=zoom_order, block_voxels=500, max_workers=4)
+    assert result.shape == expected.shape
+    assert result.dtype == ndarray.dtype
+    np.testing.assert_allclose(result, expected, atol=1e-6 if zoom_order <= 1 else 1e-4)
+
+
+def test_zoom_blockwise_to_memmap(tmp_path):
+    """Blocks are written to an output path (.npy memmap)."""
+    ndarray = np.random.default_rng(1).random((20, 20, 20)).astype(np.float32)
+    result = zoom_blockwise(ndarray, (0.5, 0.5, 0.5), out=tmp_path / 'out.npy', block_shape=(4, 5, 3))
+    assert isinstance(result, np.memmap)
+    np.testing.assert_allclose(result, ndimage.zoom(ndarray, 0.5, order=1), atol=1e-6)
+
+
+def _loop_relabel(labels, old_IDs, new_IDs, default=None, dtype=None):
+    """Reference relabeling with one comparison per label."""
+    result = np.array(labels, dtype=dtype or labels.dtype) if default is None else np.full(labels.shape, default, dtype=dtype or labels.dtype)
+    for old_ID, new_ID in zip(old_IDs, new_IDs):
+        result[labels == old_ID] = new_ID
+    return result
+
+
+def test_relabel_dense_lut():
+    """uint16 labels are remapped with a dense table over the dtype range."""
+    labels = np.random.default_rng(0).integers(0, 2000, size=(20, 30, 40), dtype=np.uint16)
+    old_IDs, new_IDs = [5, 1000, 1999, 7], [6, 1, 0, 65535]
+    result = relabel(labels, old_IDs, new_IDs, slab_voxels=2000)
+    assert result.dtype == np.uint16
+    np.testing.assert_array_equal(result, _loop_relabel(labels, old_IDs, new_IDs))
+
+
+def test_relabel_sorted_lut():
+    """Sparse uint32 IDs >= 2**24 are remapped with a sorted table."""
+    rng = np.random.default_rng(1)
+    IDs = np.array([0, 3, 2**24 + 5, 614454277, 2**32 - 2], dtype=np.uint32)
+    labels = IDs[rng.integers(0, len(IDs), size=(15, 20, 25))]
+    old_IDs, new_IDs = [614454277, 3, 2**24 + 5], [1, 2, 3]
+    result = relabel(labels, old_IDs, new_IDs, slab_voxels=1000)
+    assert result.dtype == np.uint32
+    np.testing.assert_array_equal(result, _loop_relabel(labels, old_IDs, new_IDs))
+
+
+@pytest.mark.parametrize("labels_dtype", [np.uint16, np.uint32])
+def test_relabel_default_and_dtype(labels_dtype):
+    """Labels not in old_IDs get the default, and the output has the requested dtype."""
+    rng = np.random.default_rng(2)
+    IDs = np.array([0, 8, 300, 2**24 + 1 if labels_dtype == np.uint32 else 9000], dtype=labels_dtype)
+    labels = IDs[rng.integers(0, len(IDs), size=(10, 12, 14))]
+    old_IDs, new_IDs = [8, int(IDs[3])], [1, 2]
+    result = relabel(labels, old_IDs, new_IDs, default=0, dtype=np.uint8)
+    assert result.dtype == np.uint8
+    np.testing.assert_array_equal(result, _loop_relabel(labels, old_IDs, new_IDs, default=0, dtype=np.uint8))
+
+
+def _brute_force_label_stats(labels, intensity):
+    """Reference label statistics from np.unique and np.where."""
+    rows = []
+    for label in np.unique(labels[labels > 0]):
+        coords = np.where(labels == label)
+        rows.append({
+            "label": label, "count": len(coords[0]),
+            "mins": [c.min() for c in coords], "maxs": [c.max() + 1 for c in coords],
+            "centroid": [c.mean() for c in coords], "sum": intensity[labels == label].sum(),
+        })
+    return rows
+
+
+@pytest.mark.parametrize("max_ID", [50, 2**31])  # Dense bincount and compacted IDs
+def test_label_stats_matches_brute_force(max_ID):
+    """Counts, exclusive bounding boxes, centroids, and intensity sums/means match a brute-force reference."""
+    rng = np.random.default_rng(3)
+    IDs = rng.choice(np.arange(1, max_ID, max(1, max_ID // 1000)), size=8, replace=False).astype(np.uint32)
+    labels = np.zeros((24, 26, 30), dtype=np.uint32)
+    for i, label in enumerate(IDs):
+        x, y, z = rng.integers(0, 18, size=3)
+        labels[x:x + 2 + i % 5, y:y + 3 + i % 4, z:z + 4 + i % 7] = label  # Later boxes may overlap earlier ones
+    intensity = rng.random(labels.shape)
+
+    stats = label_stats(labels, intensity=intensity, slab_voxels=24 * 26 * 4, workers=4)
+    expected = _brute_force_label_stats(labels, intensity)
+    assert list(stats["label"]) == [row["label"] for row in expected]
+    for (_, row), reference in zip(stats.iterrows(), expected):
+        assert row["count"] == reference["count"]
+        assert [row["xmin"], row["ymin"], row["zmin"]] == reference["mins"]
+        assert [row["xmax"], row["ymax"], row["zmax"]] == reference["maxs"]
+        np.testing.assert_allclose([row["x_centroid"], row["y_centroid"], row["z_centroid"]], reference["centroid"])
+        np.testing.assert_allclose(row["sum"], reference["sum"])
+        np.testing.assert_allclose(row["mean"], reference["sum"] / reference["count"])
+
+
+def test_label_stats_2D_without_intensity():
+    """2D label images have no z columns, and intensity columns are only added with an intensity image."""
+    labels = np.zeros((10, 12), dtype=np.int32)
+    labels[2:5, 3:9] = 4
+    labels[7, 0] = -1  # Background
+    stats = label_stats(labels)
+    assert list(stats.columns) == ["label", "count", "xmin", "xmax", "ymin", "ymax", "x_centroid", "y_centroid"]
+    assert stats.iloc[0][["label", "count", "xmin", "xmax", "ymin", "ymax"]].tolist() == [4, 18, 2, 5, 3, 9]
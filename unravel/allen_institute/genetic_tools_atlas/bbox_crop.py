@@ -20,7 +20,6 @@ from rich.traceback import install
 from unravel.core.config import Configuration
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 from unravel.core.img_io import load_3D_img, save_as_tifs
-from unravel.core.img_tools import crop
 from unravel.core.utils import get_samples, get_stem, initialize_progress_bar, log_command, verbose_start_msg, verbose_end_msg, load_text_from_file
 
 
@@ -67,14 +66,14 @@ def main():
 
             output_dir.mkdir(parents=True, exist_ok=True)
 
-            img = load_3D_img(img_path, desired_axis_order='zyx', verbose=args.verbose)
-
             bbox_path = sample_path / f"bbox/{args.auto_crop_dir}_bbox_pad_zyx.txt"
             if not bbox_path.exists():
                 print(f"[red]Missing bbox file from ``gta_auto_crop``: {bbox_path}[/red]")
                 continue
             bbox = load_text_from_file(bbox_path)
-            img_cropped = crop(img, bbox)
+
+            # Only the slices, rows, and columns in the bbox are read
+            img_cropped = load_3D_img(img_path, desired_axis_order='zyx', verbose=args.verbose, bbox=bbox)
 
             save_as_tifs(img_cropped, output_dir, ndarray_axis_order='zyx')
 
@@ -4,19 +4,18 @@
 Use ``cstats_clusters`` (``clusters``) from UNRAVEL to make a cluster index image from a .nii.gz image.
 
 Note:
-    - This uses the cluster command from FSL and then reverses the clusters so that the largest cluster is 1, the second largest is 2, etc.
+    - Voxels >= the threshold are labeled with cc3d (-cc connectivity), clusters smaller than -ms are dropped, and clusters are numbered so that the largest cluster is 1, the second largest is 2, etc.
+    - Also saves image_cluster_info.txt (like the output of FSL's ``cluster``) and image_cluster_table.csv (size, peak, centroid, and bounding box of each cluster).
 
 Usage
 -----
-    cstats_clusters -i path/image.nii.gz [-ms 100] [-t 0.5] [-o path/image_rev_cluster_index.nii.gz] [-v]
+    cstats_clusters -i path/image.nii.gz [-ms 100] [-t 0.5] [-cc 26] [-o path/image_rev_cluster_index.nii.gz] [-v]
 """
 
 from pathlib import Path
-import numpy as np
-import nibabel as nib
 from rich.traceback import install
 
-from unravel.cluster_stats.fdr import cluster_index, reverse_clusters
+from unravel.cluster_stats.fdr import cluster_index
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 from unravel.core.config import Configuration
 from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg
@@ -31,6 +30,7 @@ def parse_args():
     opts = parser.add_argument_group('Optional args')
     opts.add_argument('-ms', '--min_size', help='Min cluster size in voxels. Default: 100', default=100, type=int, action=SM)
     opts.add_argument('-t', '--threshold', help='Threshold for cluster formation. Default: 1', default=1, type=float, action=SM)
+    opts.add_argument('-cc', '--connect', help='Connectivity for clusters (6, 18, or 26). Default: 26', default=26, type=int, choices=[6, 18, 26], action=SM)
     opts.add_argument('-o', '--output', help='path/image_cluster_index.nii.gz', default=None, action=SM)
 
     general = parser.add_argument_group('General arguments')
@@ -38,8 +38,6 @@ def parse_args():
 
     return parser.parse_args()
 
-# TODO: Some code here is redundant with code in fdr.py. Refactor to avoid redundancy.
-
 
 @log_command
 def main():
@@ -50,24 +48,13 @@ def main():
 
     output = args.output if args.output else args.input.replace('.nii.gz', '_rev_cluster_index.nii.gz')
 
-    # Create the cluster index
-    cluster_info = cluster_index(args.input, args.min_size, args.threshold, output)
+    # Create the reversed cluster index (largest cluster = 1)
+    _, cluster_info, cluster_table = cluster_index(args.input, args.min_size, args.threshold, output, args.connect)
 
-    # Save cluster info
+    # Save cluster info and table
     with open(Path(args.input).parent / f"{str(Path(args.input).name).replace('.nii.gz', '_cluster_info.txt')}", 'w') as f:
         f.write(cluster_info)
-
-    # Load the cluster index and convert to an ndarray
-    cluster_index_nii = nib.load(output)
-    cluster_index_img = np.asanyarray(cluster_index_nii.dataobj, dtype=np.uint16).squeeze()
-
-    # Lower the data type if the max cluster ID is less than 256 
-    max_cluster_id = int(cluster_index_img.max())
-    data_type = np.uint16 if max_cluster_id >= 256 else np.uint8
-    cluster_index_img = cluster_index_img.astype(data_type)
-
-    # Reverse cluster ID order in cluster_index and save it
-    rev_cluster_index_img = reverse_clusters(cluster_index_img, output, data_type, cluster_index_nii)
+    cluster_table.to_csv(Path(args.input).parent / f"{str(Path(args.input).name).replace('.nii.gz', '_cluster_table.csv')}", index=False)
 
     verbose_end_msg()
     
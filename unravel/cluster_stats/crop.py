@@ -27,7 +27,7 @@ from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 
 from unravel.core.config import Configuration
 from unravel.core.img_io import load_3D_img, save_as_nii
-from unravel.core.img_tools import find_bounding_box, label_IDs, crop
+from unravel.core.img_tools import find_bounding_box, label_stats, crop
 from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg, load_text_from_file
 
 
@@ -75,26 +75,27 @@ def main():
     Configuration.verbose = args.verbose
     verbose_start_msg()
    
+    # With a bbox, only the voxels in the bbox are read
+    bbox = load_text_from_file(args.bbox) if args.bbox else None
+
     if args.xy_res is None or args.z_res is None:
-        img, xy_res, z_res = load_3D_img(args.input, return_res=True, verbose=args.verbose)
+        img, xy_res, z_res = load_3D_img(args.input, return_res=True, verbose=args.verbose, bbox=bbox)
     else:
-        img = load_3D_img(args.input, return_res=True, verbose=args.verbose)
+        img = load_3D_img(args.input, verbose=args.verbose, bbox=bbox)
         xy_res, z_res = args.xy_res, args.z_res
 
     # Crop image
     if args.bbox:
-        bbox = load_text_from_file(args.bbox)
-        img_cropped = crop(img, bbox)
-        save_cropped_img(img_cropped, xy_res, z_res, args)
+        save_cropped_img(img, xy_res, z_res, args)
     elif args.cluster:
         xmin, xmax, ymin, ymax, zmin, zmax = find_bounding_box(img, cluster_ID=args.cluster)
         bbox_str = f"{xmin}:{xmax}, {ymin}:{ymax}, {zmin}:{zmax}"
         img_cropped = crop(img, bbox_str)
         save_cropped_img(img_cropped, xy_res, z_res, args, cluster=args.cluster)
     elif args.all_clusters:
-        clusters = label_IDs(img, min_voxel_count=1, print_IDs=False, print_sizes=False)
-        for cluster in clusters: 
-            xmin, xmax, ymin, ymax, zmin, zmax = find_bounding_box(img, cluster_ID=cluster)
+        stats = label_stats(img)  # Bboxes for all clusters in one pass
+        for cluster in stats['label'].tolist(): 
+            xmin, xmax, ymin, ymax, zmin, zmax = find_bounding_box(img, cluster_ID=cluster, stats=stats)
             bbox_str = f"{xmin}:{xmax}, {ymin}:{ymax}, {zmin}:{zmax}"
             img_cropped = crop(img, bbox_str)
             save_cropped_img(img_cropped, xy_res, z_res, args, cluster=cluster)
@@ -16,6 +16,8 @@ from rich.traceback import install
 
 from unravel.core.config import Configuration
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
+from unravel.core.img_io import nii_to_ndarray
+from unravel.core.img_tools import relabel
 
 from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg
 
@@ -43,12 +45,11 @@ def main():
     # Load the NIfTI image
     nii = nib.load(args.input)
 
-    # Make sure values in the image are integers
-    img = nii.get_fdata().astype(int)
+    # Stored cluster IDs in the on-disk dtype (no float copy)
+    img = nii_to_ndarray(nii, scaling='raw')
 
-    # Drop the specified clusters
-    for cluster in args.drop_clusters:
-        img[img == cluster] = 0
+    # Drop the specified clusters (one pass with a lookup table)
+    img = relabel(img, args.drop_clusters, np.zeros(len(args.drop_clusters), dtype=int))
 
     # Save the new image
     new_nii = nib.Nifti1Image(img, nii.affine, nii.header)
@@ -8,13 +8,17 @@ Inputs:
 
 Outputs saved in the output directory:
     - FDR-adjusted 1-p value map (1 - q value defines the threshold for cluster maps)
-    - Cluster information CSV
+    - Cluster info (input_name_cluster_info.txt; formatted like the output of FSL's ``cluster``)
+    - Cluster table (input_name_cluster_table.csv; size, peak, intensity-weighted centroid, and bounding box of each cluster)
     - Reversed cluster index image (output_dir/input_name_rev_cluster_index.nii.gz)
     - min_cluster_size_in_voxels.txt
     - p_value_threshold.txt
     - 1-p_value_threshold.txt
 
 Note:
+    - FDR correction is done in process with the Benjamini-Hochberg (default) or Benjamini-Yekutieli (-me by) procedure (FSL's ``fdr`` is not needed).
+    - The p value map is loaded and sorted once for all q values.
+    - Clusters are voxels with an adjusted 1-p value >= 1 - q that are connected (-cc) and have at least -ms voxels (labeled in process with cc3d).
     - The q value does not influence the FDR-adjusted 1-p value map, but it does determine the threshold for cluster maps.
     - Cluster IDs are reversed in the cluster index image so that the largest cluster is 1, the second largest is 2, etc.
     - For bilateral data processed with a hemispheric mask, next run ``cstats_mirror_indices`` to mirror the cluster indices to the other hemisphere.
@@ -33,13 +37,14 @@ Next commands:
 
 Usage
 -----
-    cstats_fdr -i path/vox_p_tstat1.nii.gz -mas path/mask.nii.gz -q 0.05 0.01 0.001 [-ms 100] [-o output_dir] [-a1 path/avg_img1.nii.gz] [-a2 path/avg_img2.nii.gz] [-th 10] [-v]
+    cstats_fdr -i path/vox_p_tstat1.nii.gz -mas path/mask.nii.gz -q 0.05 0.01 0.001 [-ms 100] [-o output_dir] [-a1 path/avg_img1.nii.gz] [-a2 path/avg_img2.nii.gz] [-cc 26] [-me bh] [-th 10] [-v]
 """
 
+import cc3d
 import concurrent.futures
-import subprocess
 import numpy as np
 import nibabel as nib
+import pandas as pd
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from rich import print
@@ -47,6 +52,8 @@ from rich.traceback import install
 
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 from unravel.core.config import Configuration
+from unravel.core.img_io import nii_to_ndarray
+from unravel.core.img_tools import label_stats, relabel
 from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg, print_func_name_args_times
 
 
@@ -63,6 +70,8 @@ def parse_args():
     opts.add_argument('-o', '--output', help='Output directory. Default: input_name_q{args.q_value}"', default=None, action=SM)
     opts.add_argument('-a1', '--avg_img1', help='path/averaged_immunofluo_group1.nii.gz for spliting the cluster index based on effect direction', action=SM)
     opts.add_argument('-a2', '--avg_img2', help='path/averaged_immunofluo_group2.nii.gz for spliting the cluster index based on effect direction', action=SM)
+    opts.add_argument('-cc', '--connect', help='Connectivity for clusters (6, 18, or 26). Default: 26 (like FSL\'s cluster)', default=26, type=int, choices=[6, 18, 26], action=SM)
+    opts.add_argument('-me', '--method', help='FDR method: bh (Benjamini-Hochberg; like FSL\'s fdr) or by (Benjamini-Yekutieli; for any dependence between tests). Default: bh', default='bh', choices=['bh', 'by'], action=SM)
     opts.add_argument('-th', '--threads', help='Number of threads. Default: 10', default=10, type=int, action=SM)
 
     general = parser.add_argument_group('General arguments')
@@ -72,15 +81,73 @@ def parse_args():
 
 # TODO: could add optional args like in ``vstats`` for running the ``cstats_fdr`` command. 
 
+def fdr_adjust(p_values, q_values=(), method='bh'):
+    """Benjamini-Hochberg (bh) or Benjamini-Yekutieli (by) FDR correction with one sort for all q values.
+
+    Parameters:
+        - p_values (ndarray): p values (e.g., of voxels in a mask)
+        - q_values (float or list of floats): q values for the p value thresholds
+        - method (str): 'bh' (independent or positively correlated tests, like FSL's ``fdr``) or 'by' (any dependence; more conservative)
+
+    Returns:
+        - adjusted_p_values (ndarray): FDR-adjusted p values (q values) in the order of p_values
+        - probability_thresholds (ndarray): the largest p value that is significant at each q value (0 if none are)
+    """
+    if method not in ('bh', 'by'):
+        raise ValueError(f"Invalid FDR method: {method}. Use 'bh' or 'by'.")
+    p_values = np.asarray(p_values, dtype=np.float64).ravel()
+    n = p_values.size
+    order = np.argsort(p_values, kind='stable')
+    p_sorted = p_values[order]
+    ranks = np.arange(1, n + 1, dtype=np.float64)
+    c = np.sum(1 / ranks) if method == 'by' else 1.0
+
+    # Step-up: the adjusted p value of the ith smallest p value is min over j >= i of p_(j) * n * c / j
+    adjusted_sorted = np.minimum.accumulate((p_sorted * (n * c / ranks))[::-1])[::-1]
+    np.clip(adjusted_sorted, 0, 1, out=adjusted_sorted)
+    adjusted_p_values = np.empty_like(adjusted_sorted)
+    adjusted_p_values[order] = adjusted_sorted
+
+    # p_(k) is the threshold for the largest k with an adjusted p value <= q (adjusted_sorted is nondecreasing)
+    k = np.searchsorted(adjusted_sorted, np.atleast_1d(np.asarray(q_values, dtype=np.float64)), side='right')
+    probability_thresholds = np.where(k > 0, p_sorted[np.maximum(k - 1, 0)] if n else 0.0, 0.0)
+    return adjusted_p_values, probability_thresholds
+
+def load_p_values(input_path, mask_path):
+    """Load a 1 - p value map and a mask. Return the p values in the mask (ndarray), the mask (ndarray), and the 1 - p value map (Nifti1Image)"""
+    one_minus_p_nii = nib.load(str(input_path))
+    mask = nii_to_ndarray(mask_path, scaling='raw') > 0
+    one_minus_p = nii_to_ndarray(one_minus_p_nii, dtype=np.float64)
+    if one_minus_p.shape != mask.shape:
+        raise ValueError(f"The p value map {one_minus_p.shape} and mask {mask.shape} must have the same shape.")
+    return 1 - one_minus_p[mask], mask, one_minus_p_nii
+
+@print_func_name_args_times()
+def fdr_correction(input_path, mask_path, q_values, method='bh'):
+    """Perform FDR correction on a 1 - p value map using a mask for several q values.
+
+    Returns:
+        - adjusted_1_p_img (ndarray): FDR-adjusted 1-p value map (float32; 0 outside of the mask)
+        - probability_thresholds (ndarray): the p value threshold for each q value (0 if no voxels are significant)
+        - one_minus_p_nii (Nifti1Image): the input image (for the affine and header)
+    """
+    p_values, mask, one_minus_p_nii = load_p_values(input_path, mask_path)
+    adjusted_p_values, probability_thresholds = fdr_adjust(p_values, q_values, method)
+    adjusted_1_p_img = np.zeros(mask.shape, dtype=np.float32)
+    adjusted_1_p_img[mask] = 1 - adjusted_p_values
+    return adjusted_1_p_img, probability_thresholds, one_minus_p_nii
+
 @print_func_name_args_times()
-def fdr(input_path, fdr_path, mask_path, q_value):
+def fdr(input_path, fdr_path, mask_path, q_value, method='bh', corrected=None):
     """Perform FDR correction on the input p value map using a mask.
     
     Args:
-        - input_path (str): the path to the p value map
+        - input_path (str): the path to the 1 - p value map
         - fdr_path (str): the path to the output directory
         - mask_path (str): the path to the mask
         - q_value (float): the q value for FDR correction
+        - method (str): 'bh' (Benjamini-Hochberg) or 'by' (Benjamini-Yekutieli). Default: 'bh'
+        - corrected (tuple): (adjusted_1_p_img, probability_threshold, one_minus_p_nii) from fdr_correction() to reuse for several q values. Default: None (computed here)
 
     Saves in the fdr_path:
         - FDR-adjusted 1-p value map (1 - q value defines the threshold)
@@ -91,42 +158,112 @@ def fdr(input_path, fdr_path, mask_path, q_value):
         """
 
     prefix = str(Path(input_path).name).replace('.nii.gz', '')
-    adjusted_pval_output_path = fdr_path / f"{prefix}_q{q_value}_adjusted_1-p_values.nii.gz"
-
-    fdr_command = [
-        'fdr', 
-        '-i', str(input_path), 
-        '--oneminusp', 
-        '-m', str(mask_path), 
-        '-q', str(q_value),
-        '-a', str(adjusted_pval_output_path)
-    ]
-
-    result = subprocess.run(fdr_command, capture_output=True, text=True)    
-    if result.returncode != 0:
-        raise Exception(f"Error in FDR correction: {result.stderr}")
-    print(result.stdout)
-    probability_threshold = result.stdout.strip().split()[-1]
+    adjusted_pval_output_path = Path(fdr_path) / f"{prefix}_q{q_value}_adjusted_1-p_values.nii.gz"
+
+    if corrected is None:
+        adjusted_1_p_img, probability_thresholds, one_minus_p_nii = fdr_correction(input_path, mask_path, [q_value], method)
+        corrected = (adjusted_1_p_img, probability_thresholds[0], one_minus_p_nii)
+    adjusted_1_p_img, probability_threshold, one_minus_p_nii = corrected
+
+    adjusted_nii = nib.Nifti1Image(adjusted_1_p_img, one_minus_p_nii.affine, one_minus_p_nii.header)
+    adjusted_nii.set_data_dtype(np.float32)
+    adjusted_nii.header.set_slope_inter(None, None)
+    nib.save(adjusted_nii, str(adjusted_pval_output_path))
+
+    print(f'[default]Probability Threshold is:[/]\n{probability_threshold}')
     print(f'[default]1-p Threshold is:[/]\n{1-float(probability_threshold)}')
 
     return adjusted_pval_output_path, float(probability_threshold)
 
+CLUSTER_INFO_COLUMNS = ['Cluster Index', 'Voxels', 'MAX', 'MAX X (vox)', 'MAX Y (vox)', 'MAX Z (vox)', 'COG X (vox)', 'COG Y (vox)', 'COG Z (vox)']
+
+def extract_clusters(img, threshold, min_size, connectivity=26):
+    """Threshold and label an image with cc3d, drop small clusters, and number clusters by size (1 = largest).
+
+    Parameters:
+        - img (ndarray): the image to threshold (e.g., the FDR-adjusted 1-p value map)
+        - threshold (float): voxels >= threshold form clusters
+        - min_size (int): min cluster size in voxels
+        - connectivity (int): 6, 18, or 26 (like FSL's ``cluster``). Default: 26
+
+    Returns:
+        - rev_cluster_index_img (ndarray): the reversed cluster index (uint8 if there are < 256 clusters, otherwise uint16 or uint32)
+        - cluster_table (DataFrame): one row per cluster with columns: cluster_ID, size, peak, peak_x, peak_y, peak_z, 
+          x_centroid, y_centroid, z_centroid (weighted by intensity), xmin, xmax, ymin, ymax, zmin, zmax (max is exclusive)
+    """
+    img = np.asarray(img)
+    labels, n = cc3d.connected_components(np.ascontiguousarray(img >= threshold).view(np.uint8), connectivity=connectivity, out_dtype=np.uint32, return_N=True)
+
+    # Keep clusters with >= min_size voxels and number them from largest to smallest (ties: first cluster in scan order)
+    sizes = np.bincount(labels.ravel(), minlength=n + 1)
+    kept = np.flatnonzero(sizes >= min_size)
+    kept = kept[kept > 0]
+    kept = kept[np.argsort(-sizes[kept], kind='stable')]
+    n_clusters = len(kept)
+    data_type = np.uint8 if n_clusters < 256 else np.uint16 if n_clusters < 65536 else np.uint32
+    rev_cluster_index_img = relabel(labels, kept, np.arange(1, n_clusters + 1), default=0, dtype=data_type)
+    del labels
+
+    # Sizes, bounding boxes, peaks, and intensity-weighted centroids from the voxels in clusters
+    stats = label_stats(rev_cluster_index_img).set_index('label').reindex(np.arange(1, n_clusters + 1))
+    coords = np.nonzero(rev_cluster_index_img)
+    cluster_IDs = rev_cluster_index_img[coords].astype(np.intp)
+    values = img[coords].astype(np.float64)
+    weights = np.bincount(cluster_IDs, values, minlength=n_clusters + 1)[1:]
+    order = np.lexsort((values, cluster_IDs))
+    peaks = order[np.r_[np.diff(cluster_IDs[order]) != 0, True]] if len(order) else order
+
+    cluster_table = pd.DataFrame({'cluster_ID': np.arange(1, n_clusters + 1), 'size': sizes[kept], 'peak': values[peaks]})
+    for axis, coord in zip('xyz', coords):
+        cluster_table[f'peak_{axis}'] = coord[peaks]
+    for axis, coord in zip('xyz', coords):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cluster_table[f'{axis}_centroid'] = np.bincount(cluster_IDs, values * coord, minlength=n_clusters + 1)[1:] / weights
+    for col in ('xmin', 'xmax', 'ymin', 'ymax', 'zmin', 'zmax'):
+        cluster_table[col] = stats[col].to_numpy(dtype=np.int64)
+    return rev_cluster_index_img, cluster_table
+
+def cluster_info_text(cluster_table):
+    """Format a cluster table from extract_clusters() like the output of FSL's ``cluster`` (tab-separated, largest cluster first).
+    
+    As with FSL, the largest cluster has the highest Cluster Index (``cstats_table`` reverses these to match the reversed cluster index)."""
+    n_clusters = len(cluster_table)
+    lines = ['\t'.join(CLUSTER_INFO_COLUMNS)]
+    for row in cluster_table.itertuples(index=False):
+        lines.append('\t'.join([str(n_clusters - row.cluster_ID + 1), str(row.size), f"{row.peak:.6g}", str(row.peak_x), str(row.peak_y), str(row.peak_z),
+                                 f"{row.x_centroid:.1f}", f"{row.y_centroid:.1f}", f"{row.z_centroid:.1f}"]))
+    return '\n'.join(lines) + '\n'
+
 @print_func_name_args_times()
-def cluster_index(adj_p_val_img_path, min_size, threshold, output_index):
-    print('')
-    command = [
-        'cluster',
-        '-i', adj_p_val_img_path,
-        '-t', str(threshold),
-        '--oindex=' + str(output_index),
-        '--minextent=' + str(min_size)
-    ]
-    result = subprocess.run(command, capture_output=True, text=True)
-    if result.returncode != 0:
-        print("Error:", result.stderr)
-    else:
-        print("Output:", result.stdout)
-    return result.stdout
+def cluster_index(adj_p_val_img_path, min_size, threshold, output_index, connectivity=26, img=None):
+    """Make a reversed cluster index (1 = largest cluster) from an image (e.g., the FDR-adjusted 1-p value map) and save it in the smallest dtype.
+
+    Args:
+        - adj_p_val_img_path (str): the path to the image (for the affine and header; also loaded if img is None)
+        - min_size (int): min cluster size in voxels
+        - threshold (float): voxels >= threshold form clusters
+        - output_index (str): the path to save the reversed cluster index
+        - connectivity (int): 6, 18, or 26. Default: 26
+        - img (ndarray): the image if it is already loaded. Default: None
+
+    Returns:
+        - rev_cluster_index_img (ndarray): the reversed cluster index
+        - cluster_info (str): cluster info like the output of FSL's ``cluster``
+        - cluster_table (DataFrame): size, peak, centroid, and bounding box of each cluster (see extract_clusters())
+    """
+    ref_nii = nib.load(str(adj_p_val_img_path))
+    if img is None:
+        img = nii_to_ndarray(ref_nii, dtype=np.float32)
+    rev_cluster_index_img, cluster_table = extract_clusters(img, threshold, min_size, connectivity)
+
+    rev_cluster_index_nii = nib.Nifti1Image(rev_cluster_index_img, ref_nii.affine, ref_nii.header)
+    rev_cluster_index_nii.set_data_dtype(rev_cluster_index_img.dtype)
+    rev_cluster_index_nii.header.set_slope_inter(None, None)
+    nib.save(rev_cluster_index_nii, str(output_index))
+
+    cluster_info = cluster_info_text(cluster_table)
+    print(f"\n{cluster_info}")
+    return rev_cluster_index_img, cluster_info, cluster_table
 
 @print_func_name_args_times()
 def reverse_clusters(cluster_index_img, output, data_type, cluster_index_nii):
@@ -142,13 +279,10 @@ def reverse_clusters(cluster_index_img, output, data_type, cluster_index_nii):
     - rev_cluster_index_img (ndarray): The reversed cluster index image as a NumPy array
     """
     max_cluster_id = int(cluster_index_img.max())
-    rev_cluster_index_img = np.zeros_like(cluster_index_img)
-    
-    # Reassign cluster IDs in reverse order
-    for cluster_id in range(1, max_cluster_id + 1):
-        rev_cluster_index_img[cluster_index_img == cluster_id] = max_cluster_id - cluster_id + 1
 
-    rev_cluster_index_img = rev_cluster_index_img.astype(data_type)
+    # Reassign cluster IDs in reverse order (one pass with a lookup table)
+    cluster_IDs = np.arange(1, max_cluster_id + 1)
+    rev_cluster_index_img = relabel(cluster_index_img, cluster_IDs, cluster_IDs[::-1], default=0, dtype=data_type)
     rev_cluster_index_nii = nib.Nifti1Image(rev_cluster_index_img, cluster_index_nii.affine, cluster_index_nii.header)
     rev_cluster_index_nii.set_data_dtype(data_type)
     nib.save(rev_cluster_index_nii, output)
@@ -157,6 +291,10 @@ def reverse_clusters(cluster_index_img, output, data_type, cluster_index_nii):
 
 @print_func_name_args_times()
 def split_clusters_based_on_effect(rev_cluster_index_img, avg_img1, avg_img2, output, max_cluster_id, data_type, cluster_index_nii):
+    """Split a cluster index into group 1 > group 2 (_gt_) and group 1 < group 2 (_lt_) cluster indices based on the mean intensity of each cluster in the average images.
+
+    Mean intensities of all clusters are computed with one bincount per average image, and each directional index is made with one lookup table pass.
+    """
     if avg_img1 and avg_img2: 
         if Path(avg_img1).exists() and Path(avg_img2).exists():
             print("\n    Splitting the rev_cluster_index into 2 parts (group 1 > group 2 and group 1 < group 2)\n")
@@ -165,23 +303,18 @@ def split_clusters_based_on_effect(rev_cluster_index_img, avg_img1, avg_img2, ou
             avg_img1_data = np.asanyarray(avg_img1.dataobj, dtype=avg_img1.header.get_data_dtype()).squeeze()
             avg_img2_data = np.asanyarray(avg_img2.dataobj, dtype=avg_img2.header.get_data_dtype()).squeeze()
 
-            # Create a dict w/ mean intensities in each cluster for each group
-            cluster_means = {}
-            for cluster_id in range(1, max_cluster_id + 1):
-                cluster_mask = rev_cluster_index_img == cluster_id
-                cluster_means[cluster_id] = {
-                    "group1": avg_img1_data[cluster_mask].mean(),
-                    "group2": avg_img2_data[cluster_mask].mean()
-                }
+            # Mean intensities in each cluster for each group (index = cluster ID)
+            cluster_IDs = rev_cluster_index_img.ravel()
+            counts = np.bincount(cluster_IDs, minlength=max_cluster_id + 1)[:max_cluster_id + 1]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                group1_means = np.bincount(cluster_IDs, weights=avg_img1_data.ravel().astype(np.float64), minlength=max_cluster_id + 1)[:max_cluster_id + 1] / counts
+                group2_means = np.bincount(cluster_IDs, weights=avg_img2_data.ravel().astype(np.float64), minlength=max_cluster_id + 1)[:max_cluster_id + 1] / counts
 
             # Make two new cluster index images based on the effect directions (group1 > group2, group2 > group1)
-            img_g1_gt_g2 = np.zeros_like(rev_cluster_index_img, dtype=data_type)
-            img_g1_lt_g2 = np.zeros_like(rev_cluster_index_img, dtype=data_type)
-            for cluster_id, means in cluster_means.items():
-                if means["group1"] > means["group2"]:
-                    img_g1_gt_g2[rev_cluster_index_img == cluster_id] = cluster_id
-                else:
-                    img_g1_lt_g2[rev_cluster_index_img == cluster_id] = cluster_id
+            all_IDs = np.arange(1, max_cluster_id + 1)
+            g1_gt_g2 = group1_means[1:] > group2_means[1:]
+            img_g1_gt_g2 = relabel(rev_cluster_index_img, all_IDs, np.where(g1_gt_g2, all_IDs, 0), default=0, dtype=data_type)
+            img_g1_lt_g2 = relabel(rev_cluster_index_img, all_IDs, np.where(g1_gt_g2, 0, all_IDs), default=0, dtype=data_type)
 
             # Save the new cluster index images
             rev_cluster_index_g1_gt_g2 = nib.Nifti1Image(img_g1_gt_g2, cluster_index_nii.affine, cluster_index_nii.header)
@@ -196,8 +329,8 @@ def split_clusters_based_on_effect(rev_cluster_index_img, avg_img1, avg_img2, ou
 
 
 @print_func_name_args_times()
-def process_fdr_and_clusters(input, mask, q, min_size, avg_img1, avg_img2, output=None):
-    """Process FDR correction and cluster index generation for a given q value."""
+def process_fdr_and_clusters(input, mask, q, min_size, avg_img1, avg_img2, output=None, method='bh', corrected=None, connectivity=26):
+    """Process FDR correction and cluster index generation for a given q value (corrected: see fdr())."""
     if output is None:
         fdr_dir_name = f"{Path(input).name[:-7]}_q{q}"
     else:
@@ -209,7 +342,7 @@ def process_fdr_and_clusters(input, mask, q, min_size, avg_img1, avg_img2, outpu
     fdr_path.mkdir(exist_ok=True, parents=True)
 
     # Perform FDR Correction
-    adjusted_pval_output_path, probability_threshold = fdr(input, fdr_path, mask, q)
+    adjusted_pval_output_path, probability_threshold = fdr(input, fdr_path, mask, q, method, corrected)
 
     # Save the probability threshold and the 1-P threshold to a .txt file
     with open(fdr_path / "p_value_threshold.txt", "w") as f:
@@ -221,32 +354,20 @@ def process_fdr_and_clusters(input, mask, q, min_size, avg_img1, avg_img2, outpu
     with open(fdr_path / "min_cluster_size_in_voxels.txt", "w") as f:
         f.write(f"{min_size}\n")
 
-    # Generate cluster index
-    cluster_index_path = f"{fdr_path}/{fdr_dir_name}_cluster_index.nii.gz"
+    # Generate the reversed cluster index (largest cluster = 1)
     thres = 1 - float(q)
-    cluster_info = cluster_index(adjusted_pval_output_path, min_size, thres, cluster_index_path)
+    adjusted_1_p_img = corrected[0] if corrected is not None else None
+    rev_cluster_index_img, cluster_info, cluster_table = cluster_index(adjusted_pval_output_path, min_size, thres, output, connectivity, img=adjusted_1_p_img)
 
-    # Save the cluster info
+    # Save the cluster info and table
     with open(fdr_path / f"{fdr_dir_name}_cluster_info.txt", "w") as f:
         f.write(cluster_info)
-
-    # Load the cluster index and convert to an ndarray
-    cluster_index_nii = nib.load(cluster_index_path)
-    cluster_index_img = np.asanyarray(cluster_index_nii.dataobj, dtype=np.uint16).squeeze()
-
-    # Lower the data type if the max cluster ID is less than 256 
-    max_cluster_id = int(cluster_index_img.max())
-    data_type = np.uint16 if max_cluster_id >= 256 else np.uint8
-    cluster_index_img = cluster_index_img.astype(data_type)
-
-    # Reverse cluster ID order in cluster_index and save it
-    rev_cluster_index_img = reverse_clusters(cluster_index_img, output, data_type, cluster_index_nii)
+    cluster_table.to_csv(fdr_path / f"{fdr_dir_name}_cluster_table.csv", index=False)
 
     # Split the cluster index based on the effect directions
-    split_clusters_based_on_effect(rev_cluster_index_img, avg_img1, avg_img2, output, max_cluster_id, data_type, cluster_index_nii)
-
-    # Remove the original cluster index file
-    Path(cluster_index_path).unlink()
+    max_cluster_id = len(cluster_table)
+    cluster_index_nii = nib.load(str(output))
+    split_clusters_based_on_effect(rev_cluster_index_img, avg_img1, avg_img2, output, max_cluster_id, rev_cluster_index_img.dtype, cluster_index_nii)
 
 @log_command
 def main():
@@ -255,12 +376,15 @@ def main():
     Configuration.verbose = args.verbose
     verbose_start_msg()
 
+    # FDR correction for all q values (the p values are loaded and sorted once)
+    adjusted_1_p_img, probability_thresholds, one_minus_p_nii = fdr_correction(args.input, args.mask, args.q_value, args.method)
+
     # Prepare directory paths and outputs
     results = []
     with ThreadPoolExecutor(max_workers=args.threads) as executor:
         future_to_q = {
-            executor.submit(process_fdr_and_clusters, args.input, args.mask, q, args.min_size, args.avg_img1, args.avg_img2, args.output): q
-            for q in args.q_value
+            executor.submit(process_fdr_and_clusters, args.input, args.mask, q, args.min_size, args.avg_img1, args.avg_img2, args.output, args.method, (adjusted_1_p_img, threshold, one_minus_p_nii), args.connect): q
+            for q, threshold in zip(args.q_value, probability_thresholds)
         }
         
         for future in concurrent.futures.as_completed(future_to_q):
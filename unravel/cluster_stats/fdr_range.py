@@ -6,19 +6,21 @@ Use ``cstats_fdr_range`` (``fr``) from UNRAVEL to output a list of FDR q values
 Inputs: 
     - p value map (e.g., *vox_p_*stat*.nii.gz from vstats)
 
+Note:
+    - FDR correction uses the Benjamini-Hochberg (default) or Benjamini-Yekutieli (-me by) procedure in process. The p values are sorted once for all q values.
+
 Next command:
     - ``cstats_fdr`` to correct for multiple comparisons (use the q values from ``cstats_fdr_range``).
 
 Usage:
 ------
-    cstats_fdr_range -i path/vox_p_tstat1.nii.gz -mas path/mask.nii.gz [-q 0.00001 0.00005 0.0001 0.0005 0.001 0.005 0.01 0.05 0.1 0.15 0.2 0.3 0.4 0.5 0.6 0.7 0.8 0.9 0.95 0.99 0.999 0.9999] [-th 22] [-v]
+    cstats_fdr_range -i path/vox_p_tstat1.nii.gz -mas path/mask.nii.gz [-q 0.00001 0.00005 0.0001 0.0005 0.001 0.005 0.01 0.05 0.1 0.15 0.2 0.3 0.4 0.5 0.6 0.7 0.8 0.9 0.95 0.99 0.999 0.9999] [-me bh] [-v]
 """
 
-import concurrent.futures
-import subprocess
 from rich import print
 from rich.traceback import install
 
+from unravel.cluster_stats.fdr import fdr_adjust, load_p_values
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 from unravel.core.config import Configuration
 from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg
@@ -35,7 +37,7 @@ def parse_args():
 
     opts = parser.add_argument_group('Optional args')
     opts.add_argument('-q', '--q_values', help='Space-separated list of q values. Default: a list from 0.00001 to 0.9999 is used.', nargs='*', default=q_values_default, type=float, action=SM)
-    opts.add_argument('-th', '--threads', help='Number of threads. Default: 22', default=22, type=int, action=SM)
+    opts.add_argument('-me', '--method', help='FDR method: bh (Benjamini-Hochberg; like FSL\'s fdr) or by (Benjamini-Yekutieli). Default: bh', default='bh', choices=['bh', 'by'], action=SM)
 
     general = parser.add_argument_group('General arguments')
     general.add_argument('-v', '--verbose', help='Increase verbosity. Default: False', action='store_true', default=False)
@@ -50,33 +52,21 @@ def smart_float_format(value, max_decimals=9):
     formatted = f"{value:.{max_decimals}f}"  # Format with maximum decimal places
     return formatted.rstrip('0').rstrip('.') if '.' in formatted else formatted
 
-def fdr_range(input_path, mask_path, q_value):
-    """Perform FDR correction on the input p value map using a mask.
+def fdr_range(input_path, mask_path, q_values, method='bh'):
+    """Perform FDR correction on the input p value map using a mask for several q values (the p values are sorted once).
     
     Args:
-        - input_path (str): the path to the p value map
+        - input_path (str): the path to the 1 - p value map
         - mask_path (str): the path to the mask
-        - q_value (float): the q value for FDR correction
+        - q_values (list of floats): the q values for FDR correction
+        - method (str): 'bh' (Benjamini-Hochberg) or 'by' (Benjamini-Yekutieli). Default: 'bh'
 
+    Returns:
+        - list of tuples: (q_value, probability_threshold) for each q value (the threshold is 0 if no voxels are significant)
     """
-
-    fdr_command = [
-        'fdr', 
-        '-i', str(input_path), 
-        '--oneminusp', 
-        '-m', str(mask_path), 
-        '-q', str(q_value),
-    ]
-
-    result = subprocess.run(fdr_command, capture_output=True, text=True)    
-    if result.returncode != 0:
-        raise Exception(f"Error in FDR correction: {result.stderr}")
-
-    # Extract the probability threshold from the output
-    probability_threshold = result.stdout.strip().split()[-1]
-    probability_threshold_float = float(probability_threshold)
-
-    return q_value, probability_threshold_float
+    p_values, _, _ = load_p_values(input_path, mask_path)
+    _, probability_thresholds = fdr_adjust(p_values, q_values, method)
+    return [(q_value, float(threshold)) for q_value, threshold in zip(q_values, probability_thresholds)]
 
 @log_command
 def main():
@@ -85,17 +75,10 @@ def main():
     Configuration.verbose = args.verbose
     verbose_start_msg()
     
-    # Initialize ThreadPoolExecutor
-    with concurrent.futures.ThreadPoolExecutor(max_workers=args.threads) as executor:
-        # Submit tasks to the executor for each q_value
-        futures = [executor.submit(fdr_range, args.input, args.mask, q_value) for q_value in args.q_values]
-        
-        q_values_resulting_in_clusters = []
-        # Process results as they complete
-        for future in concurrent.futures.as_completed(futures):
-            q_value, probability_threshold = future.result()
-            if 0 < probability_threshold < 0.05:
-                q_values_resulting_in_clusters.append(q_value)
+    q_values_resulting_in_clusters = []
+    for q_value, probability_threshold in fdr_range(args.input, args.mask, args.q_values, args.method):
+        if 0 < probability_threshold < 0.05:
+            q_values_resulting_in_clusters.append(q_value)
 
     # Sort q_values numerically
     q_values_resulting_in_clusters.sort()
@@ -26,6 +26,7 @@ from rich.traceback import install
 from unravel.cluster_stats.sunburst import sunburst
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 from unravel.core.config import Configuration
+from unravel.core.img_tools import label_stats
 from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg
 
 
@@ -51,7 +52,7 @@ def parse_args():
 # TODO: Look into consolidating csvs 
 
 
-def generate_sunburst(cluster, img, atlas, xyz_res_in_um, data_type, output_dir, sunburst_csv_path, info_csv_path, output_rgb_lut):
+def generate_sunburst(cluster, img, atlas, xyz_res_in_um, data_type, output_dir, sunburst_csv_path, info_csv_path, output_rgb_lut, bbox=None):
     """Generate a sunburst plot for a given cluster.
     
     Args:
@@ -61,7 +62,10 @@ def generate_sunburst(cluster, img, atlas, xyz_res_in_um, data_type, output_dir,
         - atlas_res_in_um (tuple): the atlas resolution in microns. For example, (25, 25, 25)
         - data_type (type): the data type of the image.
         - output_dir (Path): the output directory.
+        - bbox (tuple): slices of the cluster's bounding box (from label_stats) to restrict the mask to. Default: None (whole image).
     """
+    if bbox is not None:
+        img, atlas = img[bbox], atlas[bbox]
     mask = (img == cluster)
     if np.any(mask):
         cluster_image = np.where(mask, cluster, 0).astype(data_type)
@@ -101,13 +105,16 @@ def main():
         file.write(' '.join(map(str, args.valid_cluster_ids)))
     
     # Generate the valid cluster index
-    valid_cluster_index = np.zeros_like(img, dtype=data_type)
-    for cluster in args.valid_cluster_ids:
-        valid_cluster_index = np.where(img == cluster, cluster, valid_cluster_index)
-    
+    valid_cluster_index = np.where(np.isin(img, args.valid_cluster_ids), img, 0).astype(data_type)
+
+    # Get the bounding box of each cluster in one pass, so that sunburst plots only process the voxels around each cluster
+    stats = label_stats(img).set_index('label')
+    bboxes = {cluster: tuple(slice(int(stats.at[cluster, f'{axis}min']), int(stats.at[cluster, f'{axis}max'])) for axis in 'xyz')
+              for cluster in args.valid_cluster_ids if cluster in stats.index}
+
     # Parallel processing of sunburst plots
     with ThreadPoolExecutor() as executor:
-        futures = [executor.submit(generate_sunburst, cluster, img, atlas, xyz_res_in_um, data_type, output_dir, args.sunburst_csv, args.info, args.output_rgb_lut) for cluster in args.valid_cluster_ids]
+        futures = [executor.submit(generate_sunburst, cluster, img, atlas, xyz_res_in_um, data_type, output_dir, args.sunburst_csv, args.info, args.output_rgb_lut, bboxes[cluster]) for cluster in args.valid_cluster_ids if cluster in bboxes]
         for future in futures:
             future.result()  # Wait for all threads to complete
 
@@ -37,6 +37,7 @@ from rich.traceback import install
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 
 from unravel.core.config import Configuration 
+from unravel.core.img_tools import label_stats
 from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg
 
 
@@ -73,15 +74,11 @@ def calculate_regional_volumes(img, atlas, atlas_res_in_um):
         - volumes_dict (dict): a dictionary of region volumes (key = region ID, value = volume in mm^3)
     """
     
-    img[img > 0] = 1 # Binarize input image
-    img = img.astype(np.int16)
-    img *= atlas
-    uniq_values, counts = np.unique(img, return_counts=True)
-    volumes = (atlas_res_in_um**3 * counts) / 1000000000  # Convert voxel counts to cubic mm
-    uniq_values = uniq_values[1:]
-    volumes = volumes[1:]
-
-    return dict(zip(uniq_values, volumes))
+    # Count voxels of each atlas region within the input image (one pass)
+    stats = label_stats(np.where(img > 0, atlas, 0))
+    volumes = (atlas_res_in_um**3 * stats['count'].to_numpy()) / 1000000000  # Convert voxel counts to cubic mm
+
+    return dict(zip(stats['label'].tolist(), volumes))
 
 def sunburst(img, atlas, atlas_res_in_um, output_path, sunburst_csv_path='sunburst_IDPath_Abbrv.csv', info_csv_path='CCFv3-2020_info.csv', output_rgb_lut=False, depth=10):
     """Generate a sunburst plot of regional volumes that cluster comprise across the ABA hierarchy.
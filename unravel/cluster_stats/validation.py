@@ -10,7 +10,7 @@ Prereqs:
     - ``seg_ilastik`` to generate a segmentation mask in tissue space (e.g., to label c-Fos+ cells)
 
 Inputs:
-    - path/rev_cluster_index.nii.gz to warp from atlas space (rev = reverse, i.e., cluster IDs are from large to small)
+    - path/rev_cluster_index.nii.gz to warp from atlas space (rev = reverse, i.e., cluster IDs are from large to small). Several paths or glob patterns can be provided.
     - rel_path/seg_img.nii.gz. 1st glob match processed
 
 Outputs:
@@ -21,21 +21,28 @@ Outputs:
 Note:
     - For -s, if a dir name is provided, the command will load ./sample??/seg_dir/sample??_seg_dir.nii.gz. 
     - If a relative path is provided, the command will load the image at the specified path.
+    - Cells are labeled once in the cropped segmentation. With -om split (default), cells crossing cluster boundaries are counted in each cluster they overlap.
+    - Use -om majority or -om centroid to count each cell once (in the cluster with most of its voxels or at its centroid).
+    - Cluster volumes only include voxels of the cluster (voxels of other clusters within its bounding box are excluded).
+    - With several cluster indices (e.g., for each q value and effect direction), the segmentation is loaded (and cells are labeled) once per sample for the union of their outer bounds.
+    - With -inp nearestNeighbor and -zo 0 (defaults), several cluster indices are also warped together as one joint label image (one label per combination of cluster IDs) and decoded after warping.
+    - -o and -n can only be used with one cluster index.
 
 Next command:
     ``cstats_summary``
 
 Usage:
 ------
-    cstats_validation -m <path/rev_cluster_index_to_warp_from_atlas_space.nii.gz> -s <rel_path/seg_img.nii.gz> [-de cell_density | label_density] [-o rel_path/cluster_data.csv] [-c 1 3 4] [optional output: -n rel_path/native_cluster_index.zarr] [-fri autofl_50um_masked_fixed_reg_input.nii.gz] [-inp nearestNeighbor] [-ro reg_outputs] [-r 50] [-md parameters/metadata.txt] [-zo 0] [-mi] [-cc 6] [-d list of paths] [-p sample??] [-v]
+    cstats_validation -m <path/rev_cluster_index_to_warp_from_atlas_space.nii.gz> [path/*_rev_cluster_index*.nii.gz ...] -s <rel_path/seg_img.nii.gz> [-de cell_density | label_density] [-o rel_path/cluster_data.csv] [-c 1 3 4] [optional output: -n rel_path/native_cluster_index.zarr] [-fri autofl_50um_masked_fixed_reg_input.nii.gz] [-inp nearestNeighbor] [-ro reg_outputs] [-r 50] [-md parameters/metadata.txt] [-zo 0] [-mi] [-cc 6] [-om split] [-d list of paths] [-p sample??] [-v]
 """
 
 
-import concurrent.futures
 import cc3d
+import hashlib
+import nibabel as nib
 import numpy as np
-import os
 import pandas as pd
+import tempfile
 from pathlib import Path
 from rich import print
 from rich.live import Live
@@ -44,9 +51,10 @@ from rich.traceback import install
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 
 from unravel.core.config import Configuration 
-from unravel.core.img_io import load_3D_img, load_image_metadata_from_txt, load_nii_subset, resolve_path
-from unravel.core.img_tools import label_IDs
-from unravel.core.utils import get_pad_percent, log_command, verbose_start_msg, verbose_end_msg, initialize_progress_bar, get_samples, print_func_name_args_times
+from unravel.core.img_io import load_3D_img, load_image_metadata_from_txt, nii_to_ndarray, resolve_path
+from unravel.core.img_tools import label_IDs, label_stats, relabel
+from unravel.core.metadata_index import fingerprint
+from unravel.core.utils import get_pad_percent, log_command, match_files, verbose_start_msg, verbose_end_msg, initialize_progress_bar, get_samples, print_func_name_args_times
 from unravel.warp.to_native import to_native
 
 
@@ -54,7 +62,7 @@ def parse_args():
     parser = RichArgumentParser(formatter_class=SuppressMetavar, add_help=False, docstring=__doc__)
 
     reqs = parser.add_argument_group('Required arguments')
-    reqs.add_argument('-m', '--moving_img', help='path/*_rev_cluster_index.nii.gz to warp from atlas space', required=True, action=SM)
+    reqs.add_argument('-m', '--moving_img', help='path/*_rev_cluster_index.nii.gz to warp from atlas space (one or more paths or glob patterns)', nargs='+', required=True, action=SM)
     reqs.add_argument('-s', '--seg', help='rel_path/seg_img.nii.gz. 1st glob match processed', required=True, action=SM)
 
     opts = parser.add_argument_group('Optional args')
@@ -80,6 +88,7 @@ def parse_args():
     # Optional arg for count_cells()
     opts_cell_counts = parser.add_argument_group('Optional args for count_cells()')
     opts_cell_counts.add_argument('-cc', '--connect', help='Connected component connectivity (6, 18, or 26). Default: 6', type=int, default=6, action=SM)
+    opts_cell_counts.add_argument('-om', '--object_mapping', help='Assign cells to clusters: split (cells are split at cluster boundaries), majority (most voxels), or centroid. Default: split', choices=['split', 'majority', 'centroid'], default='split', action=SM)
     
     general = parser.add_argument_group('General arguments')
     general.add_argument('-d', '--dirs', help='Paths to sample?? dirs and/or dirs containing them (space-separated) for batch processing. Default: current dir', nargs='*', default=None, action=SM)
@@ -95,8 +104,9 @@ def parse_args():
 # TODO: Consider removing the -o option. Have I used this so far? If not, remove it.
 
 @print_func_name_args_times()
-def crop_outer_space(native_cluster_index, output_path):
-    """Crop outer space around all clusters and save bounding box to .txt file (outer_bounds.txt) 
+def crop_outer_space(native_cluster_index, output_path, offset=(0, 0, 0)):
+    """Crop outer space around all clusters and save bounding box to .txt file (outer_bounds.txt in output_path.parent; not saved if output_path is None) 
+    The offset (x, y, z) of native_cluster_index in the full res image (e.g., if it is already cropped) is added to the saved bounding box.
     Return cropped native_cluster_index, outer_xmin, outer_xmax, outer_ymin, outer_ymax, outer_zmin, outer_zmax"""
     
     # Create boolean arrays indicating presence of clusters along each axis
@@ -119,8 +129,9 @@ def crop_outer_space(native_cluster_index, output_path):
     native_cluster_index_cropped = native_cluster_index[outer_xmin:outer_xmax, outer_ymin:outer_ymax, outer_zmin:outer_zmax]
     
     # Save the bounding box to a file
-    with open(f"{output_path.parent}/outer_bounds.txt", "w") as file:
-        file.write(f"{outer_xmin}:{outer_xmax}, {outer_ymin}:{outer_ymax}, {outer_zmin}:{outer_zmax}") 
+    if output_path is not None:
+        with open(f"{output_path.parent}/outer_bounds.txt", "w") as file:
+            file.write(f"{outer_xmin + offset[0]}:{outer_xmax + offset[0]}, {outer_ymin + offset[1]}:{outer_ymax + offset[1]}, {outer_zmin + offset[2]}:{outer_zmax + offset[2]}") 
     
     return native_cluster_index_cropped, outer_xmin, outer_xmax, outer_ymin, outer_ymax, outer_zmin, outer_zmax
 
@@ -139,19 +150,15 @@ def cluster_bbox(cluster_ID, native_cluster_index_cropped):
 
 @print_func_name_args_times()
 def cluster_bbox_parallel(native_cluster_index_cropped, clusters):
-    """Get bounding boxes for each cluster in parallel. Return list of results."""
+    """Get bounding boxes for each cluster in one pass (parallel over z-slabs with label_stats). Return list of results (cluster_ID, xmin, xmax, ymin, ymax, zmin, zmax)."""
+    stats = label_stats(native_cluster_index_cropped).set_index('label')
     results = []
-    num_cores = os.cpu_count() # This is good for CPU-bound tasks. Could try 2 * num_cores + 1 for io-bound tasks
-    workers = min(num_cores, len(clusters))  
-    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-        future_to_cluster = {executor.submit(cluster_bbox, cluster_ID, native_cluster_index_cropped): cluster_ID for cluster_ID in clusters}
-        for future in concurrent.futures.as_completed(future_to_cluster):
-            cluster_ID = future_to_cluster[future]
-            try:
-                result = future.result()
-                results.append(result)
-            except Exception as exc:
-                print(f'Cluster {cluster_ID} generated an exception: {exc}')
+    for cluster_ID in clusters:
+        if cluster_ID not in stats.index:
+            print(f'Cluster {cluster_ID} is not in the native cluster index. Skipping.')
+            continue
+        row = stats.loc[cluster_ID]
+        results.append((cluster_ID, *(int(row[col]) for col in ('xmin', 'xmax', 'ymin', 'ymax', 'zmin', 'zmax'))))
     return results
 
 def count_cells(seg_in_cluster, connectivity=6):
@@ -168,51 +175,194 @@ def count_cells(seg_in_cluster, connectivity=6):
 
     return n
 
-def density_in_cluster(cluster_data, native_cluster_index_cropped, seg_cropped, xy_res, z_res, connectivity=6, density='cell_count'):
-    """Measure cell count or volume of segmented voxels in the current cluster.
-    For cell densities, return: cluster_ID, cell_count, cluster_volume_in_cubic_mm, cell_density, xmin, xmax, ymin, ymax, zmin, zmax
-    For label densities, return: cluster_ID, seg_volume_in_cubic_mm, cluster_volume_in_cubic_mm, label_density, xmin, xmax, ymin, ymax, zmin, zmax.
-    """
-    cluster_ID, xmin, xmax, ymin, ymax, zmin, zmax = cluster_data
-
-    # Crop the cluster from the native cluster index
-    cropped_cluster = native_cluster_index_cropped[xmin:xmax, ymin:ymax, zmin:zmax]
+def label_objects(seg, connectivity=6):
+    """Label connected components of a segmentation (> 0) with cc3d. Return (labels, n_objects)."""
+    seg_mask = np.ascontiguousarray(np.asarray(seg) > 0)
+    return cc3d.connected_components(seg_mask.view(np.uint8), connectivity=connectivity, out_dtype=np.uint32, return_N=True)
 
-    # Crop the segmentation image for the current cluster
-    seg_in_cluster = seg_cropped[xmin:xmax, ymin:ymax, zmin:zmax]
+@print_func_name_args_times()
+def joint_cluster_index(index_paths, output_path):
+    """Encode several atlas space cluster indices as one label image (a label for each combination of cluster IDs), so that they can be warped together.
+
+    Warping the joint index with nearest-neighbor interpolation and decoding it with decode_joint_cluster_index() gives the same result as warping each index.
+
+    Parameters
+    ----------
+    index_paths : list of str or Path
+        Cluster indices with the same shape (e.g., *_rev_cluster_index*.nii.gz for several q values and effect directions).
+    output_path : str or Path
+        Path to save the joint index (.nii.gz).
+
+    Returns
+    -------
+    ndarray
+        Combinations of cluster IDs (n_joint_labels + 1, n_indices). Row i holds the cluster IDs for joint label i (row 0 is all zeros).
+    """
+    ref_nii = nib.load(str(index_paths[0]))
+    indices = [nii_to_ndarray(path, scaling='raw') for path in index_paths]
+    if len({index.shape for index in indices}) != 1:
+        raise ValueError("All cluster indices must have the same shape.")
+    stack = np.stack([index.ravel() for index in indices], axis=1).astype(np.int64)
+    del indices
+
+    combinations, joint = np.unique(stack, axis=0, return_inverse=True)
+    joint = joint.ravel()
+    if combinations[0].any():  # Reserve 0 for voxels outside of all clusters
+        combinations = np.vstack([np.zeros((1, stack.shape[1]), dtype=combinations.dtype), combinations])
+        joint += 1
+    joint_dtype = np.uint16 if len(combinations) <= np.iinfo(np.uint16).max else np.uint32
+    joint_nii = nib.Nifti1Image(joint.reshape(ref_nii.shape[:3]).astype(joint_dtype), ref_nii.affine, ref_nii.header)
+    joint_nii.set_data_dtype(joint_dtype)
+    nib.save(joint_nii, str(output_path))
+    return combinations
+
+def decode_joint_cluster_index(joint_index, combinations, i):
+    """Return cluster index i from a (warped) joint cluster index (see joint_cluster_index())."""
+    return relabel(joint_index, np.arange(len(combinations)), combinations[:, i], default=0, dtype=np.min_scalar_type(int(combinations[:, i].max())))
+
+def map_objects_to_clusters(object_labels, cluster_index, n_objects, mapping='majority'):
+    """Map each object (e.g., a cell) to a cluster with a vectorized join.
+
+    Parameters
+    ----------
+    object_labels : ndarray
+        Labeled objects (e.g., from cc3d.connected_components), 0 = background.
+    cluster_index : ndarray
+        Cluster index with the shape of object_labels (0 = outside of clusters).
+    n_objects : int
+        Number of objects (max label).
+    mapping : str
+        'majority' (the cluster with the most voxels of the object; ties favor clusters over the outside)
+        or 'centroid' (the cluster at the rounded centroid of the object). Default: 'majority'.
+
+    Returns
+    -------
+    ndarray
+        Cluster ID for each object label (index 0 is unused; 0 = not in a cluster).
+    """
+    object_clusters = np.zeros(n_objects + 1, dtype=np.int64)
+    if mapping == 'centroid':
+        stats = label_stats(object_labels)
+        coords = np.rint(stats[['x_centroid', 'y_centroid', 'z_centroid']].to_numpy()).astype(np.intp)
+        coords = np.clip(coords, 0, np.array(object_labels.shape) - 1)
+        object_clusters[stats['label'].to_numpy()] = cluster_index[tuple(coords.T)]
+    elif mapping == 'majority':
+        in_object = object_labels > 0
+        objects = object_labels[in_object].astype(np.int64)
+        cluster_IDs, clusters = np.unique(cluster_index[in_object], return_inverse=True)
+        if not len(cluster_IDs):
+            return object_clusters
+
+        # Voxel counts for each (object, cluster) pair, then the pair with the most voxels for each object
+        pairs, counts = np.unique(objects * len(cluster_IDs) + clusters.ravel(), return_counts=True)
+        pair_objects, pair_clusters = pairs // len(cluster_IDs), cluster_IDs[pairs % len(cluster_IDs)].astype(np.int64)
+        order = np.lexsort((pair_clusters == 0, -counts, pair_objects))
+        first = order[np.r_[True, np.diff(pair_objects[order]) != 0]]
+        object_clusters[pair_objects[first]] = pair_clusters[first]
+    else:
+        raise ValueError(f"Invalid mapping: {mapping}. Use 'majority' or 'centroid'.")
+    return object_clusters
 
-    # Zero out segmented voxels outside of the current cluster
-    seg_in_cluster[cropped_cluster == 0] = 0
+@print_func_name_args_times()
+def cluster_densities(native_cluster_index_cropped, seg_cropped, clusters, xy_res, z_res, connectivity=6, density='cell_density', object_mapping='split', object_labels=None):
+    """Measure cell counts or volumes of segmented voxels in all clusters with one connected-components pass and one label statistics pass.
+
+    Parameters
+    ----------
+    native_cluster_index_cropped : ndarray
+        Cluster index in tissue space (cropped to the outer bounds of the clusters).
+    seg_cropped : ndarray
+        Segmentation with the shape of native_cluster_index_cropped (> 0 = segmented).
+    clusters : list of int
+        Cluster IDs to measure (clusters missing from the index are skipped).
+    xy_res, z_res : float
+        Resolution in microns.
+    connectivity : int
+        Connected component connectivity (6, 18, or 26). Default: 6.
+    density : str
+        'cell_density' or 'label_density'. Default: 'cell_density'.
+    object_mapping : str
+        How cells are assigned to clusters (for cell_density):
+        'split' (cells are split at cluster boundaries and each part is counted in its cluster),
+        'majority' (each cell is counted once in the cluster with most of its voxels), or
+        'centroid' (each cell is counted once in the cluster at its centroid). Default: 'split'.
+    object_labels : tuple, optional
+        (labels, n_objects) from labeling the segmentation beforehand (e.g., once for several cluster indices; a view with the shape of seg_cropped).
+        Used for 'majority' and 'centroid'. Default: None (labeled here).
+
+    Returns
+    -------
+    list of tuples
+        For cell densities: cluster_ID, cell_count, cluster_volume_in_cubic_mm, cell_density, xmin, xmax, ymin, ymax, zmin, zmax
+        For label densities: cluster_ID, seg_volume_in_cubic_mm, cluster_volume_in_cubic_mm, label_density, xmin, xmax, ymin, ymax, zmin, zmax
+        (bounding boxes are relative to the cropped cluster index; max is exclusive)
+    """
+    # If the data is big-endian, convert it to little-endian
+    if seg_cropped.dtype.byteorder == '>':
+        seg_cropped = seg_cropped.byteswap().newbyteorder()
+    seg_mask = seg_cropped > 0
+
+    # Cluster volumes, bounding boxes, and (for label densities) segmented voxel counts in one pass
+    stats = label_stats(native_cluster_index_cropped, intensity=seg_mask if density == 'label_density' else None).set_index('label')
+
+    # Label cells once and count them per cluster
+    if density == 'cell_density':
+        if object_mapping == 'split':  # Components of the cluster index masked by the segmentation do not cross cluster boundaries
+            cluster_seg = np.where(seg_mask, native_cluster_index_cropped, 0)
+            object_labels, n_objects = cc3d.connected_components(cluster_seg, connectivity=connectivity, out_dtype=np.uint32, return_N=True)
+            object_clusters = np.zeros(n_objects + 1, dtype=np.int64)
+            in_object = object_labels > 0
+            object_clusters[object_labels[in_object]] = cluster_seg[in_object]
+            del cluster_seg
+        else:
+            if object_labels is None:
+                object_labels = label_objects(seg_mask, connectivity)
+            object_labels, n_objects = object_labels
+            object_clusters = map_objects_to_clusters(object_labels, native_cluster_index_cropped, n_objects, mapping=object_mapping)
+        del object_labels
+        cell_cluster_IDs, cell_counts = np.unique(object_clusters[1:], return_counts=True)
+        cell_counts = dict(zip(cell_cluster_IDs.tolist(), cell_counts.tolist()))
+
+    voxel_volume_in_cubic_mm = ((xy_res**2) * z_res) / 1e9
+    results = []
+    for cluster_ID in clusters:
+        if cluster_ID not in stats.index:
+            print(f'Cluster {cluster_ID} is not in the native cluster index. Skipping.')
+            continue
+        row = stats.loc[cluster_ID]
+        bbox = tuple(int(row[col]) for col in ('xmin', 'xmax', 'ymin', 'ymax', 'zmin', 'zmax'))
+        cluster_volume_in_cubic_mm = voxel_volume_in_cubic_mm * row['count']
+        if density == 'cell_density':
+            cell_count = cell_counts.get(cluster_ID, 0)
+            results.append((cluster_ID, cell_count, cluster_volume_in_cubic_mm, cell_count / cluster_volume_in_cubic_mm, *bbox))
+        else:
+            seg_volume_in_cubic_mm = voxel_volume_in_cubic_mm * row['sum']
+            results.append((cluster_ID, seg_volume_in_cubic_mm, cluster_volume_in_cubic_mm, seg_volume_in_cubic_mm / cluster_volume_in_cubic_mm * 100, *bbox))
+    return results
 
-    # Measure cluster volume
-    cluster_volume_in_cubic_mm = ((xy_res**2) * z_res) * np.count_nonzero(cropped_cluster) / 1e9
 
-    # Count cells or measure the volume of segmented voxels
+def save_cluster_data(cluster_data_results, sample_name, density, output_path):
+    """Save the results of cluster_densities() to a .csv file (sorted by cluster ID)"""
     if density == "cell_density":
-        cell_count = count_cells(seg_in_cluster, connectivity=connectivity)
-        cell_density = cell_count / cluster_volume_in_cubic_mm
-        return cluster_ID, cell_count, cluster_volume_in_cubic_mm, cell_density, xmin, xmax, ymin, ymax, zmin, zmax
+        count_or_vol_header, density_header = "cell_count", "cell_density"
     else: 
-        seg_volume_in_cubic_mm = ((xy_res**2) * z_res) * np.count_nonzero(seg_in_cluster) / 1e9
-        label_density = seg_volume_in_cubic_mm / cluster_volume_in_cubic_mm * 100
-        return cluster_ID, seg_volume_in_cubic_mm, cluster_volume_in_cubic_mm, label_density, xmin, xmax, ymin, ymax, zmin, zmax
-    
-@print_func_name_args_times()
-def density_in_cluster_parallel(cluster_bbox_results, native_cluster_index_cropped, seg_cropped, xy_res, z_res, connectivity=6, density='cell_count'):
-    """Measure cell count or volume of segmented voxels in each cluster in parallel. Return list of results."""
-    results = []
-    num_cores = os.cpu_count()
-    workers = min(num_cores, len(cluster_bbox_results)) 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-        future_to_cluster = {executor.submit(density_in_cluster, cluster_data, native_cluster_index_cropped, seg_cropped, xy_res, z_res, connectivity, density): cluster_data[0] for cluster_data in cluster_bbox_results} # cluster_data[0] is the cluster_ID
-        for future in concurrent.futures.as_completed(future_to_cluster):
-            cluster_ID = future_to_cluster[future]
-            try:
-                result = future.result()
-                results.append(result)
-            except Exception as exc:
-                print(f'Cluster {cluster_ID} generated an exception: {exc}')
-    return results
+        count_or_vol_header, density_header = "label_volume", "label_density"
+
+    data_list = []
+    for result in cluster_data_results:
+        cluster_ID, cell_count_or_seg_vol, cluster_volume_in_cubic_mm, density_measure, xmin, xmax, ymin, ymax, zmin, zmax = result
+        data_list.append({
+            "sample": sample_name, 
+            "cluster_ID": cluster_ID, 
+            count_or_vol_header: cell_count_or_seg_vol,  
+            "cluster_volume": cluster_volume_in_cubic_mm, 
+            density_header: density_measure, 
+            "xmin": xmin, "xmax": xmax, "ymin": ymin, "ymax": ymax, "zmin": zmin, "zmax": zmax
+        })
+
+    df = pd.DataFrame(data_list, columns=["sample", "cluster_ID", count_or_vol_header, "cluster_volume", density_header, "xmin", "xmax", "ymin", "ymax", "zmin", "zmax"])
+    df.sort_values(by='cluster_ID', ascending=True).to_csv(output_path, index=False)
+    print(f"\n    Output: [default bold]{output_path}")
 
 
 @log_command
@@ -222,47 +372,44 @@ def main():
     Configuration.verbose = args.verbose
     verbose_start_msg()
 
+    index_paths = match_files(args.moving_img)
+    if len(index_paths) > 1 and (args.output or args.native_idx):
+        print("    [red1]-o and -n can only be used with one cluster index")
+        import sys ; sys.exit()
+
+    # Get clusters to process for each cluster index
+    if args.clusters == "all":
+        index_clusters = [[int(cluster) for cluster in label_IDs(load_3D_img(path, verbose=args.verbose))] for path in index_paths]
+    else:
+        index_clusters = [[int(cluster) for cluster in args.clusters]] * len(index_paths)
+
+    # With nearest-neighbor interpolation and scaling, warp the cluster indices together as one joint label image
+    joint = len(index_paths) > 1 and args.interpol == "nearestNeighbor" and args.zoom_order == 0
+    if joint:
+        joint_key = hashlib.sha1(str([(str(path.resolve()), fingerprint(path)) for path in index_paths]).encode()).hexdigest()[:12]
+        joint_dir = tempfile.TemporaryDirectory()  # Removed after the sample loop (or at exit if processing fails)
+        joint_path = Path(joint_dir.name, f"joint_rev_cluster_index_{joint_key}.nii.gz")
+        combinations = joint_cluster_index(index_paths, joint_path)
+
     sample_paths = get_samples(args.dirs, args.pattern, args.verbose)
 
     progress, task_id = initialize_progress_bar(len(sample_paths), "[red]Processing samples...")
     with Live(progress):
         for sample_path in sample_paths:
             
-            # Define final output and check if it exists
-            cluster_index_dir = str(Path(args.moving_img).name).replace(".nii.gz", "").replace("_rev_cluster_index_", "_")
-            if args.output:
-                output_path = resolve_path(sample_path, args.output)
-            else: 
-                output_path = resolve_path(sample_path, Path("clusters", cluster_index_dir, f"{args.density}_data.csv"), make_parents=True)
-            if output_path and output_path.exists():
-                print(f"\n\n    {output_path} already exists. Skipping.\n")
+            # Define final outputs and skip cluster indices that were already processed
+            output_paths = []
+            for index_path in index_paths:
+                cluster_index_dir = str(index_path.name).replace(".nii.gz", "").replace("_rev_cluster_index_", "_")
+                if args.output:
+                    output_paths.append(resolve_path(sample_path, args.output))
+                else: 
+                    output_paths.append(resolve_path(sample_path, Path("clusters", cluster_index_dir, f"{args.density}_data.csv"), make_parents=True))
+            pending = [i for i, output_path in enumerate(output_paths) if not (output_path and output_path.exists())]
+            for i in set(range(len(index_paths))) - set(pending):
+                print(f"\n\n    {output_paths[i]} already exists. Skipping.\n")
+            if not pending:
                 continue
-            
-            # Use lower bit-depth possible for cluster index
-            rev_cluster_index = load_3D_img(args.moving_img, verbose=args.verbose)
-
-            # Define paths relative to sample?? folder 
-            native_idx_path = resolve_path(sample_path, args.native_idx) if args.native_idx else None
-            
-            # Load cluster index and convert to ndarray 
-            if args.native_idx and Path(args.native_idx).exists():
-                native_cluster_index = load_3D_img(Path(args.native_idx), verbose=args.verbose)
-            else:
-                fixed_reg_input = Path(sample_path, args.reg_outputs, args.fixed_reg_in) 
-                if not fixed_reg_input.exists():
-                    fixed_reg_input = sample_path / args.reg_outputs / "autofl_50um_fixed_reg_input.nii.gz"
-                pad_percent = get_pad_percent(sample_path / args.reg_outputs, args.pad_percent)
-                native_cluster_index = to_native(sample_path, args.reg_outputs, fixed_reg_input, args.moving_img, args.metadata, args.reg_res, args.miracl, args.zoom_order, args.interpol, output=native_idx_path, pad_percent=pad_percent)
-
-            # Get clusters to process
-            if args.clusters == "all":
-                clusters = label_IDs(rev_cluster_index)
-            else:
-                clusters = args.clusters
-            clusters = [int(cluster) for cluster in clusters]
-
-            # Crop outer space around all clusters 
-            native_cluster_index_cropped, outer_xmin, outer_xmax, outer_ymin, outer_ymax, outer_zmin, outer_zmax = crop_outer_space(native_cluster_index, output_path)
 
             # Load image metadata from .txt
             metadata_path = resolve_path(sample_path, args.metadata)
@@ -270,56 +417,66 @@ def main():
             if xy_res is None or z_res is None: 
                 print("    [red bold]./sample??/parameters/metadata.txt missing. cd to sample?? dir and run: io_metadata")
 
-            # Get bounding boxes for each cluster in parallel
-            cluster_bbox_data = cluster_bbox_parallel(native_cluster_index_cropped, clusters)
-
-            # Load the segmentation image and crop it to the outer bounds of all clusters
             seg_path = next(sample_path.glob(str(args.seg)), None)
             if seg_path is None:
                 print(f"\n    [red bold]No files match the pattern {args.seg} in {sample_path}\n")
                 continue
-            seg_cropped = load_nii_subset(seg_path, outer_xmin, outer_xmax, outer_ymin, outer_ymax, outer_zmin, outer_zmax)
-
-            # Process each cluster to count cells or measure volume, in parallel
-            cluster_data_results = density_in_cluster_parallel(cluster_bbox_data, native_cluster_index_cropped, seg_cropped, xy_res, z_res, args.connect, args.density)
 
-            # Process cluster_data_results to save to CSV or perform further analysis
-            data_list = []
-            for result in cluster_data_results:
-                cluster_ID, cell_count_or_seg_vol, cluster_volume_in_cubic_mm, density_measure, xmin, xmax, ymin, ymax, zmin, zmax = result
-
-                # Determine the appropriate headers based on the density measure type
-                if args.density == "cell_density":
-                    count_or_vol_header, density_header = "cell_count", "cell_density"
-                else: 
-                    count_or_vol_header, density_header = "label_volume", "label_density"
-
-                # Prepare the data dictionary
-                data = {
-                    "sample": sample_path.name, 
-                    "cluster_ID": cluster_ID, 
-                    count_or_vol_header: cell_count_or_seg_vol,  
-                    "cluster_volume": cluster_volume_in_cubic_mm, 
-                    density_header: density_measure, 
-                    "xmin": xmin, "xmax": xmax, "ymin": ymin, "ymax": ymax, "zmin": zmin, "zmax": zmax
-                }
-
-                data_list.append(data)
-            
-            # Create a DataFrame from the list of data dictionaries
-            df = pd.DataFrame(data_list)
-
-            # Sort the DataFrame by 'cluster_ID' in ascending order
-            df_sorted = df.sort_values(by='cluster_ID', ascending=True)
-
-            # Save the sorted DataFrame to the CSV file
-            df_sorted.to_csv(output_path, index=False)
-            print(f"\n    Output: [default bold]{output_path}")
+            # Define paths relative to sample?? folder 
+            native_idx_path = resolve_path(sample_path, args.native_idx) if args.native_idx else None
+            fixed_reg_input = Path(sample_path, args.reg_outputs, args.fixed_reg_in) 
+            if not fixed_reg_input.exists():
+                fixed_reg_input = sample_path / args.reg_outputs / "autofl_50um_fixed_reg_input.nii.gz"
+            pad_percent = get_pad_percent(sample_path / args.reg_outputs, args.pad_percent)
+
+            if joint:  # Warp once, crop to the outer bounds of all clusters, and decode each cluster index
+                native_joint_index = to_native(sample_path, args.reg_outputs, fixed_reg_input, joint_path, args.metadata, args.reg_res, args.miracl, args.zoom_order, args.interpol, pad_percent=pad_percent, cache_metadata=False)
+                native_joint_index, joint_xmin, _, joint_ymin, _, joint_zmin, _ = crop_outer_space(native_joint_index, None)
+                offset = (joint_xmin, joint_ymin, joint_zmin)
+                native_indices = {i: decode_joint_cluster_index(native_joint_index, combinations, i) for i in pending}
+                del native_joint_index
+            else:
+                offset = (0, 0, 0)
+                native_indices = {}
+                for i in pending:
+                    if args.native_idx and Path(args.native_idx).exists():
+                        native_indices[i] = load_3D_img(Path(args.native_idx), verbose=args.verbose)
+                    else:
+                        native_indices[i] = to_native(sample_path, args.reg_outputs, fixed_reg_input, index_paths[i], args.metadata, args.reg_res, args.miracl, args.zoom_order, args.interpol, output=native_idx_path, pad_percent=pad_percent)
+
+            # Crop outer space around the clusters of each cluster index (bounds are relative to the full res image)
+            native_crops, outer_bounds = {}, {}
+            for i in pending:
+                native_crops[i], xmin, xmax, ymin, ymax, zmin, zmax = crop_outer_space(native_indices.pop(i), output_paths[i], offset)
+                outer_bounds[i] = np.array([xmin, xmax, ymin, ymax, zmin, zmax]) + np.repeat(offset, 2)
+
+            # Load the segmentation (and label cells) once for the union of the outer bounds
+            union_mins = np.min([bounds[::2] for bounds in outer_bounds.values()], axis=0)
+            union_maxs = np.max([bounds[1::2] for bounds in outer_bounds.values()], axis=0)
+            union_bbox = tuple((int(lo), int(hi)) for lo, hi in zip(union_mins, union_maxs))
+            seg_union = load_3D_img(seg_path, bbox=union_bbox, verbose=args.verbose)
+            if seg_union.dtype.byteorder == '>':
+                seg_union = seg_union.byteswap().newbyteorder()
+            object_labels = None
+            if args.density == "cell_density" and args.object_mapping != "split":
+                object_labels, n_objects = label_objects(seg_union, args.connect)
+
+            for i in pending:
+                crop = tuple(slice(lo - union_lo, hi - union_lo) for lo, hi, union_lo in zip(outer_bounds[i][::2], outer_bounds[i][1::2], union_mins))
+                seg_cropped = seg_union[crop]
+                labels_cropped = (object_labels[crop], n_objects) if object_labels is not None else None
+
+                # Count cells or measure the volume of segmented voxels in all clusters (one connected-components pass and one label statistics pass)
+                cluster_data_results = cluster_densities(native_crops.pop(i), seg_cropped, index_clusters[i], xy_res, z_res, args.connect, args.density, args.object_mapping, object_labels=labels_cropped)
+                save_cluster_data(cluster_data_results, sample_path.name, args.density, output_paths[i])
 
             progress.update(task_id, advance=1)
 
+    if joint:
+        joint_dir.cleanup()
+
     verbose_end_msg()
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -37,6 +37,7 @@ Classes:
         - Holds global configuration settings.
         - Attributes:
             - verbose: A boolean flag to control verbosity of the application.
+            - gzip_threads: Number of threads for reading/writing .nii.gz files (None: UNRAVEL_GZIP_THREADS env var, otherwise 1; values > 1 enable the block-gzip codec).
 
 Note:
     - The Config class uses the RawConfigParser from the configparser module to parse the configuration file.
@@ -72,4 +73,5 @@ class Config:
     
 class Configuration:
     """A class to hold configuration settings."""
-    verbose = False
\ No newline at end of file
+    verbose = False
+    gzip_threads = None
\ No newline at end of file
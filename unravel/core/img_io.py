@@ -5,21 +5,38 @@ This module contains functions for loading and saving 3D images.
 
 Main Functions:
 ---------------
-- load_3D_img: Load a 3D image from a .czi, .nii.gz, or .tif series and return the ndarray.
+- load_3D_img: Load a 3D image from a .czi, .nii.gz, or .tif series and return the ndarray (or a lazy dask array with lazy=True).
 - save_3D_img: Save a 3D image as a .nii.gz, .tif series, .h5, or .zarr file.
 
 Helper Functions:
 -----------------
 - extract_resolution
+- read_img_header
+- img_metadata
 - load_image_metadata_from_txt
 - save_metadata_to_file
+- write_nii_slabs
+- iter_nii_slabs
+- NiiSlabWriter
 - metadata
 - return_3D_img
+- cast_3D_img
+- read_nii
+- nii_raw_proxy
+- decode_nii_block
+- load_single_tif
+- czi_plane_reader
+- read_czi
+- bbox_to_slices
+- zarr_levels
+- h5_levels
+- read_zarr_selection
 """
 
 import json
 import os
 import re
+import threading
 import cv2 
 import dask.array as da
 import h5py
@@ -30,17 +47,49 @@ import xml.etree.ElementTree as ET
 import zarr
 from aicspylibczi import CziFile
 from concurrent.futures import ThreadPoolExecutor
+from dask import delayed
+from functools import partial
 from glob import glob
 from lxml import etree
 from pathlib import Path
 from rich import print
 
+from unravel.core.metadata_index import INDEX_NAME, cache_img_metadata, find_index_path, fingerprint, get_cached_img_metadata, load_index, update_index
+from unravel.core.parallel_gzip import parallel_gzip_enabled, use_parallel_gzip
 from unravel.core.utils import match_files, print_func_name_args_times
 
+# Optionally read and write .nii.gz files with the multithreaded block-gzip codec (UNRAVEL_GZIP_THREADS or Configuration.gzip_threads > 1)
+if parallel_gzip_enabled():
+    use_parallel_gzip()
+
 
 # TODO: save_as_nii() add logic for using the reference image for dtype (e.g., if reference is provided and dtype is None, use reference dtype)
 # TODO: Add support for extracting metadata from .zarr files.
 
+def bbox_to_slices(bbox):
+    """
+    Convert a bounding box to a tuple of 3 slices (one per axis, in the same axis order as the bbox).
+
+    Parameters
+    ----------
+    bbox : str, tuple, or None
+        'xmin:xmax, ymin:ymax, zmin:zmax' (format of bbox .txt files; an empty bound means the start/end of the axis), 
+        a tuple of three (min, max) pairs, or a tuple of three slices. 
+
+    Returns
+    -------
+    tuple of slice
+        Slices for the 1st, 2nd, and 3rd axes (all slice(None) if bbox is None).
+    """
+    if bbox is None:
+        return (slice(None),) * 3
+    if isinstance(bbox, str):
+        bounds = [axis_bounds.split(':') for axis_bounds in bbox.split(',')]
+        bbox = [[int(b) if b.strip() else None for b in axis_bounds] for axis_bounds in bounds]
+    if len(bbox) != 3:
+        raise ValueError(f"Expected a bounding box for 3 axes, got: {bbox}")
+    return tuple(b if isinstance(b, slice) else slice(*b) for b in bbox)
+
 @print_func_name_args_times()
 def return_3D_img(ndarray, return_metadata=False, return_res=False, xy_res=None, z_res=None, x_dim=None, y_dim=None, z_dim=None):
     """
@@ -159,20 +208,172 @@ def extract_resolution(img_path):
         res = nii.header.get_zooms() # (x, y, z) in mm
         xy_res = res[0] * 1000 # Convert from mm to um
         z_res = res[2] * 1000
-    elif str(img_path).endswith('.h5'):
-        with h5py.File(h5py, 'r') as f:
-            full_res_dataset_name = next(iter(f.keys())) # Assumes that full res data is 1st in the dataset list
-            print(f"\n    Loading HDF5 dataset: {full_res_dataset_name}\n")
-            dataset = f[full_res_dataset_name] 
-            res = dataset.attrs['element_size_um'] # z, y, x voxel sizes in microns (ndarray)
-            xy_res = res[1]
-            z_res = res[0]
+    elif str(img_path).endswith('.h5') or str(img_path).endswith('.ims'):
+        with h5py.File(img_path, 'r') as f:
+            if 'DataSetInfo/Image' in f: # Imaris: physical extents / image size (level 0)
+                info = f['DataSetInfo/Image'].attrs
+                xy_res = (_ims_attr(info, 'ExtMax0') - _ims_attr(info, 'ExtMin0')) / _ims_attr(info, 'X')
+                z_res = (_ims_attr(info, 'ExtMax2') - _ims_attr(info, 'ExtMin2')) / _ims_attr(info, 'Z')
+            else:
+                dataset = f[_h5_levels(f)[0][0]] # Full res dataset
+                if 'element_size_um' in dataset.attrs:
+                    res = dataset.attrs['element_size_um'] # z, y, x voxel sizes in microns (ndarray)
+                    xy_res = float(res[1])
+                    z_res = float(res[0])
     return xy_res, z_res
 
+def _ims_attr(attrs, name):
+    """Return an Imaris attribute (stored as an array of single characters) as a float."""
+    return float(np.asarray(attrs[name]).tobytes().decode())
+
+def _h5_levels(f, channel=0):
+    """Return (dataset path, (z, y, x) shape without padding, (z, y, x) scale relative to level 0) for each resolution level in an open HDF5 file."""
+    levels = []
+    if 'DataSet' in f: # Imaris: DataSet/ResolutionLevel <i>/TimePoint 0/Channel <c>/Data (padded to the chunk shape)
+        level_names = sorted((k for k in f['DataSet'] if k.startswith('ResolutionLevel')), key=lambda k: int(k.split()[-1]))
+        for name in level_names:
+            group = f[f'DataSet/{name}/TimePoint 0/Channel {channel}']
+            shape = tuple(int(_ims_attr(group.attrs, f'ImageSize{axis}')) for axis in 'ZYX')
+            levels.append((f'{group.name}/Data', shape))
+    elif f's{channel:02d}/resolutions' in f: # BigDataViewer: t00000/s<c>/<i>/cells with xyz downsampling factors in s<c>/resolutions
+        factors = f[f's{channel:02d}/resolutions'][()]
+        levels = [(f't00000/s{channel:02d}/{i}/cells', f[f't00000/s{channel:02d}/{i}/cells'].shape) for i in range(len(factors))]
+        return [(path, shape, tuple(float(x) for x in factor[::-1])) for (path, shape), factor in zip(levels, factors)]
+    else: # Datasets at the root (e.g., from save_as_h5), with the first dataset at full res
+        levels = [(name, dataset.shape[-3:]) for name, dataset in f.items() if isinstance(dataset, h5py.Dataset)]
+    if not levels:
+        raise ValueError(f"No image datasets found in {f.filename}")
+    full_res_shape = levels[0][1]
+    return [(path, shape, tuple(d0 / d for d0, d in zip(full_res_shape, shape))) for path, shape in levels]
+
+def h5_levels(hdf5_path, channel=0):
+    """
+    List the resolution levels of an HDF5 image (Imaris .ims, BigDataViewer .h5, or datasets at the root of a .h5 file).
+
+    Parameters
+    ----------
+    hdf5_path : str or Path
+        Path to the .h5 or .ims file.
+    channel : int, optional
+        Channel (Imaris) or setup (BigDataViewer) index. Default is 0.
+
+    Returns
+    -------
+    list of tuples
+        (dataset path, (z, y, x) shape, (z, y, x) downsampling factors relative to level 0) for each level, from highest to lowest resolution.
+    """
+    with h5py.File(hdf5_path, 'r') as f:
+        return _h5_levels(f, channel)
+
+CZI_PIXEL_TYPES = {'gray8': np.uint8, 'gray16': np.uint16, 'gray32': np.uint32, 'gray32float': np.float32}
+
+def czi_plane_reader(czi_path, channel=0, scene=None):
+    """
+    Return a function that reads one z-plane of a .czi channel as a 2D ndarray (y, x), along with the (z, y, x) shape and dtype of the channel.
+
+    Mosaic files are stitched per plane by libCZI (only the tiles overlapping the requested region are read).
+    The function takes the z index and optional (y, x) slices, which are passed to libCZI as a region so that only that region is read.
+    Each thread opens its own CziFile, so planes can be read concurrently (e.g., by dask or a ThreadPoolExecutor).
+    """
+    czi = CziFile(czi_path)
+    dims = czi.get_dims_shape()[0]
+    dtype = CZI_PIXEL_TYPES.get(czi.pixel_type.lower())
+    if dtype is None:
+        raise ValueError(f"Unsupported .czi pixel type: {czi.pixel_type}")
+
+    # Plane constraints other than Z (first index of T, S, etc. unless a scene is specified)
+    constraints = {'C': channel}
+    for dim, (start, _) in dims.items():
+        if dim not in ('X', 'Y', 'Z', 'C', 'M', 'A'):
+            constraints[dim] = start
+    if scene is not None:
+        constraints['S'] = scene
+    z_start, z_stop = dims.get('Z', (0, 1))
+
+    # Mosaic plane bounding box in libCZI's global pixel coordinates (of the scene, if any)
+    mosaic = czi.is_mosaic()
+    if mosaic: # Scenes are selected by their bounding box (libCZI does not accept S for mosaic reads)
+        bbox = czi.get_mosaic_scene_bounding_box(constraints.pop('S')) if 'S' in constraints else czi.get_mosaic_bounding_box()
+        y_dim, x_dim = bbox.h, bbox.w
+    else:
+        if dims.get('M', (0, 1))[1] - dims.get('M', (0, 1))[0] > 1:
+            raise ValueError(f".czi channel {channel} has tiles without mosaic metadata. Please stitch tiles from {Path(czi_path).name}")
+        y_dim = dims['Y'][1] - dims['Y'][0]
+        x_dim = dims['X'][1] - dims['X'][0]
+
+    thread_data = threading.local()
+
+    def read_plane(z, yx_slices=None):
+        if not hasattr(thread_data, 'czi'):
+            thread_data.czi = CziFile(czi_path)
+        yx_slices = yx_slices if yx_slices is not None else (slice(None), slice(None))
+        plane_constraints = dict(constraints, Z=z_start + z) if 'Z' in dims else constraints
+        if mosaic: # Only the tiles overlapping the region are read and stitched
+            (y0, y1), (x0, x1) = yx_slices[0].indices(y_dim)[:2], yx_slices[1].indices(x_dim)[:2]
+            region = (bbox.x + x0, bbox.y + y0, max(x1 - x0, 0), max(y1 - y0, 0))
+            plane = thread_data.czi.read_mosaic(region=region, scale_factor=1.0, **plane_constraints)
+            return np.asarray(plane).reshape(region[3], region[2])
+        plane = thread_data.czi.read_image(**plane_constraints)[0]
+        return np.asarray(plane).reshape(y_dim, x_dim)[tuple(yx_slices)]
+
+    return read_plane, (z_stop - z_start, y_dim, x_dim), np.dtype(dtype)
+
+def read_czi(czi_path, out=None, channel=0, scene=None, zyx_slices=None, max_workers=None):
+    """
+    Read z-planes of a .czi channel (or mosaic scene) in parallel threads straight into a (z, y, x) destination.
+
+    Parameters
+    ----------
+    czi_path : str or Path
+        The path to the .czi file.
+    out : ndarray, np.memmap, or zarr.Array, optional
+        Preallocated destination with the (z, y, x) shape of the selection. Default is None (a new ndarray).
+    channel : int, optional
+        The channel to read. Default is 0.
+    scene : int, optional
+        The scene to read (e.g., for mosaic files with several scenes). Default is None (first scene).
+    zyx_slices : tuple of slices, optional
+        Region to read in (z, y, x) order. Default is None (full volume).
+    max_workers : int, optional
+        Number of threads. Default is None (ThreadPoolExecutor default).
+
+    Returns
+    -------
+    ndarray or zarr.Array
+        The destination filled with the image.
+
+    Note:
+        - Memory use is bounded by one plane per thread (or one chunk of planes per thread for zarr destinations).
+        - For zarr destinations, each thread writes whole z-chunks so that threads do not write to the same chunk.
+    """
+    read_plane, shape, dtype = czi_plane_reader(czi_path, channel, scene)
+    zyx_slices = zyx_slices if zyx_slices is not None else (slice(None),) * 3
+    z_indices = range(shape[0])[zyx_slices[0]]
+    yx_slices = tuple(slice(*s.indices(d)[:2]) for s, d in zip(zyx_slices[1:], shape[1:]))
+    out_shape = (len(z_indices),) + tuple(s.stop - s.start for s in yx_slices)
+    if out is None:
+        out = np.empty(out_shape, dtype=dtype)
+    elif tuple(out.shape) != out_shape:
+        raise ValueError(f"Destination shape {out.shape} does not match the .czi selection {out_shape}")
+
+    # Groups of planes written together (one plane, or one z-chunk for zarr destinations)
+    step = out.chunks[0] if isinstance(out, zarr.Array) else 1
+    groups = [range(i, min(i + step, len(z_indices))) for i in range(0, len(z_indices), step)]
+
+    def read_group(group):
+        if step == 1:
+            out[group[0]] = read_plane(z_indices[group[0]], yx_slices)
+        else:
+            out[group[0]:group[-1] + 1] = np.stack([read_plane(z_indices[i], yx_slices) for i in group])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(read_group, groups))
+    return out
+
 @print_func_name_args_times()
-def load_czi(czi_path, channel=0, desired_axis_order="xyz", return_res=False, return_metadata=False, save_metadata=None, xy_res=None, z_res=None):
+def load_czi(czi_path, channel=0, desired_axis_order="xyz", return_res=False, return_metadata=False, save_metadata=None, xy_res=None, z_res=None, lazy=False, bbox=None, scene=None, memmap_path=None, max_workers=None):
     """
-    Load a .czi image and return the ndarray.
+    Load a .czi image (including mosaic files, which are stitched per plane) and return the ndarray.
 
     Parameters
     ----------
@@ -192,6 +393,16 @@ def load_czi(czi_path, channel=0, desired_axis_order="xyz", return_res=False, re
         The resolution in the xy-plane.
     z_res : float, optional
         The resolution in the z-plane.
+    lazy : bool, optional
+        If True, return a dask array with one chunk per z-plane instead of loading the image into memory. Default is False.
+    bbox : str or tuple, optional
+        Bounding box in desired_axis_order (see bbox_to_slices()). If provided, only the z-planes and (y, x) region in the bbox are read. Default is None.
+    scene : int, optional
+        The scene to load (e.g., for mosaic files with several scenes). Default is None (first scene).
+    memmap_path : str or Path, optional
+        If provided, planes are read into a .npy memory-mapped file at this path instead of RAM. Default is None.
+    max_workers : int, optional
+        Number of threads for reading planes. Default is None (ThreadPoolExecutor default).
 
     Returns
     -------
@@ -202,22 +413,57 @@ def load_czi(czi_path, channel=0, desired_axis_order="xyz", return_res=False, re
     tuple, optional
         If return_metadata is True, returns (ndarray, xy_res, z_res, x_dim, y_dim, z_dim).
     """
-    czi = CziFile(czi_path)
-    ndarray = np.squeeze(czi.read_image(C=channel)[0])
-
-    if ndarray.ndim == 4:
-        print(f"\n[red1].czi channel {channel} has 4 axes. Please stitch tiles from {Path(czi_path).name}\n")
-        import sys ; sys.exit()
-
-    ndarray = np.transpose(ndarray, (2, 1, 0)) if desired_axis_order == "xyz" else ndarray
+    slices = bbox_to_slices(bbox)
+    zyx_slices = slices[::-1] if desired_axis_order == "xyz" else slices
+    if lazy:
+        read_plane, shape, dtype = czi_plane_reader(czi_path, channel, scene)
+        yx_slices = tuple(slice(*s.indices(d)[:2]) for s, d in zip(zyx_slices[1:], shape[1:]))
+        plane_shape = tuple(s.stop - s.start for s in yx_slices)
+        planes = [da.from_delayed(delayed(read_plane)(z, yx_slices), shape=plane_shape, dtype=dtype) for z in range(shape[0])[zyx_slices[0]]]
+        ndarray = da.stack(planes, axis=0)
+    else:
+        out = None
+        if memmap_path is not None:
+            _, shape, dtype = czi_plane_reader(czi_path, channel, scene)
+            out_shape = tuple(len(range(d)[s]) for s, d in zip(zyx_slices, shape))
+            Path(memmap_path).parent.mkdir(parents=True, exist_ok=True)
+            out = np.lib.format.open_memmap(memmap_path, mode='w+', dtype=dtype, shape=out_shape)
+        ndarray = read_czi(czi_path, out, channel, scene, zyx_slices, max_workers)
+
+    ndarray = ndarray.transpose(2, 1, 0) if desired_axis_order == "xyz" else ndarray
     xy_res, z_res, x_dim, y_dim, z_dim = metadata(czi_path, ndarray, return_res, return_metadata, xy_res, z_res, save_metadata)
     return return_3D_img(ndarray, return_metadata, return_res, xy_res, z_res, x_dim, y_dim, z_dim)
     
+def load_single_tif(tif_file, yx_slices=None, out=None):
+    """Load a single .tif file using OpenCV and return the ndarray. 
+
+    If yx_slices (slices for rows and columns) are provided, only the TIFF strips/tiles overlapping them are read.
+    If out (a preallocated 2D array, e.g., a slice of a 3D array) is provided, the image is decoded into it (uncompressed 
+    TIFFs are read straight into out; compressed TIFFs are decoded with OpenCV and copied into out)."""
+    if yx_slices is not None:
+        with tifffile.TiffFile(tif_file) as tif:
+            return zarr.open(tif.aszarr(), mode='r').get_basic_selection(tuple(yx_slices), out=out)
+    if out is not None:
+        with tifffile.TiffFile(tif_file) as tif:
+            page = tif.pages[0]
+            if page.compression == 1 and page.shape == out.shape:  # 1 = uncompressed
+                return page.asarray(out=out)
+    img = cv2.imread(str(tif_file), cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise ValueError(f"Failed to load image: {tif_file}")
+    if out is not None:
+        out[...] = img
+        return out
+    return img
+
 @print_func_name_args_times()
-def load_tifs(tif_dir_path, desired_axis_order="xyz", return_res=False, return_metadata=False, save_metadata=None, xy_res=None, z_res=None, parallel_loading=True):
+def load_tifs(tif_dir_path, desired_axis_order="xyz", return_res=False, return_metadata=False, save_metadata=None, xy_res=None, z_res=None, parallel_loading=True, lazy=False, bbox=None, memmap_path=None, max_workers=None):
     """
     Load a series of .tif images and return the ndarray.
 
+    The header of the first slice is used to preallocate the 3D array, and each slice is decoded straight into it 
+    (peak memory is ~1x the image size). For xyz order, a transposed view of the (z, y, x) array is returned (no copy).
+
     Parameters
     ----------
     tif_dir_path : str
@@ -236,6 +482,14 @@ def load_tifs(tif_dir_path, desired_axis_order="xyz", return_res=False, return_m
         The resolution in the z-plane.
     parallel_loading : bool, optional
         Whether to load images in parallel. Default is True.
+    lazy : bool, optional
+        If True, return a dask array with one chunk per slice instead of loading the image into memory. Default is False.
+    bbox : str or tuple, optional
+        Bounding box in desired_axis_order (see bbox_to_slices()). If provided, only the slices in the bbox are opened and only the rows/columns in the bbox are read. Default is None.
+    memmap_path : str or Path, optional
+        If provided, the slices are decoded into a memory-mapped .npy file at this path (zyx order) instead of RAM. Default is None.
+    max_workers : int, optional
+        Number of threads for parallel loading. Default is None (ThreadPoolExecutor default).
 
     Returns
     -------
@@ -246,26 +500,65 @@ def load_tifs(tif_dir_path, desired_axis_order="xyz", return_res=False, return_m
     tuple, optional
         If return_metadata is True, returns (ndarray, xy_res, z_res, x_dim, y_dim, z_dim).
     """
-    def load_single_tif(tif_file):
-        """Load a single .tif file using OpenCV and return the ndarray."""
-        img = cv2.imread(str(tif_file), cv2.IMREAD_UNCHANGED)
-        if img is None:
-            raise ValueError(f"Failed to load image: {tif_file}")
-        return img
-    tif_files = match_files('*.tif', base_path=tif_dir_path)
-    if parallel_loading:
-        with ThreadPoolExecutor() as executor:
-            tifs_stacked = list(executor.map(load_single_tif, tif_files))
+    all_tif_files = match_files('*.tif', base_path=tif_dir_path)
+    slices = bbox_to_slices(bbox)
+    zyx_slices = slices[::-1] if desired_axis_order == "xyz" else slices
+    tif_files = all_tif_files[zyx_slices[0]]
+    yx_slices = zyx_slices[1:] if bbox is not None else None
+
+    # Get the slice shape and dtype from the header of the first slice
+    with tifffile.TiffFile(tif_files[0]) as tif:
+        slice_shape, slice_dtype = tif.pages[0].shape, tif.pages[0].dtype
+    if yx_slices is not None:
+        slice_shape = tuple(len(range(dim)[s]) for dim, s in zip(slice_shape, yx_slices))
+    shape = (len(tif_files), *slice_shape)
+
+    if lazy:
+        slices = [da.from_delayed(delayed(load_single_tif)(tif_file, yx_slices), shape=slice_shape, dtype=slice_dtype) for tif_file in tif_files]
+        ndarray = da.stack(slices, axis=0)
     else:
-        tifs_stacked = []
-        for tif_file in tif_files:
-            tifs_stacked.append(load_single_tif(tif_file))
-    ndarray = np.stack(tifs_stacked, axis=0)
-    ndarray = np.transpose(ndarray, (2, 1, 0)) if desired_axis_order == "xyz" else ndarray
+        # Preallocate the (z, y, x) array and decode each slice into it
+        if memmap_path is not None:
+            Path(memmap_path).parent.mkdir(parents=True, exist_ok=True)
+            ndarray = np.lib.format.open_memmap(memmap_path, mode='w+', dtype=slice_dtype, shape=shape)
+        else:
+            ndarray = np.empty(shape, dtype=slice_dtype)
+
+        def load_tif(i):
+            load_single_tif(tif_files[i], yx_slices, out=ndarray[i])
+
+        if parallel_loading:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(load_tif, range(len(tif_files))))
+        else:
+            for i in range(len(tif_files)):
+                load_tif(i)
+    ndarray = ndarray.transpose(2, 1, 0) if desired_axis_order == "xyz" else ndarray
     xy_res, z_res, x_dim, y_dim, z_dim = metadata(tif_files[0], ndarray, return_res, return_metadata, xy_res, z_res, save_metadata)
     return return_3D_img(ndarray, return_metadata, return_res, xy_res, z_res, x_dim, y_dim, z_dim)
 
-def load_3D_tif(tif_path, desired_axis_order="xyz", return_res=False, return_metadata=False, save_metadata=None, xy_res=None, z_res=None):
+class _ReopeningArray:
+    """Array-like wrapper for dask that opens the file for each read (lazy arrays then hold no open file handles, e.g., in batch loops)."""
+    def __init__(self, read_region, shape, dtype):
+        self.read_region = read_region
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.ndim = len(self.shape)
+
+    def __getitem__(self, key):
+        return self.read_region(key)
+
+def _read_tif_region(tif_path, key):
+    """Read a region of the level 0 series of a .tif file (only the pages and strips/tiles in the region are decoded)."""
+    with tifffile.TiffFile(tif_path) as tif:
+        return zarr.open(tif.aszarr(level=0), mode='r')[key]
+
+def _read_h5_region(hdf5_path, dataset_path, key):
+    """Read a hyperslab of an HDF5 dataset."""
+    with h5py.File(hdf5_path, 'r') as f:
+        return f[dataset_path][key]
+
+def load_3D_tif(tif_path, desired_axis_order="xyz", return_res=False, return_metadata=False, save_metadata=None, xy_res=None, z_res=None, lazy=False, bbox=None):
     """
     Load a 3D .ome.tif or .tif image and return the ndarray.
 
@@ -277,6 +570,10 @@ def load_3D_tif(tif_path, desired_axis_order="xyz", return_res=False, return_met
         The desired order of the image axes. Default is 'xyz'.
     return_res : bool, optional
         Whether to return resolutions (works for .ome.tif). Default is False.
+    lazy : bool, optional
+        If True, return a dask array backed by the TIFF pages/tiles instead of loading the image into memory. Default is False.
+    bbox : str or tuple, optional
+        Bounding box in desired_axis_order (see bbox_to_slices()). If provided, only the pages and strips/tiles in the bbox are read. Default is None.
 
     Returns
     -------
@@ -285,10 +582,20 @@ def load_3D_tif(tif_path, desired_axis_order="xyz", return_res=False, return_met
     tuple, optional
         If return_res is True, returns (ndarray, xy_res, z_res).
     """
+    slices = bbox_to_slices(bbox)
+    zyx_slices = slices[::-1] if desired_axis_order == "xyz" else slices
     with tifffile.TiffFile(tif_path) as tif:
-        print(f"\n    Loading {tif_path} as ndarray")
-        ndarray = tif.asarray()  # Load the image into memory
-        ndarray = np.transpose(ndarray, (2, 1, 0)) if desired_axis_order == "xyz" else ndarray
+        if lazy:
+            store = zarr.open(tif.aszarr(level=0), mode='r')
+            reader = _ReopeningArray(partial(_read_tif_region, tif_path), store.shape, store.dtype)  # Blocks are read with their own file handles
+            ndarray = da.from_array(reader, chunks=store.chunks)[zyx_slices]
+        elif bbox is not None:
+            print(f"\n    Loading {bbox} of {tif_path} as ndarray")
+            ndarray = zarr.open(tif.aszarr(level=0), mode='r')[zyx_slices]
+        else:
+            print(f"\n    Loading {tif_path} as ndarray")
+            ndarray = tif.asarray()  # Load the image into memory
+        ndarray = ndarray.transpose(2, 1, 0) if desired_axis_order == "xyz" else ndarray
         x_dim, y_dim, z_dim = ndarray.shape
 
         # If resolution is requested, extract it from OME-XML metadata
@@ -333,26 +640,135 @@ def nii_path_or_nii(nii):
     else:
         raise FileNotFoundError(f"\nInput file not found: {nii}\n")
 
+def nii_raw_proxy(nii):
+    """Return an array proxy for the stored (unscaled) values of a NIfTI image along with its scl_slope and scl_inter.
+
+    Parameters:
+    -----------
+    nii : str, Path, or nib.Nifti1Image
+        Path to the NIfTI image file or a Nifti1Image object.
+
+    Returns:
+    --------
+    tuple
+        (raw_proxy, slope, inter). raw_proxy is sliceable like nii.dataobj but returns the on-disk dtype without scaling.
+    """
+    nii = nii_path_or_nii(nii)
+    proxy = nii.dataobj
+    if not nib.is_proxy(proxy):  # In-memory image
+        return np.asanyarray(proxy), 1.0, 0.0
+    slope, inter = float(proxy.slope), float(proxy.inter)
+    if slope == 1.0 and inter == 0.0:
+        return proxy, slope, inter
+    raw_proxy = nib.arrayproxy.ArrayProxy(proxy.file_like, (proxy.shape, proxy.dtype, proxy.offset, 1.0, 0.0), order=proxy.order)
+    return raw_proxy, slope, inter
+
+def decode_nii_block(raw, dtype, slope=1.0, inter=0.0, scaling="auto"):
+    """Cast stored NIfTI values to dtype in one pass.
+
+    Parameters:
+    -----------
+    raw : ndarray
+        Stored (unscaled) values (e.g., from nii_raw_proxy()).
+    dtype : np.dtype
+        Output dtype.
+    slope, inter : float
+        scl_slope and scl_inter of the image.
+    scaling : str
+        'auto' applies slope and intercept (in dtype if it is a float dtype, so float32 outputs have no float64 intermediate). 
+        'raw' returns the stored values (e.g., label IDs) cast to dtype. Default: 'auto'.
+
+    Returns:
+    --------
+    ndarray
+        The decoded block.
+    """
+    dtype = np.dtype(dtype)
+    if scaling == "raw" or (slope == 1.0 and inter == 0.0):
+        return np.asarray(raw).astype(dtype, copy=False)
+    if np.issubdtype(dtype, np.floating):
+        block = np.array(raw, dtype=dtype)
+        if slope != 1.0:
+            block *= dtype.type(slope)
+        if inter != 0.0:
+            block += dtype.type(inter)
+        return block
+    return (np.asarray(raw) * slope + inter).astype(dtype)  # Scaled data to an integer dtype (as nibabel does)
+
+def read_nii(nii, dtype=None, scaling="auto", slicer=()):
+    """Read a NIfTI image (or a region of it) straight into dtype.
+
+    Parameters:
+    -----------
+    nii : str, Path, or nib.Nifti1Image
+        Path to the NIfTI image file or a Nifti1Image object.
+    dtype : str or np.dtype, optional
+        Output dtype. Default: None (on-disk dtype from the header).
+    scaling : str, optional
+        'auto' (apply scl_slope/scl_inter if set) or 'raw' (stored values, e.g., for label images). Default: 'auto'.
+    slicer : tuple, optional
+        Index into the image (e.g., slices from bbox_to_slices()). Default: () (the whole image).
+
+    Returns:
+    --------
+    ndarray
+        The image (not squeezed).
+    """
+    if scaling not in ("auto", "raw"):
+        raise ValueError(f"Invalid scaling: {scaling}. Use 'auto' or 'raw'.")
+    nii = nii_path_or_nii(nii)
+    dtype = nii.header.get_data_dtype() if dtype is None else np.dtype(dtype)
+    raw_proxy, slope, inter = nii_raw_proxy(nii)
+    return decode_nii_block(raw_proxy[slicer], dtype, slope, inter, scaling)
+
 @print_func_name_args_times()
-def nii_to_ndarray(nii):
+def nii_to_ndarray(nii, dtype=None, scaling="auto"):
     """Load a NIfTI image and return as a 3D ndarray.
 
     Parameters:
     -----------
     nii : str, Path, or nib.Nifti1Image
         Path to the NIfTI image file or a Nifti1Image object.
+    dtype : str or np.dtype, optional
+        Output dtype. The data is decoded straight into this dtype (e.g., np.float32 instead of get_fdata() + astype()). Default: None (on-disk dtype).
+    scaling : str, optional
+        'auto' (apply scl_slope/scl_inter if set) or 'raw' (stored values, e.g., for label images). Default: 'auto'.
 
     Returns:
     --------
     ndarray : ndarray
         The 3D image array.
     """
-    nii = nii_path_or_nii(nii)
-    ndarray = np.asanyarray(nii.dataobj, dtype=nii.header.get_data_dtype()).squeeze()
+    ndarray = read_nii(nii, dtype=dtype, scaling=scaling).squeeze()
     return ndarray
 
+def nii_to_dask(nii, dtype=None, scaling="auto"):
+    """Wrap the data of a NIfTI image in a lazy 3D dask array (chunked in z-slabs, matching the on-disk order).
+
+    Parameters:
+    -----------
+    nii : str, Path, or nib.Nifti1Image
+        Path to the NIfTI image file or a Nifti1Image object.
+    dtype : str or np.dtype, optional
+        Output dtype (each block is decoded straight into it). Default: None (on-disk dtype, like nii_to_ndarray()).
+    scaling : str, optional
+        'auto' or 'raw' (see read_nii()). Default: 'auto'.
+
+    Returns:
+    --------
+    dask.array.Array
+        The 3D image array.
+    """
+    nii = nii_path_or_nii(nii)
+    dtype = nii.header.get_data_dtype() if dtype is None else np.dtype(dtype)
+    raw_proxy, slope, inter = nii_raw_proxy(nii)
+    chunks = tuple(-1 for _ in raw_proxy.shape[:-1]) + ('auto',)
+    dask_array = da.from_array(raw_proxy, chunks=chunks, meta=np.empty((0,) * len(raw_proxy.shape), dtype=raw_proxy.dtype))
+    dask_array = dask_array.map_blocks(decode_nii_block, dtype, slope, inter, scaling, dtype=dtype)
+    return dask_array.squeeze()
+
 @print_func_name_args_times()
-def load_nii(nii_path, desired_axis_order="xyz", return_res=False, return_metadata=False, save_metadata=None, xy_res=None, z_res=None):
+def load_nii(nii_path, desired_axis_order="xyz", return_res=False, return_metadata=False, save_metadata=None, xy_res=None, z_res=None, lazy=False, bbox=None, dtype=None, scaling="auto"):
     """
     Load a .nii.gz image and return the ndarray.
 
@@ -372,6 +788,14 @@ def load_nii(nii_path, desired_axis_order="xyz", return_res=False, return_metada
         The resolution in the xy-plane (use if res is not specified in the metadata).
     z_res : float, optional
         The resolution in the z-plane.
+    lazy : bool, optional
+        If True, return a dask array of z-slabs read from the NIfTI proxy instead of loading the image into memory. Default is False.
+    bbox : str or tuple, optional
+        Bounding box in desired_axis_order (see bbox_to_slices()). If provided, only this region is read from the NIfTI proxy. Default is None.
+    dtype : str or np.dtype, optional
+        Output dtype. The data is decoded straight into this dtype (no float64 intermediate). Default is None (on-disk dtype).
+    scaling : str, optional
+        'auto' applies scl_slope/scl_inter if set; 'raw' returns stored values (e.g., label IDs). Default is 'auto'.
 
     Returns
     -------
@@ -386,8 +810,17 @@ def load_nii(nii_path, desired_axis_order="xyz", return_res=False, return_metada
     -----
     - If xy_res and z_res are provided, they will be used instead of the values from the metadata.
     """
-    ndarray = nii_to_ndarray(nii_path)
-    ndarray = np.transpose(ndarray, (2, 1, 0)) if desired_axis_order == "zyx" else ndarray
+    slices = bbox_to_slices(bbox)
+    xyz_slices = slices[::-1] if desired_axis_order == "zyx" else slices
+    if lazy:
+        ndarray = nii_to_dask(nii_path, dtype=dtype, scaling=scaling)[xyz_slices]
+    elif bbox is not None:
+        nii = nii_path_or_nii(nii_path)
+        extra_dims = (0,) * (len(nii.shape) - 3)  # E.g., a trailing singleton 4th axis
+        ndarray = read_nii(nii, dtype=dtype, scaling=scaling, slicer=xyz_slices + extra_dims)
+    else:
+        ndarray = nii_to_ndarray(nii_path, dtype=dtype, scaling=scaling)
+    ndarray = ndarray.transpose(2, 1, 0) if desired_axis_order == "zyx" else ndarray
 
     res_specified = True if xy_res is not None else False
     if res_specified:
@@ -423,15 +856,15 @@ def load_nii_subset(nii_path, xmin, xmax, ymin, ymax, zmin, zmax):
     subset_array = proxy_img.dataobj[xmin:xmax, ymin:ymax, zmin:zmax]
     return np.squeeze(subset_array)
 
-@print_func_name_args_times() 
-def load_h5(hdf5_path, desired_axis_order="xyz", return_res=False, return_metadata=False, save_metadata=None, xy_res=None, z_res=None):
+@print_func_name_args_times()
+def load_h5(hdf5_path, desired_axis_order="xyz", return_res=False, return_metadata=False, save_metadata=None, xy_res=None, z_res=None, lazy=False, bbox=None, channel=0, level=None):
     """
-    Load full resolution image from an HDF5 file (.h5) and return the ndarray.
+    Load an image (full resolution or a chosen resolution level) from an HDF5 file (.h5 or Imaris .ims) and return the ndarray.
 
     Parameters
     ----------
     hdf5_path : str
-        The path to the .h5 file.
+        The path to the .h5 or .ims file.
     desired_axis_order : str, optional
         The desired order of the image axes. Default is 'xyz'.
     return_res : bool, optional
@@ -444,27 +877,107 @@ def load_h5(hdf5_path, desired_axis_order="xyz", return_res=False, return_metada
         The resolution in the xy-plane.
     z_res : float, optional
         The resolution in the z-plane.
+    lazy : bool, optional
+        If True, return a dask array backed by the HDF5 dataset (chunked like the dataset) instead of loading the image into memory. Default is False.
+    bbox : str or tuple, optional
+        Bounding box in desired_axis_order (see bbox_to_slices()). If provided, only this hyperslab is read. Default is None.
+    channel : int, optional
+        Channel (Imaris) or setup (BigDataViewer) index. Default is 0.
+    level : int or str, optional
+        Resolution level index (see h5_levels()) or dataset path. Default is None (full resolution).
 
     Returns
     -------
     ndarray
         The loaded 3D image array.
     tuple, optional
-        If return_res is True, returns (ndarray, xy_res, z_res).
+        If return_res is True, returns (ndarray, xy_res, z_res). Resolutions are for the loaded level.
     tuple, optional
         If return_metadata is True, returns (ndarray, xy_res, z_res, x_dim, y_dim, z_dim).
     """
     with h5py.File(hdf5_path, 'r') as f:
-        full_res_dataset_name = next(iter(f.keys())) # Assumes first dataset = full res image
-        dataset = f[full_res_dataset_name]
-        print(f"\n    Loading {full_res_dataset_name} as ndarray")
-        ndarray = dataset[:]  # Load the full res image into memory (if not enough RAM, chunck data [e.g., w/ dask array])
-        ndarray = np.transpose(ndarray, (2, 1, 0)) if desired_axis_order == "xyz" else ndarray
-        xy_res, z_res, x_dim, y_dim, z_dim = metadata(hdf5_path, ndarray, return_res, return_metadata, save_metadata=save_metadata)
+        levels = _h5_levels(f, channel)
+        if level is None:
+            dataset_path, shape, scale = levels[0]
+        elif str(level).isdigit():
+            dataset_path, shape, scale = levels[int(level)]
+        else:
+            dataset_path, shape, scale = next(((p, sh, sc) for p, sh, sc in levels if p.strip('/') == str(level).strip('/')), (None, None, None))
+            if dataset_path is None:
+                raise ValueError(f"Resolution level {level} not found in {hdf5_path}. Available levels: {[p for p, _, _ in levels]}")
+        dataset = f[dataset_path]
+
+        # Slices for the bbox within the unpadded image (Imaris pads datasets to the chunk shape)
+        slices = bbox_to_slices(bbox)
+        zyx_slices = slices[::-1] if desired_axis_order == "xyz" else slices
+        zyx_slices = tuple(slice(*s.indices(d)[:2]) for s, d in zip(zyx_slices, shape))
+        zyx_slices = (0,) * (dataset.ndim - 3) + zyx_slices  # Singleton leading axes (e.g., channel/time)
+        if lazy:
+            reader = _ReopeningArray(partial(_read_h5_region, hdf5_path, dataset_path), dataset.shape, dataset.dtype)  # Blocks are read with their own file handles
+            ndarray = da.from_array(reader, chunks=dataset.chunks or 'auto')[zyx_slices]
+        else:
+            print(f"\n    Loading {dataset_path} as ndarray")
+            ndarray = dataset[zyx_slices]
+    ndarray = ndarray.transpose(2, 1, 0) if desired_axis_order == "xyz" else ndarray
+
+    # Resolution of the level
+    if (return_res or return_metadata) and xy_res is None and z_res is None:
+        xy_res, z_res = extract_resolution(hdf5_path)
+        if xy_res is not None:
+            xy_res, z_res = xy_res * scale[2], z_res * scale[0]
+    xy_res, z_res, x_dim, y_dim, z_dim = metadata(hdf5_path, ndarray, return_res, return_metadata, xy_res, z_res, save_metadata)
     return return_3D_img(ndarray, return_metadata, return_res, xy_res, z_res, x_dim, y_dim, z_dim)
 
+def read_zarr_selection(zarr_array, selection, max_workers=None):
+    """
+    Read a basic selection (integer indices and step-1 slices) of a zarr array into a preallocated ndarray, decompressing chunks in parallel threads.
+
+    Parameters
+    ----------
+    zarr_array : zarr.Array
+        The zarr array to read from.
+    selection : tuple
+        Integer indices (e.g., a channel) and/or slices, one per axis (missing trailing axes are read in full).
+    max_workers : int, optional
+        Number of threads. Default is None (ThreadPoolExecutor default).
+
+    Returns
+    -------
+    ndarray
+        The selected data.
+    """
+    selection = tuple(selection) + (slice(None),) * (zarr_array.ndim - len(selection))
+    kept_axes = [axis for axis, sel in enumerate(selection) if isinstance(sel, slice)]
+    bounds = {axis: selection[axis].indices(zarr_array.shape[axis])[:2] for axis in kept_axes}
+    ndarray = np.empty([max(stop - start, 0) for start, stop in bounds.values()], dtype=zarr_array.dtype)
+    if ndarray.size == 0:
+        return ndarray
+
+    # One task per chunk along the first two kept axes (e.g., z and y), each writing its block of the output
+    def chunk_ranges(axis):
+        start, stop = bounds[axis]
+        edges = list(range(start - start % zarr_array.chunks[axis] + zarr_array.chunks[axis], stop, zarr_array.chunks[axis]))
+        return list(zip([start] + edges, edges + [stop]))
+
+    split_axes = kept_axes[:2]
+    tasks = [[]]
+    for axis in split_axes:
+        tasks = [task + [r] for task in tasks for r in chunk_ranges(axis)]
+
+    def read_block(ranges):
+        block_selection = list(selection)
+        out_selection = [slice(None)] * ndarray.ndim
+        for i, (axis, (start, stop)) in enumerate(zip(split_axes, ranges)):
+            block_selection[axis] = slice(start, stop)
+            out_selection[i] = slice(start - bounds[axis][0], stop - bounds[axis][0])
+        zarr_array.get_basic_selection(tuple(block_selection), out=ndarray[tuple(out_selection)])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(read_block, tasks))
+    return ndarray
+
 @print_func_name_args_times()
-def load_zarr(zarr_path, channel=0, desired_axis_order="xyz", return_res=False,  return_metadata=False, save_metadata=None, xy_res=None, z_res=None, level=None, verbose=False):
+def load_zarr(zarr_path, channel=0, desired_axis_order="xyz", return_res=False,  return_metadata=False, save_metadata=None, xy_res=None, z_res=None, level=None, verbose=False, lazy=False, bbox=None, z_range=None, max_workers=None):
     """
     Load a channel and level of a Zarr image, optionally returning voxel resolution.
 
@@ -488,6 +1001,17 @@ def load_zarr(zarr_path, channel=0, desired_axis_order="xyz", return_res=False,
         Resolution level to load (default: highest).
     verbose : bool
         Print debug output.
+    lazy : bool, optional
+        If True, return a dask array backed by the zarr chunks instead of loading the image into memory. Default is False.
+    bbox : str or tuple, optional
+        Bounding box in desired_axis_order (see bbox_to_slices()). If provided, only the chunks overlapping it are read. Default is None.
+    z_range : tuple, optional
+        (zmin, zmax) range of z-planes to read (shortcut for a bbox spanning x and y). Default is None (all planes).
+    max_workers : int, optional
+        Number of threads for reading and decompressing chunks. Default is None (ThreadPoolExecutor default).
+
+    Note:
+        - The channel, level, and bbox/z_range are selected before any data is read, so only the needed chunks are decompressed.
 
     Returns
     -------
@@ -514,7 +1038,6 @@ def load_zarr(zarr_path, channel=0, desired_axis_order="xyz", return_res=False,
             zattrs = json.load(f)
 
     level_str = str(level) if level is not None else None
-    xy_res = z_res = None
     if "multiscales" in zattrs:
         multiscale = zattrs["multiscales"][0]
         axes = multiscale.get("axes", [])
@@ -537,48 +1060,94 @@ def load_zarr(zarr_path, channel=0, desired_axis_order="xyz", return_res=False,
             transforms = dataset.get("coordinateTransformations", [])
             if transforms:
                 scale = transforms[0].get("scale", [])
-                if len(scale) == len(axes):
+                if len(scale) == len(axes) and not (axes and all(isinstance(axis, dict) and "unit" not in axis for axis in axes)): # Unitless scales are relative to level 0
                     res_dict = {axis["name"]: s for axis, s in zip(axes, scale)}
-                    xy_res = res_dict.get("x", None)
-                    z_res = res_dict.get("z", None)
-                    # Convert to micrometers
-                    xy_res = xy_res * 1e3 if xy_res is not None else None
-                    z_res = z_res * 1e3 if z_res is not None else None
-
-    # Load image data
-    ndarray = None
+                    units = {axis["name"]: axis.get("unit", "millimeter") for axis in axes}
+                    level_xy_res = res_dict.get("x", None)
+                    level_z_res = res_dict.get("z", None)
+                    # Convert to micrometers (resolutions passed as arguments take precedence)
+                    if xy_res is None and level_xy_res is not None:
+                        xy_res = level_xy_res * (1 if units.get("x") == "micrometer" else 1e3)
+                    if z_res is None and level_z_res is not None:
+                        z_res = level_z_res * (1 if units.get("z") == "micrometer" else 1e3)
+
+    # Open the zarr array (no data is read until the selection below)
     if level_str: # If a level is specified or found, load that level
         level_path = zarr_path / level_str
         if level_path.exists():
             log(f"        Multi-resolution structure detected: loading level {level_str}")
-            ndarray = da.from_zarr(level_path).compute() # convert dask array to numpy array
+            zarr_array = zarr.open(str(level_path), mode='r')
         else:
             raise ValueError(f"Specified level {level_str} does not exist in {zarr_path}")
     else: # Load flat format (.zattrs is missing or it does not match expected metadata structure)
         log("        No compatible .zattrs metadata found. Loading flat zarr format.")
-        zarr_dataset = zarr.open(zarr_path, mode='r')
-        ndarray = np.array(zarr_dataset)
+        zarr_array = zarr.open(str(zarr_path), mode='r')
 
-    # Extract channel if specified (e.g., 0 for the first channel, 1 for the second, etc.)
-    log(f"        Array shape ([C], Z, Y, X): {ndarray.shape}")
-    if ndarray.ndim == 4:
+    # Select the channel if specified (e.g., 0 for the first channel, 1 for the second, etc.)
+    log(f"        Array shape ([C], Z, Y, X): {zarr_array.shape}")
+    selection = ()
+    if zarr_array.ndim == 4:
         if channel is not None:
             log(f"        Extracted channel: {channel}")
-            ndarray = ndarray[channel]
+            selection = (channel,)
         else:
-            raise ValueError(f"Multiple channels found: {ndarray.shape[0]} channels. Please specify a channel index.")
-
-    if ndarray.ndim != 3:
-        raise ValueError(f"Expected 3D array, but got shape {ndarray.shape}")
+            raise ValueError(f"Multiple channels found: {zarr_array.shape[0]} channels. Please specify a channel index.")
+    elif zarr_array.ndim != 3:
+        raise ValueError(f"Expected 3D array, but got shape {zarr_array.shape}")
+
+    # Select the bounding box or z-range (if any) so that only the chunks overlapping it are read
+    if z_range is not None:
+        if bbox is not None:
+            raise ValueError("Provide either bbox or z_range, not both.")
+        z_slice = slice(*z_range)
+        bbox = (slice(None), slice(None), z_slice) if desired_axis_order == "xyz" else (z_slice, slice(None), slice(None))
+    slices = bbox_to_slices(bbox)
+    selection += slices[::-1] if desired_axis_order == "xyz" else slices
+
+    if lazy:
+        ndarray = da.from_zarr(zarr_array)[selection]
+    else:
+        ndarray = read_zarr_selection(zarr_array, selection, max_workers=max_workers)
 
     # Transpose to desired axis order
     if desired_axis_order == "xyz":
-        ndarray = np.transpose(ndarray, (2, 1, 0))
+        ndarray = ndarray.transpose(2, 1, 0)
         log(f"        Array shape after transposing to (X, Y, Z): {ndarray.shape}")
 
     xy_res, z_res, x_dim, y_dim, z_dim = metadata(zarr_path, ndarray, return_res, return_metadata, xy_res, z_res, save_metadata)
     return return_3D_img(ndarray, return_metadata=return_metadata, return_res=return_res, xy_res=xy_res, z_res=z_res, x_dim=x_dim, y_dim=y_dim, z_dim=z_dim)
 
+def zarr_levels(zarr_path):
+    """
+    List the resolution levels of a multiscale .zarr (from the OME-NGFF .zattrs).
+
+    Parameters
+    ----------
+    zarr_path : str or Path
+        Path to .zarr directory.
+
+    Returns
+    -------
+    list of tuples
+        (path, shape, scale) for each level, from highest to lowest resolution. Shape and scale are in the stored axis order (e.g., c, z, y, x).
+        Empty if the .zarr lacks multiscales metadata.
+    """
+    zarr_path = Path(zarr_path)
+    zattrs_path = zarr_path / ".zattrs"
+    if not zattrs_path.exists():
+        return []
+    with open(zattrs_path) as f:
+        zattrs = json.load(f)
+    levels = []
+    for dataset in zattrs.get("multiscales", [{}])[0].get("datasets", []):
+        level_path = zarr_path / str(dataset["path"])
+        if not level_path.exists():
+            continue
+        transforms = dataset.get("coordinateTransformations", [])
+        scale = transforms[0].get("scale") if transforms else None
+        levels.append((str(dataset["path"]), zarr.open(str(level_path), mode='r').shape, scale))
+    return levels
+
 def resolve_path(upstream_path, path_or_pattern, make_parents=True, is_file=True):
     """
     Returns full path or Path(upstream_path, path_or_pattern) and optionally creates parent directories.
@@ -652,6 +1221,76 @@ def save_metadata_to_file(xy_res, z_res, x_dim, y_dim, z_dim, save_metadata='par
             f.write(f"Depth:  {z_dim*z_res} microns ({z_dim})\n")
             f.write(f"Voxel size: {xy_res}x{xy_res}x{z_res} micron^3\n")    
 
+        # Also record the metadata in the metadata index (see unravel.core.metadata_index)
+        sample_metadata = {"xy_res": float(xy_res), "z_res": float(z_res), "x_dim": int(x_dim), "y_dim": int(y_dim), "z_dim": int(z_dim), "fingerprint": fingerprint(save_metadata)}
+        update_index(save_metadata.parent / INDEX_NAME, sample_metadata=sample_metadata)
+
+def read_img_header(img_path, channel=0):
+    """
+    Read the shape, dtype, resolution, and orientation of a 3D image from its headers (no voxel data is read).
+
+    Parameters
+    ----------
+    img_path : str or Path
+        The path to the image (see load_3D_img()).
+    channel : int, optional
+        The channel to read for multi-channel images. Default is 0.
+
+    Returns
+    -------
+    dict
+        {"shape": [x_dim, y_dim, z_dim], "dtype": str, "xy_res": float or None, "z_res": float or None, "orientation": str or None, "channel": int}
+        The orientation is the axis code string from the affine of NIfTI images (e.g., 'RAS').
+    """
+    orientation = None
+    if str(img_path).endswith('.nii.gz') or str(img_path).endswith('.nii'):
+        nii = nib.load(img_path)  # Only the header is read
+        shape, dtype = nii.header.get_data_shape()[:3], nii.header.get_data_dtype()
+        zooms = nii.header.get_zooms()  # (x, y, z) in mm
+        xy_res, z_res = zooms[0] * 1000, zooms[2] * 1000
+        orientation = ''.join(nib.aff2axcodes(nii.affine))
+    else:
+        # The lazy loaders only read headers/metadata (TIFF tags, zarr arrays/.zattrs, CZI XML, HDF5 attributes)
+        img, xy_res, z_res = load_3D_img(img_path, channel=channel, desired_axis_order="xyz", return_res=True, lazy=True)
+        shape, dtype = img.shape, img.dtype
+    return {
+        "shape": [int(dim) for dim in shape],
+        "dtype": str(dtype),
+        "xy_res": float(xy_res) if xy_res is not None else None,
+        "z_res": float(z_res) if z_res is not None else None,
+        "orientation": orientation,
+        "channel": channel,
+    }
+
+def img_metadata(img_path, channel=0, index_path=None):
+    """
+    Return the header metadata of an image (see read_img_header()), using the sample's metadata index as a cache.
+
+    Parameters
+    ----------
+    img_path : str or Path
+        The path to the image.
+    channel : int, optional
+        The channel for multi-channel images. Default is 0.
+    index_path : str or Path, optional
+        Path to the metadata index. Default is None (./sample??/parameters/metadata_index.json if img_path is in a sample?? dir).
+
+    Returns
+    -------
+    dict
+        The metadata of the image. The cached entry is used if the image is unchanged (same size and modification time).
+    """
+    index_path = find_index_path(Path(img_path).parent) if index_path is None else index_path
+    if index_path is not None:
+        cached = get_cached_img_metadata(index_path, img_path)
+        if cached is not None and cached.get("channel") == channel:
+            return cached
+
+    img_md = read_img_header(img_path, channel)
+    if index_path is not None:
+        cache_img_metadata(index_path, img_path, img_md)
+    return img_md
+
 def load_image_metadata_from_txt(metadata="./parameters/metadata*"):
     """
     Load metadata from a text file.
@@ -665,8 +1304,18 @@ def load_image_metadata_from_txt(metadata="./parameters/metadata*"):
     -------
     tuple
         Returns (xy_res, z_res, x_dim, y_dim, z_dim) or (None, None, None, None, None) if file not found.
+
+    Notes
+    -----
+    - Values are read from the metadata index in the same dir (metadata_index.json) if it is in sync with the metadata file.
     """
     file_paths = match_files(metadata)
+
+    # Use the metadata index if it matches the metadata file (or if the metadata file is missing)
+    sample_metadata = load_index(Path(metadata).parent / INDEX_NAME).get("sample_metadata")
+    if sample_metadata and (not file_paths or sample_metadata.get("fingerprint") == fingerprint(file_paths[0])):
+        return tuple(sample_metadata[key] for key in ("xy_res", "z_res", "x_dim", "y_dim", "z_dim"))
+
     if file_paths:
         with open(file_paths[0], 'r') as file:
             for line in file:
@@ -690,7 +1339,7 @@ def load_image_metadata_from_txt(metadata="./parameters/metadata*"):
     return xy_res, z_res, x_dim, y_dim, z_dim
 
 @print_func_name_args_times()
-def load_3D_img(img_path, channel=0, desired_axis_order="xyz", return_res=False, return_metadata=False, xy_res=None, z_res=None, save_metadata=None, verbose=False): 
+def load_3D_img(img_path, channel=0, desired_axis_order="xyz", return_res=False, return_metadata=False, xy_res=None, z_res=None, save_metadata=None, verbose=False, lazy=False, bbox=None, level=None, dtype=None, scaling="auto"): 
     """
     Load a 3D image from various file formats and return the ndarray.
 
@@ -712,11 +1361,23 @@ def load_3D_img(img_path, channel=0, desired_axis_order="xyz", return_res=False,
         The resolution in the z-plane.
     save_metadata : str, optional
         Path to save metadata file. Default is None.
+    lazy : bool, optional
+        If True, return a chunked dask array (same axis order and metadata) instead of loading the image into memory. 
+        Use .compute() or np.asarray() on a block (e.g., a z-slab) to read only that block. Default is False.
+    bbox : str or tuple, optional
+        Region of interest in desired_axis_order: 'xmin:xmax, ymin:ymax, zmin:zmax' (e.g., from a bbox .txt file), 
+        a tuple of three (min, max) pairs, or a tuple of three slices. Only the data in this region is read. Default is None.
+    level : str or int, optional
+        Resolution level to load from a multiscale .zarr (see zarr_levels()) or an Imaris/BigDataViewer/multi-dataset .h5 (see h5_levels()). Default is None (highest resolution).
+    dtype : str or np.dtype, optional
+        Output dtype. NIfTI data is decoded straight into it; other formats are cast once after reading. Default is None (on-disk dtype).
+    scaling : str, optional
+        For .nii.gz: 'auto' applies scl_slope/scl_inter if set; 'raw' returns stored values (e.g., label IDs). Default is 'auto'.
 
     Returns
     -------
     ndarray
-        The loaded 3D image array.
+        The loaded 3D image array (or a dask array if lazy is True).
     tuple, optional
         If return_res is True, returns (ndarray, xy_res, z_res).
     tuple, optional
@@ -728,28 +1389,37 @@ def load_3D_img(img_path, channel=0, desired_axis_order="xyz", return_res=False,
     if img_path.is_dir() and not str(img_path).endswith('.zarr'):
         tif_files = match_files('*.tif', base_path=img_path)
         if tif_files: 
-            return load_tifs(img_path, desired_axis_order, return_res, return_metadata, save_metadata, xy_res, z_res)
+            return cast_3D_img(load_tifs(img_path, desired_axis_order, return_res, return_metadata, save_metadata, xy_res, z_res, lazy=lazy, bbox=bbox), dtype)
 
     if not img_path.exists():
-        raise FileNotFoundError(f"\nNo compatible image files found at {img_path} for load_3D_img(). Use: .czi, .ome.tif, .tif, .nii.gz, .h5, .zarr")
+        raise FileNotFoundError(f"\nNo compatible image files found at {img_path} for load_3D_img(). Use: .czi, .ome.tif, .tif, .nii.gz, .h5, .ims, .zarr")
     
     # Load image based on file type and optionally return resolutions and dimensions
     try:
         if str(img_path).endswith('.czi'):
-            return load_czi(img_path, channel=channel, desired_axis_order=desired_axis_order, return_res=return_res, return_metadata=return_metadata, save_metadata=save_metadata, xy_res=xy_res, z_res=z_res)
+            result = load_czi(img_path, channel=channel, desired_axis_order=desired_axis_order, return_res=return_res, return_metadata=return_metadata, save_metadata=save_metadata, xy_res=xy_res, z_res=z_res, lazy=lazy, bbox=bbox)
         elif str(img_path).endswith('.ome.tif') or str(img_path).endswith('.tif'):
-            return load_3D_tif(img_path, desired_axis_order, return_res, return_metadata, save_metadata, xy_res, z_res)
+            result = load_3D_tif(img_path, desired_axis_order, return_res, return_metadata, save_metadata, xy_res, z_res, lazy=lazy, bbox=bbox)
         elif str(img_path).endswith('.nii.gz'):
-            return load_nii(img_path, desired_axis_order, return_res, return_metadata, save_metadata, xy_res, z_res)
-        elif str(img_path).endswith('.h5'):
-            return load_h5(img_path, desired_axis_order, return_res, return_metadata, save_metadata, xy_res, z_res)
+            return load_nii(img_path, desired_axis_order, return_res, return_metadata, save_metadata, xy_res, z_res, lazy=lazy, bbox=bbox, dtype=dtype, scaling=scaling)
+        elif str(img_path).endswith('.h5') or str(img_path).endswith('.ims'):
+            result = load_h5(img_path, desired_axis_order, return_res, return_metadata, save_metadata, xy_res, z_res, lazy=lazy, bbox=bbox, channel=channel, level=level)
         elif str(img_path).endswith('.zarr'):
-            return load_zarr(img_path, channel=channel, desired_axis_order=desired_axis_order, return_res=return_res, return_metadata=return_metadata, save_metadata=save_metadata, xy_res=xy_res, z_res=z_res, verbose=verbose)
+            result = load_zarr(img_path, channel=channel, desired_axis_order=desired_axis_order, return_res=return_res, return_metadata=return_metadata, save_metadata=save_metadata, xy_res=xy_res, z_res=z_res, verbose=verbose, lazy=lazy, bbox=bbox, level=level)
         else:
-            raise ValueError(f"Unsupported file type: {img_path.suffix}. Supported file types: .czi, .ome.tif, .tif, .nii.gz, .h5")
+            raise ValueError(f"Unsupported file type: {img_path.suffix}. Supported file types: .czi, .ome.tif, .tif, .nii.gz, .h5, .ims, .zarr")
     except (FileNotFoundError, ValueError) as e:
         print(f"\n    [red bold]Error: {e}\n")
         import sys; sys.exit()
+    return cast_3D_img(result, dtype)
+
+def cast_3D_img(result, dtype=None):
+    """Cast the image returned by a loader (an array or a tuple starting with the array) to dtype (no copy if it already has this dtype)."""
+    if dtype is None:
+        return result
+    if isinstance(result, tuple):
+        return (result[0].astype(dtype, copy=False), *result[1:])
+    return result.astype(dtype, copy=False)
 
 
 # Save images
@@ -801,13 +1471,150 @@ def save_as_nii(ndarray, output, xy_res=1000, z_res=1000, data_type=None, refere
         affine = np.diag([xy_res / 1000, xy_res / 1000, z_res / 1000, 1]) # RAS orientation
         header = nib.Nifti1Header()
 
-    # Create and save the NIFTI image
-    nii = nib.Nifti1Image(ndarray, affine, header)
-    nii.header.set_data_dtype(data_type or np.float32)
-    
-    nib.save(nii, output)    
+    # Create and save the NIFTI image (lazy dask arrays are computed and written a few chunks at a time)
+    if isinstance(ndarray, da.Array):
+        slab_size = ndarray.chunksize[2] * (os.cpu_count() or 1)
+        write_nii_slabs(ndarray, output, affine, header, dtype=data_type or np.float32, slab_size=slab_size)
+    else:
+        nii = nib.Nifti1Image(ndarray, affine, header)
+        nii.header.set_data_dtype(data_type or np.float32)
+        nib.save(nii, output)
     print(f"\n    Output: [default bold]{output}")
 
+def write_nii_slabs(ndarray, output, affine=None, header=None, dtype=None, pad_widths=(0, 0, 0), slab_size=16):
+    """Write a 3D image (x, y, z) to a .nii(.gz) one z-slab at a time, so that the full image is never held in memory.
+
+    Parameters
+    ----------
+    ndarray : array-like
+        3D image: ndarray, np.memmap, dask array (each slab is computed when it is written), or a nibabel ArrayProxy.
+    output : str or Path
+        Path to the output .nii.gz or .nii.
+    affine : ndarray, optional
+        Affine of the output. Default: None (from header).
+    header : nib.Nifti1Header, optional
+        Header to copy (shape, dtype, and scaling are updated). Default: None.
+    dtype : data-type, optional
+        Output dtype (slabs are cast without scaling). Default: None (dtype of ndarray).
+    pad_widths : tuple of int, optional
+        Zeros added to each side of each axis (see ``unravel.core.img_tools.save_padded_nii``). Default: (0, 0, 0).
+    slab_size : int, optional
+        Number of output z-slices written at a time. Default: 16.
+    """
+    shape = tuple(int(dim) for dim in ndarray.shape[:3])
+    out_shape = tuple(dim + 2 * width for dim, width in zip(shape, pad_widths))
+    dtype = np.dtype(dtype if dtype is not None else ndarray.dtype)
+
+    x, y, z = (slice(width, width + dim) for dim, width in zip(shape, pad_widths))
+    with NiiSlabWriter(output, out_shape, affine, header, dtype=dtype) as writer:
+        for start in range(0, out_shape[2], slab_size):
+            stop = min(start + slab_size, out_shape[2])
+            src_start, src_stop = max(start, z.start), min(stop, z.stop)
+            if src_start >= src_stop:
+                slab = np.zeros((out_shape[0], out_shape[1], stop - start), dtype=dtype)
+            elif out_shape[:2] == shape[:2] and (src_start, src_stop) == (start, stop):
+                slab = np.asarray(ndarray[:, :, src_start - z.start:src_stop - z.start]).reshape(shape[0], shape[1], -1)
+            else:
+                slab = np.zeros((out_shape[0], out_shape[1], stop - start), dtype=dtype)
+                slab[x, y, src_start - start:src_stop - start] = np.asarray(ndarray[:, :, src_start - z.start:src_stop - z.start]).reshape(shape[0], shape[1], -1)
+            writer.write(slab)
+
+class NiiSlabWriter:
+    """Write a 3D .nii(.gz) one z-slab at a time (e.g., to write several outputs of a streaming reduction in one pass).
+
+    Parameters
+    ----------
+    output : str or Path
+        Path to the output .nii.gz or .nii.
+    shape : tuple of int
+        Shape of the image (x, y, z).
+    affine : ndarray, optional
+        Affine of the output. Default: None (from header).
+    header : nib.Nifti1Header, optional
+        Header to copy (shape, dtype, and scaling are updated). Default: None.
+    dtype : data-type, optional
+        Output dtype (slabs are cast without scaling). Default: np.float32.
+
+    Example
+    -------
+    >>> with NiiSlabWriter('sd.nii.gz', shape, nii.affine, nii.header) as writer:
+    ...     for slab in slabs:  # Consecutive z-slabs
+    ...         writer.write(slab)
+    """
+    def __init__(self, output, shape, affine=None, header=None, dtype=np.float32):
+        self.shape = tuple(int(dim) for dim in shape)
+        self.dtype = np.dtype(dtype)
+        self.z = 0
+
+        # Header for the output (as nib.Nifti1Image would set it for an ndarray of this shape)
+        nii = nib.Nifti1Image(np.empty((0, 0, 0), dtype=self.dtype), affine, header)
+        nii.update_header()
+        hdr = nii.header
+        hdr.set_data_shape(self.shape)
+        hdr.set_data_dtype(self.dtype)
+        hdr.set_slope_inter(np.nan, np.nan)  # Data are cast without scaling
+
+        self.output = output
+        self._file = nib.openers.ImageOpener(output, 'wb')
+        hdr.write_to(self._file)
+        self._file.write(b'\x00' * (hdr.get_data_offset() - self._file.tell()))
+
+    def write(self, slab):
+        """Append the next z-slab (x, y, n_slices)."""
+        slab = np.asarray(slab)
+        if slab.shape[:2] != self.shape[:2] or self.z + slab.shape[2] > self.shape[2]:
+            raise ValueError(f"Slab of shape {slab.shape} does not fit at z={self.z} in an image of shape {self.shape}")
+        self._file.write(slab.astype(self.dtype, copy=False).tobytes(order='F'))
+        self.z += slab.shape[2]
+
+    def close(self):
+        self._file.close()
+        if self.z != self.shape[2]:
+            raise ValueError(f"{self.output} is incomplete: {self.z} of {self.shape[2]} slices were written")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._file.close()
+        else:
+            self.close()
+
+def iter_nii_slabs(nii, slab_size=16, dtype=None, scaling="auto"):
+    """Yield (start, slab) for consecutive z-slabs of a 3D NIfTI image, reading the file sequentially.
+
+    Each slab is a contiguous byte range of the file, so the file is read once from start to end (also for .nii.gz files without random access).
+
+    Parameters:
+    -----------
+    nii : str, Path, or nib.Nifti1Image
+        Path to the NIfTI image file or a Nifti1Image object.
+    slab_size : int, optional
+        Number of z-slices per slab. Default: 16.
+    dtype : str or np.dtype, optional
+        Output dtype. Default: None (on-disk dtype from the header).
+    scaling : str, optional
+        'auto' or 'raw' (see read_nii()). Default: 'auto'.
+    """
+    nii = nii_path_or_nii(nii)
+    shape = nii.shape[:3] + (1,) * (3 - len(nii.shape[:3]))
+    dtype = nii.header.get_data_dtype() if dtype is None else np.dtype(dtype)
+    if not nib.is_proxy(nii.dataobj) or nii.dataobj.order != 'F':
+        for start in range(0, shape[2], slab_size):
+            yield start, read_nii(nii, dtype, scaling, slicer=(slice(None), slice(None), slice(start, start + slab_size))).reshape(shape[0], shape[1], -1)
+        return
+
+    raw_dtype = nii.dataobj.dtype
+    slope, inter = float(nii.dataobj.slope), float(nii.dataobj.inter)
+    with nib.openers.ImageOpener(nii.get_filename(), 'rb') as f:
+        f.seek(nii.dataobj.offset)
+        for start in range(0, shape[2], slab_size):
+            n_slices = min(slab_size, shape[2] - start)
+            n_bytes = shape[0] * shape[1] * n_slices * raw_dtype.itemsize
+            raw = np.frombuffer(f.read(n_bytes), dtype=raw_dtype).reshape((shape[0], shape[1], n_slices), order='F')
+            yield start, decode_nii_block(raw, dtype, slope, inter, scaling)
+
 @print_func_name_args_times()
 def save_as_tifs(ndarray, tif_dir_out=None, ndarray_axis_order="xyz", parallel=True, max_workers=None, verbose=False):
     """
@@ -838,76 +1645,139 @@ def save_as_tifs(ndarray, tif_dir_out=None, ndarray_axis_order="xyz", parallel=T
     if ndarray_axis_order == "xyz":
         ndarray = np.transpose(ndarray, (2, 1, 0))  # to zyx
 
-    def save_slice(i):
+    def save_slice(i, block, start):
         slice_file_path = tif_dir_out / f"slice_{i:04d}.tif"
-        tifffile.imwrite(str(slice_file_path), ndarray[i])
-
-    if parallel:
-        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
-            list(executor.map(save_slice, range(ndarray.shape[0])))
-    else:
-        for i in range(ndarray.shape[0]):
-            save_slice(i)
+        tifffile.imwrite(str(slice_file_path), block[i - start])
+
+    # Lazy dask arrays are computed one z-chunk at a time (slicing them per slice would recompute each chunk)
+    lazy = isinstance(ndarray, da.Array)
+    slab_size = max(ndarray.chunksize[0] if lazy else ndarray.shape[0], 1)
+    for start in range(0, ndarray.shape[0], slab_size):
+        stop = min(start + slab_size, ndarray.shape[0])
+        block = np.asarray(ndarray[start:stop]) if lazy else ndarray[start:stop]
+        if parallel:
+            with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+                list(executor.map(lambda i: save_slice(i, block, start), range(start, stop)))
+        else:
+            for i in range(start, stop):
+                save_slice(i, block, start)
 
     if verbose:
         print(f"        Output directory: [magenta]{tif_dir_out}")
     else:
         print(f"Output directory with tif series: [magenta]{tif_dir_out}")
 
+def _downsample_dask(dask_array, factors, method="mean"):
+    """Downsample a dask array by integer factors per axis ('mean': block averaging; 'nearest': striding, e.g., for label images)."""
+    if method == "nearest":
+        return dask_array[tuple(slice(None, None, f) for f in factors)]
+    if method != "mean":
+        raise ValueError(f"Unsupported downsampling method: {method}. Use 'mean' or 'nearest'.")
+
+    # Trim excess voxels and align chunks with the factors so each output voxel is computed within one chunk
+    dask_array = dask_array[tuple(slice(0, (d // f) * f) for d, f in zip(dask_array.shape, factors))]
+    dask_array = dask_array.rechunk(tuple(max(c // f, 1) * f for c, f in zip(dask_array.chunksize, factors)))
+    downsampled = da.coarsen(np.mean, dask_array, dict(enumerate(factors)))
+    if np.issubdtype(dask_array.dtype, np.integer):
+        downsampled = downsampled.round()
+    return downsampled.astype(dask_array.dtype)
+
+ZARR_COMPRESSOR = zarr.Blosc(cname='lz4', clevel=9, shuffle=zarr.Blosc.BITSHUFFLE)
+
 @print_func_name_args_times()
-def save_as_zarr(ndarray, output_path=None, ndarray_axis_order="xyz", xy_res=None, z_res=None, verbose=False):
+def save_as_zarr(ndarray, output_path=None, ndarray_axis_order="xyz", xy_res=None, z_res=None, levels=1, downscale=2, downsample_method="mean", chunks=None, compressor=ZARR_COMPRESSOR, verbose=False):
     """
-    Save a 3D ndarray to a .zarr file as well as OME-NGFF-compatible metadata.
+    Save a 3D ndarray to a .zarr file (optionally as a multiscale pyramid) as well as OME-NGFF-compatible metadata.
 
     Parameters
     ----------
-    ndarray : ndarray
+    ndarray : ndarray or dask array
         The 3D image array to save.
     output_path : str
         The path to save the .zarr file.
     ndarray_axis_order : str, optional
         The order of the ndarray axes. Default is 'xyz'.
     xy_res : float, optional
-        The voxel size in the XY plane (in mm).
+        The voxel size in the XY plane (in microns).
     z_res : float, optional
-        The voxel size in the Z direction (in mm).
+        The voxel size in the Z direction (in microns).
+    levels : int, optional
+        Number of resolution levels. If > 1, levels are saved as output_path/0, output_path/1, ... (0 = full res). Default is 1 (single-level zarr).
+    downscale : int or tuple, optional
+        Downsampling factor between consecutive levels (one int for all axes or a tuple in ndarray_axis_order). Default is 2.
+    downsample_method : str, optional
+        'mean' (block averaging; for intensity images) or 'nearest' (for label images). Default is 'mean'.
+    chunks : tuple, optional
+        Chunk shape in ndarray_axis_order (clipped to the shape of each level). Default is None (dask's 'auto' chunks for level 0).
+    compressor : numcodecs codec, optional
+        Compressor for the chunks (None for no compression). Default is Blosc lz4 with bit shuffling.
+    verbose : bool, optional
+        Print the output path and metadata. Default is False.
+
+    Note:
+        - The image is saved in z, y, x order (OME-NGFF).
+        - All levels are computed and written in one pass over the input (each input chunk is read once).
+        - Sharding is not available for zarr v2 stores. Use larger chunks to reduce the number of files.
     """
     if ndarray_axis_order == "xyz":
-        ndarray = np.transpose(ndarray, (2, 1, 0))
+        ndarray = ndarray.transpose(2, 1, 0)
+
+    # Settings in z, y, x order
+    downscale = (downscale,) * 3 if np.isscalar(downscale) else tuple(downscale)
+    if ndarray_axis_order == "xyz":
+        downscale = downscale[::-1]
+        chunks = chunks[::-1] if chunks is not None else None
 
     if isinstance(ndarray, da.Array):
         dask_array = ndarray
     else:
         dask_array = da.from_array(ndarray, chunks='auto')
-    compressor = zarr.Blosc(cname='lz4', clevel=9, shuffle=zarr.Blosc.BITSHUFFLE)
-    dask_array.to_zarr(output_path, compressor=compressor, overwrite=True)
+    chunks = tuple(chunks) if chunks is not None else dask_array.chunksize
+
+    # Build the pyramid (lazy) and stop before any axis would be empty
+    pyramid = [dask_array]
+    for _ in range(levels - 1):
+        if any(d // f == 0 for d, f in zip(pyramid[-1].shape, downscale)):
+            print(f"    [yellow]Stopping the pyramid at {len(pyramid)} levels (shape: {pyramid[-1].shape})")
+            break
+        pyramid.append(_downsample_dask(pyramid[-1], downscale, downsample_method))
+
+    # Create the zarr arrays and write all levels in one pass
+    if len(pyramid) == 1:
+        targets = [zarr.open_array(str(output_path), mode='w', shape=dask_array.shape, chunks=tuple(min(c, d) for c, d in zip(chunks, dask_array.shape)), dtype=dask_array.dtype, compressor=compressor)]
+        paths = ["."]
+    else:
+        root = zarr.open_group(str(output_path), mode='w')
+        targets = [root.create_dataset(str(i), shape=level.shape, chunks=tuple(min(c, d) for c, d in zip(chunks, level.shape)), dtype=level.dtype, compressor=compressor) for i, level in enumerate(pyramid)]
+        paths = [str(i) for i in range(len(pyramid))]
+    pyramid = [level.rechunk(target.chunks) for level, target in zip(pyramid, targets)]
+    da.store(pyramid, targets, lock=False)
     if verbose:
         print(f"\n    Saved zarr as: [default bold]{output_path}")
+        if len(pyramid) > 1:
+            print(f"    Levels (Z, Y, X): {[level.shape for level in pyramid]}")
 
-    # Add NGFF-style .zattrs
-    first_axis = "x" if ndarray_axis_order == "xyz" else "z"
-    third_axis = "z" if first_axis == "x" else "x"
-    if xy_res is not None or z_res is not None:
+    # Add NGFF-style .zattrs (scales are in millimeters if the resolution is known. Otherwise, they are relative to level 0)
+    base_scale = [z_res / 1000 if z_res is not None else 1, xy_res / 1000 if xy_res is not None else 1, xy_res / 1000 if xy_res is not None else 1]
+    unit = {"unit": "millimeter"} if xy_res is not None or z_res is not None else {}
+    if len(pyramid) > 1 or unit:
         attrs = {
             "multiscales": [{
                 "version": "0.4",
-                "axes": [
-                    {"name": first_axis, "type": "space", "unit": "millimeter"},
-                    {"name": "y", "type": "space", "unit": "millimeter"},
-                    {"name": third_axis, "type": "space", "unit": "millimeter"},
-                ],
+                "axes": [{"name": axis, "type": "space", **unit} for axis in "zyx"],
                 "datasets": [{
-                    "path": ".",
+                    "path": path,
                     "coordinateTransformations": [{
                         "type": "scale",
-                        "scale": [xy_res, xy_res, z_res]
+                        "scale": [s * f ** i for s, f in zip(base_scale, downscale)]
                     }]
-                }]
+                } for i, path in enumerate(paths)],
+                "type": downsample_method
             }]
         }
-        zarr.open(output_path, mode='a').attrs.update(attrs)
-        if verbose:
-            print(f"    Added NGFF-style .zattrs with resolutions (in mm): xy_res={xy_res}, z_res={z_res}")
+        zarr.open(str(output_path), mode='a').attrs.update(attrs)
+        if verbose and unit:
+            print(f"    Added NGFF-style .zattrs with resolutions (in microns): xy_res={xy_res}, z_res={z_res}")
 
 @print_func_name_args_times()
 def save_as_h5(ndarray, output_path, ndarray_axis_order="xyz"):
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+"""
+This module contains functions for a per-sample metadata index (./sample??/parameters/metadata_index.json).
+
+The index caches metadata read from image headers (shape, dtype, resolution, orientation) along with file fingerprints,
+as well as sample-level metadata (full res resolution and dimensions from ``io_metadata``), the padding percentage from ``reg``,
+and the padding offsets of padded images (e.g., the fixed input for registration), so that the unpadded region can be read without padding math.
+Commands can look up this metadata without reading image data.
+
+Main Functions:
+---------------
+- load_index: Load the index as a dict.
+- update_index: Update top-level entries of the index.
+- get_cached_img_metadata: Return the cached metadata for an image if its fingerprint is unchanged.
+- cache_img_metadata: Add or update the metadata for an image.
+- get_cached_padding: Return the padding offsets of a padded image if its fingerprint is unchanged.
+- cache_padding: Add or update the padding offsets of a padded image.
+
+Helper Functions:
+-----------------
+- find_index_path
+- fingerprint
+
+Index structure:
+----------------
+    {
+        "sample_metadata": {"xy_res": 3.5, "z_res": 6.0, "x_dim": 6000, "y_dim": 7000, "z_dim": 1200},
+        "pad_percent": {"/abs/path/sample01/reg_outputs": 0.25},
+        "images": {
+            "/abs/path/img.nii.gz": {"shape": [x, y, z], "dtype": "uint16", "xy_res": 50.0, "z_res": 50.0, "orientation": "RAS", "fingerprint": {...}}
+        },
+        "padding": {
+            "/abs/path/sample01/reg_outputs/autofl_50um_masked_fixed_reg_input.nii.gz": {"pad_widths": [x, y, z], "unpadded_shape": [x, y, z], "fingerprint": {...}}
+        }
+    }
+
+Note:
+    - Image shapes are in x, y, z order (like ``load_3D_img`` with desired_axis_order='xyz').
+    - Image metadata is read with ``unravel.core.img_io.img_metadata``, which uses this module for caching.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+
+INDEX_NAME = "metadata_index.json"
+
+_lock = threading.Lock()
+
+
+def find_index_path(path, parameters_dir="parameters", max_levels=3):
+    """Return the path of the index for the sample containing path (a sample dir or a file/dir within it), or None if no parameters dir is found."""
+    path = Path(path).resolve()
+    for parent in [path, *path.parents][:max_levels + 1]:
+        if (parent / parameters_dir).is_dir():
+            return parent / parameters_dir / INDEX_NAME
+    return None
+
+def load_index(index_path):
+    """Load the index as a dict (empty if the index is missing or unreadable)."""
+    if index_path is None or not Path(index_path).exists():
+        return {}
+    try:
+        with open(index_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def update_index(index_path, **entries):
+    """Update top-level entries of the index (dicts are merged, e.g., pad_percent={reg_outputs_path: 0.25}). The file is replaced atomically."""
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        index = load_index(index_path)
+        for key, value in entries.items():
+            if isinstance(value, dict) and isinstance(index.get(key), dict):
+                index[key].update(value)
+            else:
+                index[key] = value
+        tmp_path = index_path.with_name(f".{index_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, index_path)
+
+def fingerprint(img_path):
+    """Return a fingerprint (size and modification time) of an image file or directory (e.g., a TIFF series or .zarr)."""
+    img_path = Path(img_path)
+    stat = img_path.stat()
+    fp = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if img_path.is_dir():  # The dir mtime changes when files are added or removed
+        fp["n_entries"] = sum(1 for _ in os.scandir(img_path))
+    return fp
+
+def get_cached_img_metadata(index_path, img_path):
+    """Return the cached metadata (dict) for an image, or None if it is not cached or the file changed since it was cached."""
+    entry = load_index(index_path).get("images", {}).get(str(Path(img_path).resolve()))
+    if entry is None or entry.get("fingerprint") != fingerprint(img_path):
+        return None
+    return entry
+
+def cache_img_metadata(index_path, img_path, metadata):
+    """Add or update the metadata (dict) for an image in the index along with its fingerprint."""
+    entry = dict(metadata, fingerprint=fingerprint(img_path))
+    update_index(index_path, images={str(Path(img_path).resolve()): entry})
+
+def get_cached_padding(index_path, img_path):
+    """Return the padding offsets (dict with pad_widths and unpadded_shape per axis) of a padded image, or None if they are not cached or the file changed."""
+    entry = load_index(index_path).get("padding", {}).get(str(Path(img_path).resolve()))
+    if entry is None or entry.get("fingerprint") != fingerprint(img_path):
+        return None
+    return entry
+
+def cache_padding(index_path, img_path, pad_widths, unpadded_shape):
+    """Add or update the padding offsets (voxels added to each side of each axis) of a padded image along with its fingerprint."""
+    entry = {"pad_widths": [int(w) for w in pad_widths], "unpadded_shape": [int(d) for d in unpadded_shape], "fingerprint": fingerprint(img_path)}
+    update_index(index_path, padding={str(Path(img_path).resolve()): entry})
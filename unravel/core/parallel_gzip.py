@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+
+"""
+This module contains a multithreaded block-gzip codec (pigz/BGZF-style) for reading and writing .nii.gz files.
+
+Data is split into fixed-size blocks that are compressed in parallel as independent gzip members.
+Concatenated gzip members form a standard gzip stream, so the files open with any gzip/NIfTI reader (nibabel, FSL, ANTs, ITK-SNAP, gzip -d, etc.).
+Each member stores its compressed size in a gzip extra subfield ('UR'), so members can be located and decompressed in parallel when reading.
+Other .nii.gz files (e.g., from FSL or ANTs) are read with nibabel's default single-threaded gzip reader.
+
+Main Functions:
+---------------
+- use_parallel_gzip: Register the codec with nibabel so that nib.load() and nib.save() use it for .nii.gz files (or restore nibabel's gzip opener).
+- parallel_gzip_open: Open a .gz file with the codec (falls back to nibabel's gzip opener when the codec is disabled or not applicable).
+
+Helper Functions:
+-----------------
+- get_gzip_threads
+- parallel_gzip_enabled
+- is_block_gzip
+
+Classes:
+--------
+- ParallelGzipFile: File-like object for reading and writing block-gzip files.
+
+Note:
+    - The codec is optional. The thread count is set with Configuration.gzip_threads (or the UNRAVEL_GZIP_THREADS environment variable). Default: 1 (disabled; nibabel's gzip is used).
+    - ``unravel.core.img_io`` calls use_parallel_gzip() on import only if UNRAVEL_GZIP_THREADS (or Configuration.gzip_threads) is set to more than 1.
+    - If Configuration.gzip_threads is set after importing img_io, call use_parallel_gzip() to register the codec.
+
+Usage:
+------
+    from unravel.core.config import Configuration
+    from unravel.core.parallel_gzip import use_parallel_gzip
+
+    Configuration.gzip_threads = 8
+    use_parallel_gzip()
+    nib.save(nii, 'path/img.nii.gz')
+"""
+
+import io
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import nibabel.openers
+from nibabel.openers import ImageOpener, Opener
+
+from unravel.core.config import Configuration
+
+# nibabel's gzip opener is public (gzip_open) in some releases and private (_gzip_open) in others (e.g., 5.3)
+gzip_open = getattr(nibabel.openers, 'gzip_open', None) or nibabel.openers._gzip_open
+
+
+BLOCK_SIZE = 4 * 1024 ** 2  # Uncompressed bytes per gzip member
+
+# Member header: magic, CM=deflate, FLG=FEXTRA, MTIME=0, XFL=0, OS=unknown, XLEN=8, subfield 'UR' with a 4-byte compressed member size
+_HEADER = struct.Struct('<4sIBBH2sHI')
+_HEADER_START = b'\x1f\x8b\x08\x04'
+_SUBFIELD_ID = b'UR'
+_TRAILER = struct.Struct('<II')  # CRC32, ISIZE
+
+
+def get_gzip_threads():
+    """Return the number of threads for the codec (Configuration.gzip_threads, then the UNRAVEL_GZIP_THREADS environment variable, otherwise 1)."""
+    threads = Configuration.gzip_threads
+    if threads is None:
+        threads = os.environ.get('UNRAVEL_GZIP_THREADS') or 1
+    return max(int(threads), 1)
+
+
+def parallel_gzip_enabled():
+    """Return True if the codec was enabled with more than 1 thread (Configuration.gzip_threads or UNRAVEL_GZIP_THREADS)."""
+    return get_gzip_threads() > 1
+
+
+def _compress_member(data, compresslevel):
+    """Compress a block as a standalone gzip member with its compressed size in the 'UR' extra subfield."""
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+    deflated = compressor.compress(data) + compressor.flush()
+    member_size = _HEADER.size + len(deflated) + _TRAILER.size
+    header = _HEADER.pack(_HEADER_START, 0, 0, 255, 8, _SUBFIELD_ID, 4, member_size)
+    trailer = _TRAILER.pack(zlib.crc32(data), len(data) & 0xFFFFFFFF)
+    return header + deflated + trailer
+
+
+def _decompress_member(member):
+    """Decompress a gzip member written by _compress_member() and check its CRC32."""
+    data = zlib.decompress(member[_HEADER.size:-_TRAILER.size], -zlib.MAX_WBITS)
+    crc, _ = _TRAILER.unpack(member[-_TRAILER.size:])
+    if zlib.crc32(data) != crc:
+        raise OSError("CRC check failed while decompressing a gzip member")
+    return data
+
+
+def _read_member_size(fileobj):
+    """Read a member header at the current position and return the compressed member size (None if the member was not written by this codec)."""
+    header = fileobj.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    start, _, _, _, xlen, subfield_id, subfield_len, member_size = _HEADER.unpack(header)
+    if start != _HEADER_START or xlen != 8 or subfield_id != _SUBFIELD_ID or subfield_len != 4:
+        return None
+    return member_size
+
+
+def is_block_gzip(filename):
+    """Return True if the file starts with a gzip member written by this codec."""
+    if hasattr(filename, 'read'):
+        return False
+    with open(filename, 'rb') as f:
+        return _read_member_size(f) is not None
+
+
+class ParallelGzipFile(io.IOBase):
+    """
+    File-like object for reading and writing block-gzip files with a pool of threads.
+
+    Parameters
+    ----------
+    filename : str or Path
+        Path to the .gz file.
+    mode : str
+        'rb' or 'wb' ('r' and 'w' are accepted). Default: 'rb'.
+    compresslevel : int
+        zlib compression level (1-9) for writing. Default: 1 (nibabel's default for .nii.gz).
+    threads : int, optional
+        Number of compression/decompression threads. Default: get_gzip_threads().
+    block_size : int
+        Uncompressed bytes per gzip member for writing. Default: 4 MiB.
+
+    Note:
+        - Reading requires a file written by this class (see is_block_gzip). Use parallel_gzip_open() to fall back to gzip for other files.
+        - Random access is supported for reading (seek/tell). Writing is sequential.
+        - fileno() is not supported, so nibabel reads the data with readinto() instead of memory mapping the compressed file.
+    """
+
+    def __init__(self, filename, mode='rb', compresslevel=1, threads=None, block_size=BLOCK_SIZE):
+        super().__init__()
+        if mode not in ('r', 'rb', 'w', 'wb'):
+            raise ValueError(f"Unsupported mode for ParallelGzipFile: {mode}")
+        self.name = str(filename)
+        self.mode = mode[0] + 'b'
+        self._threads = threads or get_gzip_threads()
+        self._executor = ThreadPoolExecutor(max_workers=self._threads)
+        self._fileobj = open(filename, self.mode)
+        self._pos = 0  # Position in the uncompressed stream
+
+        if self.mode == 'wb':
+            self._compresslevel = compresslevel
+            self._block_size = block_size
+            self._buffer = bytearray()
+            self._pending = deque()  # Futures for compressed members (written in order)
+        else:
+            self._index_members()
+            self._cached_member = None  # (member index, decompressed data) for small sequential reads
+
+    def _index_members(self):
+        """Locate each member's compressed offset/size and uncompressed offset/size from the headers and trailers."""
+        self._offsets, self._sizes, self._starts, self._lengths = [], [], [], []
+        file_size = os.fstat(self._fileobj.fileno()).st_size
+        offset = start = 0
+        while offset < file_size:
+            self._fileobj.seek(offset)
+            member_size = _read_member_size(self._fileobj)
+            if member_size is None or offset + member_size > file_size:
+                raise OSError(f"{self.name} is not a block-gzip file written by ParallelGzipFile")
+            self._fileobj.seek(offset + member_size - 4)
+            length = struct.unpack('<I', self._fileobj.read(4))[0]
+            self._offsets.append(offset)
+            self._sizes.append(member_size)
+            self._starts.append(start)
+            self._lengths.append(length)
+            offset += member_size
+            start += length
+        self._size = start
+
+    def _read_member(self, i):
+        """Read the compressed bytes of member i (positional reads are thread-safe)."""
+        return os.pread(self._fileobj.fileno(), self._sizes[i], self._offsets[i])
+
+    def _decompress(self, i):
+        return _decompress_member(self._read_member(i))
+
+    # Reading
+    def readable(self):
+        return self.mode == 'rb'
+
+    def seekable(self):
+        return self.mode == 'rb'
+
+    def readinto(self, buffer):
+        self._check_open()
+        if self.mode != 'rb':
+            raise io.UnsupportedOperation("File not open for reading")
+        out = memoryview(buffer).cast('B')
+        stop = min(self._pos + len(out), self._size)
+        if stop <= self._pos:
+            return 0
+
+        # Members overlapping [pos, stop)
+        first = self._member_at(self._pos)
+        last = self._member_at(stop - 1)
+        members = range(first, last + 1)
+
+        def copy(i, data):
+            lo = max(self._starts[i], self._pos)
+            hi = min(self._starts[i] + self._lengths[i], stop)
+            out[lo - self._pos:hi - self._pos] = data[lo - self._starts[i]:hi - self._starts[i]]
+
+        if len(members) == 1 and self._cached_member is not None and self._cached_member[0] == first:
+            copy(first, self._cached_member[1])
+        elif len(members) == 1:
+            data = self._decompress(first)
+            self._cached_member = (first, data)
+            copy(first, data)
+        else:
+            # Decompress in parallel with a bounded number of members in flight
+            pending = deque()
+            for i in members:
+                pending.append((i, self._executor.submit(self._decompress, i)))
+                if len(pending) >= 2 * self._threads:
+                    j, future = pending.popleft()
+                    copy(j, future.result())
+            while pending:
+                j, future = pending.popleft()
+                copy(j, future.result())
+
+        n = stop - self._pos
+        self._pos = stop
+        return n
+
+    def read(self, size=-1):
+        self._check_open()
+        if size is None or size < 0:
+            size = self._size - self._pos
+        buffer = bytearray(max(min(size, self._size - self._pos), 0))
+        n = self.readinto(buffer)
+        return bytes(buffer[:n])
+
+    def _member_at(self, pos):
+        """Binary search for the member containing uncompressed position pos."""
+        lo, hi = 0, len(self._starts) - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self._starts[mid] <= pos:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._check_open()
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            if self.mode != 'rb':
+                raise OSError("Seeking from the end is not supported in write mode")
+            offset += self._size
+        if self.mode == 'wb':
+            if offset != self._pos:
+                raise OSError("Negative or forward seek not supported in write mode")  # nibabel writes zeros to pad instead
+            return self._pos
+        if offset < 0:
+            raise ValueError("Negative seek position")
+        self._pos = offset
+        return self._pos
+
+    def tell(self):
+        self._check_open()
+        return self._pos
+
+    # Writing
+    def writable(self):
+        return self.mode == 'wb'
+
+    def write(self, data):
+        self._check_open()
+        if self.mode != 'wb':
+            raise io.UnsupportedOperation("File not open for writing")
+        data = memoryview(data).cast('B')
+        self._buffer += data
+        self._pos += len(data)
+        while len(self._buffer) >= self._block_size:
+            self._submit(bytes(self._buffer[:self._block_size]))
+            del self._buffer[:self._block_size]
+        return len(data)
+
+    def _submit(self, block):
+        """Compress a block in the pool and write finished members in order, with a bounded number in flight."""
+        self._pending.append(self._executor.submit(_compress_member, block, self._compresslevel))
+        while len(self._pending) > 2 * self._threads:
+            self._fileobj.write(self._pending.popleft().result())
+
+    def _check_open(self):
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self.mode == 'wb':
+                if self._buffer or self._pos == 0:  # An empty file still needs one member to be valid gzip
+                    self._submit(bytes(self._buffer))
+                    self._buffer = bytearray()
+                while self._pending:
+                    self._fileobj.write(self._pending.popleft().result())
+        finally:
+            self._executor.shutdown(wait=True)
+            self._fileobj.close()
+            super().close()
+
+
+def parallel_gzip_open(filename, mode='rb', compresslevel=1, mtime=0, keep_open=False):
+    """
+    Open a .gz file with ParallelGzipFile, falling back to nibabel's gzip opener when the codec is not applicable.
+
+    The signature matches nibabel's gzip opener so that it can be registered in Opener.compress_ext_map.
+
+    Parameters
+    ----------
+    filename : str or Path
+        Path to the .gz file.
+    mode : str
+        File mode. Default: 'rb'.
+    compresslevel : int
+        zlib compression level for writing. Default: 1.
+    mtime : int
+        gzip header mtime (only used by the fallback; block-gzip members have mtime=0).
+    keep_open : bool
+        Passed to nibabel's gzip opener (the fallback).
+
+    Returns
+    -------
+    file-like
+        ParallelGzipFile if the codec is enabled (more than 1 thread) and, for reading, if the file was written by the codec. Otherwise, nibabel's gzip file object.
+    """
+    threads = get_gzip_threads()
+    reading = 'r' in mode
+    if threads > 1 and mode in ('r', 'rb', 'w', 'wb') and not hasattr(filename, 'write'):
+        if not reading or is_block_gzip(filename):
+            return ParallelGzipFile(filename, mode, compresslevel, threads=threads)
+    return gzip_open(filename, mode, compresslevel, mtime, keep_open)
+
+
+def use_parallel_gzip(enable=True):
+    """Register parallel_gzip_open() with nibabel for .gz files (nib.load/nib.save of .nii.gz then use the codec). With enable=False, restore nibabel's gzip opener."""
+    opener = (parallel_gzip_open if enable else gzip_open, ('mode', 'compresslevel', 'mtime', 'keep_open'))
+    Opener.compress_ext_map['.gz'] = opener
+    ImageOpener.compress_ext_map['.gz'] = opener
@@ -57,6 +57,7 @@ from rich.progress import Progress, TextColumn, SpinnerColumn, BarColumn, TimeEl
 from rich.text import Text
 
 from unravel.core.config import Configuration, Config
+from unravel.core.metadata_index import find_index_path, load_index
 
 # TODO: Also output commands with default args to .verbose_command_log.txt or .command_log.txt. Rename to unravel_command_log.txt
 # TODO: Add a function for getting the stem from file names or paths that works with exensions with one or more dots.
@@ -504,6 +505,12 @@ def get_pad_percent(reg_outputs_path, pad_percent):
     if pad_percent is not None:
         return pad_percent
 
+    # Use the value recorded by ``reg`` in the metadata index if available
+    index_path = find_index_path(reg_outputs_path)
+    indexed_pad_percent = load_index(index_path).get("pad_percent", {}).get(str(Path(reg_outputs_path).resolve()))
+    if indexed_pad_percent is not None:
+        return indexed_pad_percent
+
     pad_txt = reg_outputs_path / "pad_percent.txt"
     if pad_txt.exists():
         with open(pad_txt, "r") as f:
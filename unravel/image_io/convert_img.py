@@ -120,11 +120,12 @@ def convert_img(img_file, save_as=None, output=None, force=False, channel=0, xy_
             print(f"{indent}[magenta]{out_path}[/magenta] [yellow]already exists for [/yellow][magenta]{img_path.name}[/magenta]. Skipping conversion.")
             return
 
-    # Load the image
+    # Load the image (lazily for .zarr outputs, so planes/chunks are streamed from the input into the zarr chunks in parallel)
+    lazy = save_as == '.zarr'
     if xy_res is None or z_res is None:
-        img, xy_res, z_res = load_3D_img(img_path, channel=channel, return_res=True, verbose=verbose)
+        img, xy_res, z_res = load_3D_img(img_path, channel=channel, return_res=True, verbose=verbose, lazy=lazy)
     else:
-        img = load_3D_img(img_path, channel=channel, verbose=verbose)
+        img = load_3D_img(img_path, channel=channel, verbose=verbose, lazy=lazy)
 
     # Save the image in the specified format
     save_3D_img(img, output_path=out_path, ndarray_axis_order="xyz", xy_res=xy_res, z_res=z_res, data_type=dtype, reference_img=reference, verbose=verbose)
@@ -8,8 +8,10 @@ Inputs:
 
 Outputs:
     - ./parameters/metadata.txt (path should be relative to ./sample??)
+    - ./parameters/metadata_index.json (header metadata of the image, see ``unravel.core.metadata_index``)
 
 Note:
+    - Only image headers are read (TIFF tags, NIfTI header, zarr .zattrs, CZI XML, HDF5 attributes), not the voxel data.
     - If -d is not provided, the current directory is used to search for sample?? dirs to process. 
     - If the current dir is a sample?? dir, it will be processed.
     - If -d is provided, the specified dirs and/or dirs containing sample?? dirs will be processed.
@@ -28,8 +30,6 @@ Usage for when metadata is not extractable:
     io_metadata -i tif_dir -x 3.5232 -z 6 [-m parameters/metadata.txt] [-d space-separated list of paths] [-p pattern] [-v]
 """
 
-from pathlib import Path
-import cv2
 from rich.live import Live
 from rich import print
 from rich.traceback import install
@@ -37,7 +37,8 @@ from rich.traceback import install
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 
 from unravel.core.config import Configuration
-from unravel.core.img_io import load_3D_img, resolve_path, save_metadata_to_file
+from unravel.core.img_io import img_metadata, resolve_path, save_metadata_to_file
+from unravel.core.metadata_index import INDEX_NAME
 from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg, get_samples, initialize_progress_bar
 
 
@@ -65,14 +66,6 @@ def print_metadata(metadata_path):
         contents = f.read()
     print(f'\n{contents}\n')
 
-def get_dims_from_tifs(tifs_path):
-    # Get dims quickly from full res tifs (Using a generator without converting to a list to be memory efficient)
-    tifs = Path(tifs_path).resolve().glob("*.tif") # Generator
-    tif_file = next(tifs, None) # First item in generator
-    tif_img = cv2.imread(str(tif_file), cv2.IMREAD_UNCHANGED) # Load first tif
-    x_dim, y_dim, z_dim = (tif_img.shape[1], tif_img.shape[0], sum(1 for _ in tifs) + 1) # For z count tifs + 1 (next() uses 1 generator item)
-    return x_dim, y_dim, z_dim
-
 
 @log_command
 def main():
@@ -97,13 +90,16 @@ def main():
                 print(f'\n\n{metadata_path} exists. Skipping...')
                 print_metadata(metadata_path)
             else: 
-                # Load image and save metadata to file
+                # Read the image headers (no voxel data) and save metadata to file
                 if img_path.exists():
-                    if img_path.is_dir and img_path.glob(f"*.tif") and args.xy_res is not None and args.z_res is not None:
-                        x_dim, y_dim, z_dim = get_dims_from_tifs(img_path)
-                        save_metadata_to_file(args.xy_res, args.z_res, x_dim, y_dim, z_dim, save_metadata=metadata_path)
-                    else: 
-                        load_3D_img(img_path, desired_axis_order="xyz", xy_res=args.xy_res, z_res=args.z_res, return_metadata=True, save_metadata=metadata_path, verbose=args.verbose)
+                    img_md = img_metadata(img_path, index_path=metadata_path.parent / INDEX_NAME)
+                    xy_res = args.xy_res if args.xy_res is not None else img_md["xy_res"]
+                    z_res = args.z_res if args.z_res is not None else img_md["z_res"]
+                    if xy_res is None or z_res is None:
+                        print(f"    [red1]Resolution could not be extracted from {img_path}. Provide it with -x and -z. Skipping...")
+                    else:
+                        x_dim, y_dim, z_dim = img_md["shape"]
+                        save_metadata_to_file(xy_res, z_res, x_dim, y_dim, z_dim, save_metadata=metadata_path)
                         print(f'\n\n{metadata_path}:')
                         print_metadata(metadata_path)
                 else:
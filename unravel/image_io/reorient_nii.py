@@ -157,6 +157,27 @@ def transform_nii_affine(nii, target_ort, zero_origin=False):
 
     return new_affine
 
+def reorient_nii_header(nii, target_ort, zero_origin=False, form_code=None):
+    """Return the affine and header that reorient_nii(..., apply=False) sets, without reading the image data (e.g., for save_padded_nii()).
+
+    Args:
+        nii (nibabel.nifti1.Nifti1Image): Input NIfTI image.
+        target_ort (str): Target orientation axis codes (e.g., RAS).
+        zero_origin (bool): Whether to zero the origin of the affine matrix.
+        form_code (int): Code for spatial coordinate type (e.g., 1 = scanner; 2 = aligned).
+
+    Returns:
+        tuple: (new_affine, nib.Nifti1Header)
+    """
+    new_affine = transform_nii_affine(nii, target_ort, zero_origin=zero_origin)
+    header = nib.Nifti1Header()
+    header.set_data_dtype(nii.header.get_data_dtype())
+    header['xyzt_units'] = 10  # mm, s
+    header['regular'] = b'r'
+    header.set_qform(new_affine, code=form_code if form_code else int(nii.header['qform_code']))
+    header.set_sform(new_affine, code=form_code if form_code else int(nii.header['sform_code']))
+    return new_affine, header
+
 def reorient_nii(nii, target_ort, zero_origin=False, apply=False, form_code=None):
     """Reorient a NIfTI image or its affine matrix to a target orientation.
 
@@ -26,6 +26,8 @@ from rich.traceback import install
 
 from unravel.core.config import Configuration
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
+from unravel.core.img_io import nii_to_ndarray
+from unravel.core.img_tools import relabel
 
 from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg
 
@@ -69,18 +71,11 @@ def main():
 
     # Load the NIfTI image
     nii = nib.load(args.input)
-    img = nii.get_fdata(dtype=np.float32)
+    img = nii_to_ndarray(nii, scaling='raw')  # Stored label IDs in the on-disk dtype (no float copy)
 
-    # Initialize an empty ndarray with the same shape as img and data type uint16
-    if args.data_type: 
-        new_img_array = np.zeros(img.shape, dtype=args.data_type)
-    else:
-        new_img_array = np.zeros(img.shape, dtype=np.uint16)
-
-    # Replace voxel values in the new image array with the new labels
-    for old_label, new_label in zip(df[columns[0]], df[columns[1]]):
-        mask = img == old_label
-        new_img_array[mask] = new_label
+    # Replace voxel values with the new labels in one pass with a lookup table (labels not in the CSV become 0)
+    data_type = args.data_type if args.data_type else np.uint16
+    new_img_array = relabel(img, df[columns[0]].to_numpy(), df[columns[1]].to_numpy(), default=0, dtype=data_type)
 
     # Convert the ndarray to an NIfTI image and save
     new_nii = nib.Nifti1Image(new_img_array, nii.affine, nii.header)
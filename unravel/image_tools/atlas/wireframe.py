@@ -21,11 +21,12 @@ import numpy as np
 import pandas as pd
 from concurrent.futures import ThreadPoolExecutor
 from rich.traceback import install
-from scipy.ndimage import binary_dilation, binary_erosion
 
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 
 from unravel.core.config import Configuration
+from unravel.core.img_io import nii_to_ndarray
+from unravel.core.img_tools import label_stats, relabel
 from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg
 
 
@@ -45,67 +46,55 @@ def parse_args():
     return parser.parse_args()
 
 
-def process_intensity(args):
-    """
-    Process a single intensity: generate its binary mask, dilate, and find boundaries.
+def _outline_slab(ranks, start, stop):
+    """Return the wireframe for z-slices [start, stop): voxels with a 6-connected neighbor of lower rank (background and the volume edge have rank 0)."""
+    depth = ranks.shape[2]
+    block = np.asarray(ranks[:, :, max(start - 1, 0):min(stop + 1, depth)])
+    padded = np.pad(block, ((1, 1), (1, 1), (1 if start == 0 else 0, 1 if stop == depth else 0)))  # Neighbors beyond the edges are background
+    shape = (ranks.shape[0], ranks.shape[1], stop - start)
+    core = padded[1:1 + shape[0], 1:1 + shape[1], 1:1 + shape[2]]
+    wireframe = np.zeros(shape, dtype=bool)
+    for axis in range(3):
+        for offset in (-1, 1):
+            neighbor = padded[tuple(slice(1 + offset * (a == axis), 1 + shape[a] + offset * (a == axis)) for a in range(3))]
+            wireframe |= neighbor < core
+    return wireframe
+
+def generate_wireframe(atlas_ndarray, unique_intensities, slab_size=64, workers=None):
+    """Generate a wireframe image of an atlas NIfTI file where outlines are outside the regions and not inside smaller regions.
 
-    Args:
-        args (tuple): A tuple containing the ndarray and the intensity value.
+    Regions are ranked by size, and a voxel is outlined if a 6-connected neighbor belongs to a smaller region (its outline goes outside that region)
+    or to the background (outlines at the surface of the brain are internalized). This is found with neighbor comparisons in one pass over z-slabs,
+    so memory use stays proportional to the atlas volume.
 
-    Returns a tuple with:
-        binary_mask (np.ndarray): A binary mask for the given intensity.
-        boundary (np.ndarray): A binary boundary mask for the given intensity
-    """
-    atlas_ndarray, intensity = args
-    if intensity == 0:  # Skip background
-        # Return an empty mask and boundary
-        return np.zeros(atlas_ndarray.shape, dtype=bool), np.zeros(atlas_ndarray.shape, dtype=bool)
-    
-    binary_mask = atlas_ndarray == intensity # Create a binary mask for the current region
-    dilated = binary_dilation(binary_mask) # Dilate the mask
-    boundary = dilated != binary_mask # Outline the region (with the line outside the region)
-    return binary_mask, boundary
-
-def generate_wireframe(atlas_ndarray, unique_intensities):
-    """Generate a wireframe image of an atlas NIfTI file where outlines are outside the regions and not inside smaller regions.
-    
     Args:
         atlas_ndarray (np.ndarray): A 3D numpy array of an atlas NIfTI file.
         unique_intensities (np.ndarray): A list of unique intensity values in the atlas ndarray (sorted from smallest to largest regions)
+        slab_size (int): Number of z-slices processed at a time. Default: 64
+        workers (int): Number of threads. Default: None (ThreadPoolExecutor default)
 
     Returns:
         wireframe_image (np.ndarray): A binary wireframe image (1 = wireframe, 0 = background; uint8)
         wireframe_image_IDs (np.ndarray): A wireframe image with region IDs (uint16)
     """
-    
-    # Process intensities and boundaries with parallel execution
-    with ThreadPoolExecutor() as executor:
-        args = [(atlas_ndarray, intensity) for intensity in unique_intensities]
-        results = list(executor.map(process_intensity, args)) # List of (binary_mask, boundary) tuples
-
-    wireframe = np.zeros(atlas_ndarray.shape, dtype=bool) # Initialize empty wireframe
-    processed_regions_mask = np.zeros(atlas_ndarray.shape, dtype=bool) # Initialize empty mask
-
-    for binary_mask, boundary in results:
-        # Add binary mask to the processed regions mask
-        processed_regions_mask = np.logical_or(processed_regions_mask, binary_mask)
-
-        # Add the boundary in areas outside of the processed regions mask (excludes boundaries inside smaller regions)
-        wireframe = np.logical_or(wireframe, np.logical_and(boundary, np.logical_not(processed_regions_mask)))
-
-    # Internalize outlines at the surfaces of the brain
-    brain_mask = atlas_ndarray > 0
-    brain_mask_eroded = binary_erosion(brain_mask)
-    brain_outline = brain_mask_eroded != brain_mask
-    wireframe = wireframe * brain_mask # Zero out the wireframe outside the brain
-    wireframe = np.logical_or(wireframe, brain_outline) # Add the brain outline to the wireframe
-
-    # Convert boolean wireframe to binary image (1 = wireframe, 0 = background)
-    wireframe_img = wireframe.astype(np.uint16) 
-
-    # Add in Allen brain atlas region IDs (useful for coloring w/ a LUT)
-    wireframe_img_IDs = wireframe_img * atlas_ndarray 
-    return wireframe_img.astype(np.uint8), wireframe_img_IDs.astype(np.uint16)
+    # Rank regions from smallest (1) to largest (background = 0)
+    region_IDs = np.asarray(unique_intensities, dtype=np.int64)
+    region_IDs = region_IDs[region_IDs != 0]
+    rank_dtype = np.uint16 if len(region_IDs) < np.iinfo(np.uint16).max else np.uint32
+    ranks = relabel(atlas_ndarray, region_IDs, np.arange(1, len(region_IDs) + 1), default=0, dtype=rank_dtype, workers=workers)
+
+    wireframe = np.zeros(atlas_ndarray.shape, dtype=bool)
+    depth = atlas_ndarray.shape[2]
+    def outline(labels, start):
+        stop = min(start + slab_size, depth)
+        wireframe[:, :, start:stop] = _outline_slab(labels, start, stop)
+    starts = range(0, depth, slab_size)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(outline, [ranks] * len(starts), starts))
+
+    # Convert boolean wireframe to binary image (1 = wireframe, 0 = background) and add in Allen brain atlas region IDs (useful for coloring w/ a LUT)
+    wireframe_img_IDs = np.where(wireframe, atlas_ndarray, 0).astype(np.uint16)
+    return wireframe.astype(np.uint8), wireframe_img_IDs
 
 @log_command
 def main():
@@ -116,17 +105,12 @@ def main():
 
     # Load the NIfTI file
     atlas_nii = nib.load(args.input)
-    atlas_ndarray = atlas_nii.get_fdata(dtype=np.float32)
-
-    # Generate a binary mask for each unique intensity value
-    unique_intensities, voxel_counts = np.unique(atlas_ndarray, return_counts=True)
-
-    # Convert to int
-    unique_intensities = np.array([int(i) for i in unique_intensities])
+    atlas_ndarray = nii_to_ndarray(atlas_nii)
 
-    # Create df with unique intensities and counts
-    df = pd.DataFrame({'intensity': unique_intensities, 'voxel_count': voxel_counts})
-    df = df.sort_values('voxel_count', ascending=True)
+    # Count voxels for each region ID
+    stats = label_stats(atlas_ndarray)
+    df = pd.DataFrame({'intensity': stats['label'], 'voxel_count': stats['count']})
+    df = df.sort_values('voxel_count', ascending=True, kind='stable')
 
     # Sort the unique_intensities list based on the size of their corresponding regions (smallest to largest)
     unique_intensities = df['intensity'].values
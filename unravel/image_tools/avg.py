@@ -1,22 +1,32 @@
 #!/usr/bin/env python3
 
 """
-Use ``img_avg`` (``avg``) from UNRAVEL to average NIfTI images.
+Use ``img_avg`` (``avg``) from UNRAVEL to average NIfTI images (and optionally compute other voxelwise statistics).
+
+Outputs:
+    - avg.nii.gz (mean; -o)
+    - avg_sd.nii.gz, avg_median.nii.gz, avg_min.nii.gz, avg_max.nii.gz, avg_count.nii.gz (other statistics from -s are named after -o)
+
+Note:
+    - All requested statistics are computed in one pass over the images, which are read in z-slabs (bounded memory, regardless of the number of images).
+    - Slabs of the images are read by a pool of threads (prefetched while the previous slabs are reduced).
+    - Sums for the mean are accumulated in float32 with Kahan compensation (-acc kahan; accuracy close to float64). Use -acc float32 or -acc float64 to change this. The median is exact.
+    - The SD is the sample SD (ddof=1). NaNs are ignored, and count is the number of non-NaN values per voxel.
+    - The mean, median, min, and max are saved with the data type of the first image (rounded for integer types); the SD is saved as float32.
 
 Usage:
 ------
-    img_avg -i "<asterisk>.nii.gz" -o avg.nii.gz [-v]
+    img_avg -i "<asterisk>.nii.gz" -o avg.nii.gz [-s mean sd median min max count] [-acc kahan] [-sv 67108864] [-w 8] [-v]
 """
 
-import numpy as np
-import nibabel as nib
-from pathlib import Path
 from rich import print
 from rich.traceback import install
 
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 
 from unravel.core.config import Configuration
+from unravel.core.img_io import read_img_header
+from unravel.core.img_tools import IMAGE_STATS, image_stats
 from unravel.core.utils import log_command, match_files, verbose_start_msg, verbose_end_msg
 
 
@@ -26,13 +36,23 @@ def parse_args():
     opts = parser.add_argument_group('Optional arguments')
     opts.add_argument('-i', '--input', help="Input file(s) or pattern(s) to process. Default is '*.nii.gz'.",  nargs='*', default='*.nii.gz', action=SM)
     opts.add_argument('-o', '--output', help='Output file name. Default is "avg.nii.gz".', default='avg.nii.gz', action=SM)
+    opts.add_argument('-s', '--stats', help=f'Statistics to compute: {", ".join(IMAGE_STATS)}. Default: mean', nargs='*', choices=IMAGE_STATS, default=['mean'], action=SM)
+    opts.add_argument('-acc', '--accumulation', help='Accumulation for the sum behind the mean: float32, kahan (float32 w/ compensation), or float64. Default: kahan', choices=['float32', 'kahan', 'float64'], default='kahan', action=SM)
+    opts.add_argument('-sv', '--slab_voxels', help='Approximate number of voxels read at a time across all images. Default: 67108864 (2**26)', default=2**26, type=int, action=SM)
+    opts.add_argument('-w', '--workers', help='Number of threads for reading images. Default: None (Python default)', default=None, type=int, action=SM)
 
     general = parser.add_argument_group('General arguments')
     general.add_argument('-v', '--verbose', help='Increase verbosity. Default: False', action='store_true', default=False)
 
     return parser.parse_args()
 
-# TODO: Make output dirs if they don't exist
+
+def stat_output_paths(output, stats):
+    """Return the output path for each statistic (the mean is saved as output; others as <output stem>_<stat>.nii.gz)."""
+    output = str(output)
+    stem = output[:-len('.nii.gz')] if output.endswith('.nii.gz') else output
+    return {stat: output if stat == 'mean' else f"{stem}_{stat}.nii.gz" for stat in stats}
+
 
 @log_command
 def main():
@@ -46,35 +66,20 @@ def main():
 
     print(f'\n    Averaging: {str(file_paths)}\n')
 
-    # Initialize sum array and affine matrix
-    sum_image = None
-    affine = None
-
-    # Process each file
-    for file_path in file_paths:
-        nii = nib.load(str(file_path))
-        if sum_image is None:
-            sum_image = np.asanyarray(nii.dataobj, dtype=np.float64).squeeze()  # Use float64 to avoid overflow
-            affine = nii.affine
-            header = nii.header
-            data_type = nii.header.get_data_dtype()
-        else:
-            sum_image += np.asanyarray(nii.dataobj, dtype=np.float64).squeeze()
-    
-
-    # Calculate the average
-    average_image = sum_image / len(file_paths)
+    # Data type of the first image for the mean, median, min, and max (as for the average image before)
+    data_type = read_img_header(file_paths[0])["dtype"]
+    outputs = {}
+    for stat, path in stat_output_paths(args.output, dict.fromkeys(args.stats)).items():
+        outputs[stat] = (path, data_type) if stat in ('mean', 'median', 'min', 'max') else path
 
-    # Save the averaged image
-    averaged_nii = nib.Nifti1Image(average_image, affine, header)
-    averaged_nii.set_data_dtype(data_type)
-    output = Path(args.output)
-    output.parent.mkdir(parents=True, exist_ok=True)
-    nib.save(averaged_nii, output)
-    print(f"    Saved {output}\n")
+    # Compute all statistics in one pass and save them
+    image_stats(file_paths, outputs, slab_voxels=args.slab_voxels, workers=args.workers, accumulation=args.accumulation)
+    for output in outputs.values():
+        print(f"    Saved {output[0] if isinstance(output, tuple) else output}")
+    print('')
 
     verbose_end_msg()
     
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -15,7 +15,7 @@ from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 
 from unravel.core.config import Configuration
 from unravel.core.img_io import load_3D_img
-from unravel.core.img_tools import find_bounding_box, label_IDs
+from unravel.core.img_tools import find_bounding_box, label_stats
 from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg
 
 
@@ -59,14 +59,15 @@ def main():
         with open(args.outer_bbox, 'w') as f:
             f.write(f"{xmin}:{xmax}, {ymin}:{ymax}, {zmin}:{zmax}")
 
-    # Save cluster bboxes as txt
+    # Save cluster bboxes as txt (bboxes for all clusters are found in one pass)
+    stats = label_stats(img)
     if args.cluster:
         clusters = [int(args.cluster)]
     else:
-        clusters = label_IDs(img, min_voxel_count=1)
+        clusters = stats['label'].tolist()
 
     for cluster in clusters: 
-        xmin, xmax, ymin, ymax, zmin, zmax = find_bounding_box(img, cluster_ID=cluster)
+        xmin, xmax, ymin, ymax, zmin, zmax = find_bounding_box(img, cluster_ID=cluster, stats=stats)
         output = output_path / Path(args.input.replace('.nii.gz', f'_cluster{cluster}_bbox.txt')).name
         with open(output, 'w') as f:
             f.write(f"{xmin}:{xmax}, {ymin}:{ymax}, {zmin}:{zmax}")
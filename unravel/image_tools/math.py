@@ -9,8 +9,19 @@ Inputs:
 Outputs:
     - .nii.gz, .tif series, or .zarr depending on the output path extension
 
+Expressions:
+    - Use with the ``-e`` or ``--expression`` flag to combine any number of inputs (e.g., ``'(a - b) / c * (m > 0)'``)
+    - Inputs are named a, b, c, ... in sorted order, or explicitly with ``name=path`` (e.g., ``-i a=A.nii.gz m=mask.nii.gz``)
+    - Arithmetic: ``+``, ``-``, ``<asterisk>``, ``/``, ``//``, ``%``, ``<asterisk><asterisk>``
+    - Comparison: ``==``, ``!=``, ``>``, ``>=``, ``<``, ``<=`` (chained comparisons like ``0 < a < 5`` are supported)
+    - Logical: ``&`` or ``and``, ``|`` or ``or``, ``^`` (xor), ``~`` or ``not``
+    - Functions: ``abs``, ``sqrt``, ``exp``, ``log``, ``log10``, ``minimum``, ``maximum``, ``where``, ``clip``
+    - The expression is evaluated block by block (z-slabs) on a thread pool, so memory use is bounded and intermediates are block-sized.
+    - Inputs are cast to the compute dtype (``-cd``) before evaluation. By default, this is the smallest float dtype that holds every input exactly:
+      float32 for (u)int8/16 and float32 inputs, and float64 for 32/64-bit integer inputs (e.g., Allen atlas IDs > 2**24) and float64 inputs.
+
 Supported Operations:
-    - Use with the ``-n`` or ``--operation`` flag:
+    - Use with the ``-n`` or ``--operation`` flag to reduce the inputs with one operation (evaluated like an expression):
     - Arithmetic: ``+``, ``-``, ``<asterisk>``, ``/``, ``//``, ``%``, ``<asterisk><asterisk>``  
     - Comparison: ``==``, ``!=``, ``>``, ``>=``, ``<``, ``<=``  
     - Logical: ``and``, ``or``, ``xor``, ``not``  
@@ -34,8 +45,15 @@ Usage multiply three images and save as Zarr:
 Usage to binarize a single image and set to 8 bit:
 --------------------------------------------------
     img_math -i A.nii.gz -t 0.5 -o binarized.nii.gz -r A.nii.gz -d uint8
+
+Usage to evaluate an expression over several images (e.g., instead of chaining ``img_math`` and ``apply_mask``):
+---------------------------------------------------------------------------------------------------------------
+    img_math -i a=A.zarr b=B.zarr c=C.zarr m=mask.nii.gz -e '(a - b) / c <asterisk> (m > 0)' -o result.zarr [-w 16]
 """
 
+import ast
+import dask
+import dask.array as da
 import numpy as np
 from glob import glob
 from pathlib import Path
@@ -51,10 +69,11 @@ def parse_args():
     parser = RichArgumentParser(formatter_class=SuppressMetavar, add_help=False, docstring=__doc__)
 
     reqs = parser.add_argument_group('Required arguments')
-    reqs.add_argument('-i', '--input', help="Paths or glob patterns to the input images.", required=True, nargs='*', action=SM)
+    reqs.add_argument('-i', '--input', help="Paths or glob patterns to the input images (named a, b, c, ... in sorted order) or name=path pairs.", required=True, nargs='*', action=SM)
     reqs.add_argument('-o', '--output', help='Path to the output image', required=True, action=SM)
 
     opts = parser.add_argument_group('Optional args')
+    opts.add_argument('-e', '--expression', help="Expression over the named inputs (e.g., '(a - b) / c * (m > 0)').", default=None, action=SM)
     opts.add_argument('-n', '--operation', help="Numpy operation to perform (+, -, *, /, etc.).", default=None, action=SM)
     opts.add_argument('-t', '--threshold', help='Apply a lower threshold.', default=None, type=float, action=SM)
     opts.add_argument('-ut', '--upper_thres', help='Upper threshold for thresholding.', default=None, type=float, action=SM)
@@ -62,14 +81,15 @@ def parse_args():
     opts.add_argument('-F', '--False_val', help='Value to assign when threshold condition is false. Default: 0', default=0, type=float, action=SM)
     opts.add_argument('-d', '--dtype', help='Numpy array data type', default=None, action=SM)
     opts.add_argument('-r', '--reference', help='Reference image for .nii.gz metadata.', default=None, action=SM)
+    opts.add_argument('-cd', '--compute_dtype', help='Data type for evaluating the expression. Default: float32, or float64 for 32/64-bit integer or float64 inputs', default=None, action=SM)
+    opts.add_argument('-cv', '--chunk_voxels', help='Approximate number of voxels per block. Default: 4194304 (2**22)', default=2**22, type=int, action=SM)
+    opts.add_argument('-w', '--workers', help='Number of threads. Default: all CPU cores', default=None, type=int, action=SM)
 
     general = parser.add_argument_group('General arguments')
     general.add_argument('-v', '--verbose', help='Increase verbosity. Default: False', action='store_true', default=False)
 
     return parser.parse_args() 
 
-# TODO: Add support for chaining operations (e.g., img1 + img2 - img3 * img4)
-# TODO: Add the ability to apply operations to a single image (e.g., img1 * 2)
 # TODO: The logic for supporting multiple glob patterns could be centralized in a utility function
 # TODO: extend support to subtract for -, divide for /, etc. (currently only symbolic operations are supported)
 
@@ -142,6 +162,193 @@ def threshold_image(image, lower_thr=None, upper_thr=None, true_val=1, false_val
         mask &= image <= upper_thr
     return np.where(mask, true_val, false_val)
 
+# Expression evaluation
+BINARY_OPERATORS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.FloorDiv: np.floor_divide,
+    ast.Mod: np.mod,
+    ast.Pow: np.power,
+    ast.BitAnd: np.logical_and,
+    ast.BitOr: np.logical_or,
+    ast.BitXor: np.logical_xor,
+}
+COMPARISON_OPERATORS = {
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+}
+UNARY_OPERATORS = {
+    ast.USub: np.negative,
+    ast.UAdd: np.positive,
+    ast.Not: np.logical_not,
+    ast.Invert: np.logical_not,
+}
+EXPRESSION_FUNCTIONS = {
+    'abs': np.abs,
+    'sqrt': np.sqrt,
+    'exp': np.exp,
+    'log': np.log,
+    'log10': np.log10,
+    'minimum': np.minimum,
+    'maximum': np.maximum,
+    'where': np.where,
+    'clip': np.clip,
+}
+
+def operation_expression(operation, names):
+    """Return the expression for reducing the named inputs with one ``-n`` operation (e.g., '+' -> '(a + b) + c')."""
+    symbols = {'and': '&', 'or': '|', 'xor': '^'}
+    if operation == 'not':
+        return f"~{names[0]}"
+    if len(names) < 2:
+        raise ValueError(f"At least two images are required for operation: {operation}")
+    expression = names[0]
+    for name in names[1:]:
+        if operation == 'abs_diff':
+            expression = f"abs({expression} - {name})"
+        elif operation in symbols or operation in ('+', '-', '*', '/', '//', '%', '**', '==', '!=', '>', '>=', '<', '<='):
+            expression = f"({expression} {symbols.get(operation, operation)} {name})"
+        else:
+            raise ValueError("Unsupported operation.")
+    return expression
+
+def parse_expression(expression, names):
+    """Parse an expression and check that it only uses the named inputs, numbers, supported operators, and EXPRESSION_FUNCTIONS. Returns the AST."""
+    tree = ast.parse(expression.strip(), mode='eval')
+    allowed = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.Call, ast.Name, ast.Load, ast.Constant, ast.And, ast.Or,
+               *BINARY_OPERATORS, *COMPARISON_OPERATORS, *UNARY_OPERATORS)
+    for node in ast.walk(tree):
+        if not isinstance(node, allowed):
+            raise ValueError(f"Unsupported syntax in expression: {ast.unparse(node) if isinstance(node, ast.expr) else type(node).__name__}")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in EXPRESSION_FUNCTIONS or node.keywords:
+                raise ValueError(f"Unsupported function call in expression: {ast.unparse(node)}. Use: {', '.join(EXPRESSION_FUNCTIONS)}")
+        elif isinstance(node, ast.Name) and node.id not in names and node.id not in EXPRESSION_FUNCTIONS:
+            raise ValueError(f"Unknown name in expression: {node.id}. Inputs: {', '.join(names)}")
+        elif isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, bool)):
+            raise ValueError(f"Unsupported constant in expression: {node.value!r}")
+    return tree
+
+def _ufunc(ufunc, *operands):
+    """Apply a ufunc to (value, owned) operands, writing into an owned temporary when its shape and dtype match the result. Returns (result, True)."""
+    values = [value for value, _ in operands]
+    if isinstance(ufunc, np.ufunc):
+        with np.errstate(all='ignore'):
+            result_dtype = ufunc(*(np.zeros(1, value.dtype) if isinstance(value, np.ndarray) else value for value in values)).dtype
+        shape = np.broadcast_shapes(*(np.shape(value) for value in values))
+        for value, owned in operands:
+            if owned and value.shape == shape and value.dtype == result_dtype:
+                return ufunc(*values, out=value), True
+    return ufunc(*values), True
+
+def evaluate_expression(tree, blocks):
+    """Evaluate a parsed expression (see parse_expression) on a dict of blocks (name: ndarray). Intermediates are reused in place where possible."""
+    def evaluate(node):
+        if isinstance(node, ast.Expression):
+            return evaluate(node.body)
+        if isinstance(node, ast.Constant):
+            return node.value, False
+        if isinstance(node, ast.Name):
+            return blocks[node.id], False
+        if isinstance(node, ast.BinOp):
+            return _ufunc(BINARY_OPERATORS[type(node.op)], evaluate(node.left), evaluate(node.right))
+        if isinstance(node, ast.UnaryOp):
+            return _ufunc(UNARY_OPERATORS[type(node.op)], evaluate(node.operand))
+        if isinstance(node, ast.BoolOp):
+            ufunc = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            result = evaluate(node.values[0])
+            for value in node.values[1:]:
+                result = _ufunc(ufunc, result, evaluate(value))
+            return result
+        if isinstance(node, ast.Compare):  # a < b < c -> (a < b) & (b < c)
+            left, result = evaluate(node.left), None
+            for op, comparator in zip(node.ops, node.comparators):
+                right = evaluate(comparator)
+                comparison = _ufunc(COMPARISON_OPERATORS[type(op)], left, (right[0], False))
+                result = comparison if result is None else _ufunc(np.logical_and, result, comparison)
+                left = right
+            return result
+        if isinstance(node, ast.Call):
+            return _ufunc(EXPRESSION_FUNCTIONS[node.func.id], *(evaluate(arg) for arg in node.args))
+        raise ValueError(f"Unsupported syntax in expression: {ast.unparse(node)}")
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return evaluate(tree)[0]
+
+@print_func_name_args_times()
+def image_expression(expression, images, compute_dtype=None, dtype=None, lower_thr=None, upper_thr=None, true_val=1, false_val=0, chunk_voxels=2**22):
+    """
+    Build a lazy dask array that evaluates an expression over N images block by block (fused: each block is read, evaluated, and cast in one task).
+
+    Parameters
+    ----------
+    expression : str
+        Expression over the image names (e.g., '(a - b) / c * (m > 0)'). See the module docstring for supported syntax.
+    images : dict
+        Image names and 3D arrays with the same shape (ndarrays or lazy arrays, e.g., from load_3D_img(..., lazy=True)).
+    compute_dtype : data-type, optional
+        dtype that blocks are cast to before evaluation (avoids integer wraparound, e.g., for uint16 differences).
+        Default: None (np.result_type(np.float32, *input dtypes), so 32/64-bit integer labels are evaluated exactly in float64).
+    dtype : data-type, optional
+        Output dtype. Default: None (the dtype of the result; boolean results are saved as uint8).
+    lower_thr, upper_thr, true_val, false_val : float, optional
+        Optional thresholding of the result (see threshold_image()).
+    chunk_voxels : int, optional
+        Approximate number of voxels per block (z-slabs). Default: 2**22.
+
+    Returns
+    -------
+    dask.array.Array
+        Lazy result. Compute it or pass it to save_as_nii(), save_as_tifs(), or save_as_zarr(), which write it a few blocks at a time.
+    """
+    names = list(images)
+    tree = parse_expression(expression, names)
+    shapes = {tuple(img.shape) for img in images.values()}
+    if len(shapes) != 1:
+        raise ValueError("All input images must have the same shape.")
+    shape = shapes.pop()
+    if compute_dtype is None:
+        compute_dtype = np.result_type(np.float32, *[img.dtype for img in images.values()])
+
+    def evaluate_block(*blocks):
+        blocks = {name: np.asarray(block).astype(compute_dtype, copy=False) for name, block in zip(names, blocks)}
+        result = np.broadcast_to(evaluate_expression(tree, blocks), blocks[names[0]].shape)
+        if lower_thr is not None or upper_thr is not None:
+            result = threshold_image(result, lower_thr, upper_thr, true_val, false_val)
+        return result.astype(out_dtype, copy=False)
+
+    # Output dtype from evaluating a one-voxel block
+    if dtype is None:
+        probe = np.asarray(evaluate_expression(tree, {name: np.ones(1, dtype=compute_dtype) for name in names}))
+        if lower_thr is not None or upper_thr is not None:
+            probe = threshold_image(probe, lower_thr, upper_thr, true_val, false_val)
+        dtype = np.uint8 if probe.dtype == bool else probe.dtype
+    out_dtype = np.dtype(dtype)
+
+    # Blocks are z-slabs of whole xy planes (each input is rechunked to match)
+    chunks = (shape[0], shape[1], max(1, min(shape[2], chunk_voxels // max(1, shape[0] * shape[1]))))
+    arrays = [(img if isinstance(img, da.Array) else da.from_array(img, chunks=chunks)).rechunk(chunks) for img in images.values()]
+    return da.map_blocks(evaluate_block, *arrays, dtype=out_dtype)
+
+def named_inputs(inputs):
+    """Return a dict of input names and paths from name=path pairs or paths/glob patterns (named a, b, c, ... in sorted order)."""
+    named = dict(item.split('=', 1) for item in inputs if '=' in item and not Path(item).exists())
+    patterns = [item for item in inputs if '=' not in item or Path(item).exists()]
+    if named and patterns:
+        raise ValueError("Use either name=path pairs or paths/glob patterns for the inputs.")
+    if named:
+        return named
+    img_paths = sorted(match_files(patterns))
+    if len(img_paths) > 26:
+        raise ValueError("Up to 26 unnamed inputs are supported (a to z). Use name=path pairs for more.")
+    return {chr(ord('a') + i): str(p) for i, p in enumerate(img_paths)}
+
 @log_command
 def main():    
     install()
@@ -149,53 +356,35 @@ def main():
     Configuration.verbose = args.verbose
     verbose_start_msg()
     
-    img_paths = match_files(args.input)
-
-    # Sort and load
-    img_paths = sorted(img_paths)
-    images = [load_3D_img(str(p), verbose=args.verbose) for p in img_paths]
-
-    if not images:
+    inputs = named_inputs(args.input)
+    if not inputs:
         raise ValueError("No valid images loaded. Check the input paths and formats.") 
+    names = list(inputs)
 
-    # Ensure all images are the same shape
-    shape0 = images[0].shape
-    if not all(img.shape == shape0 for img in images):
-        raise ValueError("All input images must have the same shape.")
-
-    # If an operation is specified and there is more than one image, reduce using the operation
-    if args.operation:
-        if len(images) == 1:
-            raise ValueError("At least two images are required for operation: {}".format(args.operation))
-        result = images[0]
-        for img in images[1:]:
-            result = apply_operation(result, img, args.operation)
+    # Build the expression (a single image is passed through, e.g., for thresholding or conversion)
+    if args.expression:
+        expression = args.expression
+    elif args.operation:
+        expression = operation_expression(args.operation, names)
     else:
-        if len(images) > 1:
+        if len(names) > 1:
             raise ValueError("Multiple images provided, but no operation specified.")
-        result = images[0]
-
-    # Apply thresholding
-    if args.threshold is not None or args.upper_thres is not None:
-        result = threshold_image(
-            result,
-            lower_thr=args.threshold,
-            upper_thr=args.upper_thres,
-            true_val=args.True_val,
-            false_val=args.False_val
-        )
-
-    # Set data type
-    if args.dtype: 
-        result = result.astype(args.dtype)
-
-    # Save image    
-    if args.output.endswith('.nii.gz'):
-        save_as_nii(result, args.output, reference=args.reference, data_type=args.dtype)
-    elif args.output.endswith('.tif'):
-        save_as_tifs(result, args.output)
-    elif args.output.endswith('.zarr'):
-        save_as_zarr(result, args.output)
+        expression = names[0]
+
+    # Load images lazily (blocks are read as they are evaluated)
+    images = {name: load_3D_img(str(path), verbose=args.verbose, lazy=True) for name, path in inputs.items()}
+    result = image_expression(expression, images, compute_dtype=args.compute_dtype, dtype=args.dtype,
+                              lower_thr=args.threshold, upper_thr=args.upper_thres, true_val=args.True_val, false_val=args.False_val,
+                              chunk_voxels=args.chunk_voxels)
+
+    # Save image (blocks are evaluated on a thread pool and written as they are computed)
+    with dask.config.set(scheduler='threads', num_workers=args.workers):
+        if args.output.endswith('.nii.gz'):
+            save_as_nii(result, args.output, reference=args.reference, data_type=args.dtype)
+        elif args.output.endswith('.tif'):
+            save_as_tifs(result, args.output)
+        elif args.output.endswith('.zarr'):
+            save_as_zarr(result, args.output)
 
     verbose_end_msg()
     
@@ -15,6 +15,7 @@ from rich.traceback import install
 
 from unravel.core.config import Configuration
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
+from unravel.core.img_tools import relabel
 from unravel.core.utils import log_command, print_func_name_args_times, verbose_start_msg, verbose_end_msg
 
 
@@ -56,8 +57,7 @@ def set_labels(img, label_IDs, value=0):
     ndarray
         The modified image with specified label IDs set to the given value.
     """
-    img[np.isin(img, label_IDs)] = value  # Creates a boolean mask of the label IDs and sets them to the specified value
-    return img
+    return relabel(img, label_IDs, np.full(len(label_IDs), value))  # One pass with a lookup table (other labels are unchanged)
 
 def retain_labels(img, label_IDs, omit_value=0):
     """
@@ -77,8 +77,7 @@ def retain_labels(img, label_IDs, omit_value=0):
     ndarray
         The modified image with only the specified label IDs retained.
     """
-    img[~np.isin(img, label_IDs)] = omit_value  # ~ inverts the boolean mask
-    return img
+    return relabel(img, label_IDs, label_IDs, default=omit_value)  # Specified labels map to themselves, others to omit_value
 
 
 @log_command
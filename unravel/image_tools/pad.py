@@ -9,14 +9,13 @@ Usage:
 """
 
 import nibabel as nib
-import numpy as np
 from rich.traceback import install
 
 from unravel.image_io.nii_info import nii_axis_codes
-from unravel.image_io.reorient_nii import reorient_nii
+from unravel.image_io.reorient_nii import reorient_nii_header
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 from unravel.core.config import Configuration
-from unravel.core.img_tools import pad
+from unravel.core.img_tools import save_padded_nii
 from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg
 
 
@@ -47,32 +46,24 @@ def main():
     verbose_start_msg()
 
     nii = nib.load(args.input)
-
     data_type = nii.header.get_data_dtype()
-    img = np.asanyarray(nii.dataobj, dtype=data_type).squeeze()
-
-    # Pad the image
-    img = pad(img, pad_percent=args.pad_percent)
-
-    # Save the padded image
-    fixed_img_padded_nii = nib.Nifti1Image(img, nii.affine, nii.header)
-    fixed_img_padded_nii.set_data_dtype(data_type)
 
     # Set the orientation of the image (use if not already set correctly in the header; check with ``io_reorient_nii``)
     if args.ort_code: 
-        fixed_img_padded_nii = reorient_nii(fixed_img_padded_nii, args.ort_code, zero_origin=args.zero_origin, apply=False, form_code=1)
+        ort_code = args.ort_code
     elif args.ref_nii:
-        ref_nii = nib.load(args.ref_nii)
-        ort_code = nii_axis_codes(ref_nii)
-        fixed_img_padded_nii = reorient_nii(fixed_img_padded_nii, ort_code, zero_origin=args.zero_origin, apply=False, form_code=1)
+        ort_code = nii_axis_codes(nib.load(args.ref_nii))
     else:
-        fixed_img_padded_nii = reorient_nii(fixed_img_padded_nii, nii_axis_codes(nii), zero_origin=args.zero_origin, apply=False, form_code=1)
+        ort_code = nii_axis_codes(nii)
+    affine, header = reorient_nii_header(nii, ort_code, zero_origin=args.zero_origin, form_code=1)
 
     if args.output is None:
         padded_img_path = args.input.replace('.nii.gz', '_pad.nii.gz')
     else:
         padded_img_path = args.output
-    nib.save(fixed_img_padded_nii, padded_img_path)
+
+    # Save the padded image (written slab by slab from the unpadded image)
+    save_padded_nii(nii.dataobj, padded_img_path, pad_percent=args.pad_percent, affine=affine, header=header, dtype=data_type)
 
     verbose_end_msg()
 
@@ -1,46 +1,63 @@
 #!/usr/bin/env python3
 
 """
-Use ``img_rb`` (``rb``) from UNRAVEL to perform rolling ball background subtraction on a TIFF file.
+Use ``img_rb`` (``rb``) from UNRAVEL to perform rolling ball background subtraction on a TIFF file or a 3D image.
+
+Input image types:
+    - 2D: a single .tif (an image with one page)
+    - 3D: .czi, .nii.gz, .ome.tif series, .tif (multi-page), .h5, or .zarr
+
+Output image types:
+    - 2D: .tif
+    - 3D: .nii.gz, .tif series, .h5, or .zarr (Default: input_rb<radius>.nii.gz)
 
 Note:
+    - 3D images are streamed in z-slabs through a process pool (-w), so they do not need to fit in memory.
+    - -m 2D uses a disk in each xy plane. -m 3D uses a ball (in voxels).
+    - -ds (e.g., 4 for -rb 40) approximates the opening on a downsampled image, which is much faster for large radii.
     - Radius for rolling ball subtraction should be ~ 1.0 to 2.0 times the size of the features of interest
     - Larger radii will remove more background, but may also remove some of the features of interest
     - Smaller radii will remove less background, but may leave some background noise
 
 Usage:
 ------
-    img_rb -i input.tif -rb 4 [-o output.tif] [-v]
+    img_rb -i input.tif -rb 4 [-o output.tif] [-m 2D] [-ds 1] [-c 0] [-w 8] [-v]
 """
 
 import cv2
 import numpy as np
+import tifffile
+from pathlib import Path
 from rich import print
 from rich.traceback import install
 
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 
 from unravel.core.config import Configuration
-from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg
+from unravel.core.img_io import load_3D_img, save_3D_img
+from unravel.core.img_tools import rolling_ball_subtraction_chunked
+from unravel.core.utils import get_stem, log_command, verbose_start_msg, verbose_end_msg
 
 
 def parse_args():
     parser = RichArgumentParser(formatter_class=SuppressMetavar, add_help=False, docstring=__doc__)
 
     reqs = parser.add_argument_group('Required arguments')
-    reqs.add_argument('-i', '--input', help='Path to the input TIFF file.', required=True, action=SM)
+    reqs.add_argument('-i', '--input', help='Path to the input TIFF file or 3D image.', required=True, action=SM)
     reqs.add_argument('-rb', '--rb_radius', help='Radius of rolling ball in pixels.', required=True, type=int, action=SM)
 
     opts = parser.add_argument_group('Optional arguments')
-    opts.add_argument('-o', '--output', help='Path to save the output TIFF file.', default=None, action=SM)
+    opts.add_argument('-o', '--output', help='Path to save the output image. Default: input_rb<radius>.tif (2D) or input_rb<radius>.nii.gz (3D)', default=None, action=SM)
+    opts.add_argument('-m', '--mode', help='Rolling ball shape: 2D (disk in xy planes) or 3D (ball). Default: 2D', default='2D', choices=['2D', '3D'], action=SM)
+    opts.add_argument('-ds', '--downsample', help='Downsampling factor for approximate rolling ball subtraction (faster for large radii). Default: 1 (exact)', default=1, type=int, action=SM)
+    opts.add_argument('-c', '--channel', help='Channel index for 3D images (.czi, .h5, .zarr). Default: 0', default=0, type=int, action=SM)
+    opts.add_argument('-w', '--workers', help='Number of worker processes for 3D images. Default: 8', default=8, type=int, action=SM)
 
     general = parser.add_argument_group('General arguments')
     general.add_argument('-v', '--verbose', help='Increase verbosity. Default: False', action='store_true', default=False)
 
     return parser.parse_args()
 
-# TODO: Add support for other image types and 3D images. 
-
 def load_tif(tif_path):
     '''Load a single tif file using OpenCV and return ndarray.'''
     img = cv2.imread(tif_path, cv2.IMREAD_UNCHANGED)
@@ -60,6 +77,13 @@ def save_tif(img, output_path):
     '''Save an image as a tif file.'''
     cv2.imwrite(output_path, img)
 
+def is_2D_tif(img_path):
+    '''Return True if img_path is a .tif file with a single 2D page.'''
+    if not str(img_path).endswith(('.tif', '.tiff')) or not Path(img_path).is_file():
+        return False
+    with tifffile.TiffFile(img_path) as tif:
+        return len(tif.series[0].shape) == 2
+
 
 @log_command
 def main():
@@ -68,16 +92,33 @@ def main():
     Configuration.verbose = args.verbose
     verbose_start_msg()
 
-    # Load the image
-    img = load_tif(args.input)
-
-    # Apply rolling ball subtraction
-    img = rolling_ball_subtraction(img, args.rb_radius)
-    print(f'Applied rolling ball subtraction with radius {args.rb_radius}.')
-
-    # Save the processed image
-    output_path = args.output if args.output is not None else args.input.replace('.tif', f'_rb{args.rb_radius}.tif')
-    save_tif(img, output_path)
+    if is_2D_tif(args.input):
+        # Load the image
+        img = load_tif(args.input)
+
+        # Apply rolling ball subtraction
+        if args.mode == '2D' and args.downsample == 1:
+            img = rolling_ball_subtraction(img, args.rb_radius)
+        else:
+            img = rolling_ball_subtraction_chunked(img[:, :, np.newaxis], args.rb_radius, ball=args.mode, downsample=args.downsample, workers=1, use_processes=False)[:, :, 0]
+        print(f'Applied rolling ball subtraction with radius {args.rb_radius}.')
+
+        # Save the processed image
+        output_path = args.output if args.output is not None else args.input.replace('.tif', f'_rb{args.rb_radius}.tif')
+        save_tif(img, output_path)
+    else:
+        # Lazily load the 3D image (z-slabs are read as they are processed)
+        img, xy_res, z_res = load_3D_img(args.input, args.channel, "zyx", return_res=True, verbose=args.verbose, lazy=True)
+        output_path = args.output if args.output is not None else str(Path(args.input).parent / f'{get_stem(args.input)}_rb{args.rb_radius}.nii.gz')
+
+        # Stream the rolling ball subtraction to a temporary memmap
+        tmp_path = Path(output_path).parent / f'.{Path(output_path).name}_rb_tmp.npy'
+        rb_img = rolling_ball_subtraction_chunked(img, args.rb_radius, out=tmp_path, axis=0, ball=args.mode, downsample=args.downsample, workers=args.workers)
+        print(f'Applied rolling ball subtraction with radius {args.rb_radius}.')
+
+        save_3D_img(rb_img.transpose(2, 1, 0), output_path, 'xyz', xy_res, z_res, data_type=rb_img.dtype)
+        del rb_img
+        tmp_path.unlink()
 
     verbose_end_msg()
 
@@ -62,6 +62,7 @@ def parse_args():
     resample_group.add_argument('-sc', '--scale', help='Scaling factor (e.g., 0.5 or 2 or 0.5 1 1)', default=None, nargs='+', type=float, action=SM)
     resample_group.add_argument('-r', '--reference', help='Use reference image to set resampling parameters and .nii.gz metadata.', default=None, action=SM)
     resample_group.add_argument('-zo', '--zoom_order', help='SciPy zoom order. Default: 0 (nearest-neighbor). Use 1 for linear interpolation.', default=0, type=int, action=SM)
+    resample_group.add_argument('-m', '--method', help='zoom (spline interpolation) or area (block means + residual zoom for downsampling intensity images). Default: zoom', default='zoom', choices=['zoom', 'area'], action=SM)
 
     save_group = parser.add_argument_group('Optional arguments for saving')
     save_group.add_argument('-s', '--save_as', help='Output format extension (nii.gz, .zarr, .tif, or .h5). Default: .nii.gz', default='.nii.gz', choices=['.nii.gz', '.tif', '.zarr', '.h5'], action=SM)
@@ -97,9 +98,9 @@ def main():
 
     if args.reference:
         if str(args.reference).endswith('.nii.gz') or str(args.reference).endswith('.czi'):
-            ref_img, target_res_xy, target_res_z = load_3D_img(args.reference, channel=args.channel, return_res=True, verbose=args.verbose)
+            ref_img, target_res_xy, target_res_z = load_3D_img(args.reference, channel=args.channel, return_res=True, verbose=args.verbose, lazy=True)
         else:
-            ref_img = load_3D_img(args.reference, channel=args.channel, verbose=args.verbose)
+            ref_img = load_3D_img(args.reference, channel=args.channel, verbose=args.verbose, lazy=True)
         target_dims = ref_img.shape   
 
         if ref_img.ndim != 3:
@@ -115,12 +116,12 @@ def main():
         else:
             out_path = image_path.with_name(filename)
 
-        # Load image and resolution
+        # Lazily load image and resolution (blocks are read as they are resampled)
         xy_res, z_res = args.xy_res, args.z_res
         if xy_res is None or z_res is None:
-            img, xy_res, z_res = load_3D_img(image_path, args.channel, return_res=True, verbose=args.verbose)
+            img, xy_res, z_res = load_3D_img(image_path, args.channel, return_res=True, verbose=args.verbose, lazy=True)
         else:
-            img = load_3D_img(image_path, args.channel, verbose=args.verbose)
+            img = load_3D_img(image_path, args.channel, verbose=args.verbose, lazy=True)
 
         # Resample
         img_resampled = resample(
@@ -131,6 +132,7 @@ def main():
             target_dims=target_dims,
             scale=scale,
             zoom_order=args.zoom_order,
+            method=args.method,
         )
 
         # Determine output resolution for saving
@@ -47,6 +47,7 @@ from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 
 from unravel.core.config import Configuration
 from unravel.core.img_io import load_3D_img, load_image_metadata_from_txt
+from unravel.core.img_tools import label_stats
 from unravel.core.utils import get_pad_percent, log_command, verbose_start_msg, verbose_end_msg, print_func_name_args_times, initialize_progress_bar, get_samples
 from unravel.warp.to_native import to_native
 
@@ -212,14 +213,12 @@ def calculate_regional_volumes(sample_path, atlas, region_ids, xy_res, z_res, co
     # Calculate the voxel volume in cubic millimeters
     voxel_volume = (xy_res * xy_res * z_res) / 1000**3
 
-    # Use bincount to get counts for all intensities
-    voxel_counts = np.bincount(atlas.flatten())
-
-    # Ensure that region_ids are within the range of voxel_counts length
-    region_ids = [rid for rid in region_ids if rid < len(voxel_counts)]
+    # Get voxel counts for all labels in one pass (parallel over z-slabs)
+    stats = label_stats(atlas)
+    voxel_counts = dict(zip(stats['label'].tolist(), stats['count'].tolist()))
 
     # Map the counts to Region_IDs and calculate volumes
-    regional_volumes = {region_id: voxel_counts[region_id] * voxel_volume for region_id in region_ids}
+    regional_volumes = {region_id: voxel_counts.get(region_id, 0) * voxel_volume for region_id in region_ids}
 
     # Merge the regional volumes into the region information dataframe
     sample_name = sample_path.name
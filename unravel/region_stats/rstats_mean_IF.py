@@ -20,7 +20,6 @@ Usage:
 """
 
 import csv
-import nibabel as nib
 import numpy as np
 from pathlib import Path 
 import pandas as pd
@@ -28,8 +27,8 @@ from rich.traceback import install
 
 from unravel.core.config import Configuration
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
-from unravel.core.img_io import load_3D_img
-from unravel.core.img_tools import label_IDs
+from unravel.core.img_io import nii_to_ndarray
+from unravel.core.img_tools import label_IDs, label_stats
 from unravel.core.utils import log_command, match_files, verbose_start_msg, verbose_end_msg
 from unravel.voxel_stats.apply_mask import load_mask
 
@@ -57,23 +56,12 @@ def calculate_mean_intensity(atlas, image, regions=None, verbose=False):
     if verbose:
         print("\n    Calculating mean immunofluorescence intensity for each region in the atlas...\n")
 
-    # Filter out background
-    valid_mask = atlas > 0
-    valid_atlas = atlas[valid_mask].astype(int)  # Convert to int for bincount
-    valid_image = image[valid_mask]
+    # Sum intensities and count voxels for each region in one pass (background is ignored)
+    stats = label_stats(atlas, intensity=image)
 
-    # Use bincount to sum intensities for each cluster and count voxels
-    sums = np.bincount(valid_atlas, weights=valid_image)
-    counts = np.bincount(valid_atlas)
-
-    # Suppress the runtime warning and handle potential division by zero
-    with np.errstate(divide='ignore', invalid='ignore'):
-        mean_intensities = sums / counts
-
-    mean_intensities = np.nan_to_num(mean_intensities)
-
-    # Convert to dictionary (ignore background)
-    mean_intensities_dict = {i: mean_intensities[i] for i in range(1, len(mean_intensities))}
+    # Convert to dictionary (regions up to the max label that are absent have a mean of 0)
+    mean_intensities_dict = dict.fromkeys(range(1, int(stats['label'].max()) + 1 if len(stats) else 1), 0.0)
+    mean_intensities_dict.update(zip(stats['label'].tolist(), stats['mean'].tolist()))
 
     # Filter the dictionary if `regions` is provided and not empty
     if regions is not None:
@@ -106,18 +94,17 @@ def main():
     Configuration.verbose = args.verbose
     verbose_start_msg()
 
+    # Load the atlas once with its stored label IDs (on-disk integer dtype, no float copy)
+    atlas_img = nii_to_ndarray(args.atlas, scaling='raw')
+
     # Either use the provided list of region IDs or create it using unique intensities
     if args.regions:
         region_intensities = args.regions
     else:
         print(f'\nProcessing these region IDs from {args.atlas}')
-        atlas_img = load_3D_img(args.atlas, verbose=args.verbose)
         region_intensities = label_IDs(atlas_img, min_voxel_count=1, print_IDs=True, print_sizes=False)
         print()
 
-    atlas_nii = nib.load(args.atlas)
-    atlas_img = atlas_nii.get_fdata(dtype=np.float32)
-
     # Apply mask(s) if provided
     if args.masks is not None:
         mask_imgs = [load_mask(path) for path in args.masks] if args.masks else []
@@ -131,8 +118,7 @@ def main():
     for file in files:
         if str(file).endswith('.nii.gz'):
             
-            nii = nib.load(file)
-            img = nii.get_fdata(dtype=np.float32)
+            img = nii_to_ndarray(file, dtype=np.float32)
 
             # Calculate mean intensity
             mean_intensities = calculate_mean_intensity(atlas_img, img, region_intensities, args.verbose)
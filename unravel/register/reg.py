@@ -56,11 +56,12 @@ from rich.live import Live
 from rich.traceback import install
 from scipy.ndimage import gaussian_filter
 
-from unravel.image_io.reorient_nii import reorient_nii
+from unravel.image_io.reorient_nii import reorient_nii_header
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 from unravel.core.config import Configuration
 from unravel.core.img_io import resolve_path
-from unravel.core.img_tools import pad
+from unravel.core.img_tools import pad, pad_widths, save_padded_nii
+from unravel.core.metadata_index import cache_padding, find_index_path, update_index
 from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg, print_func_name_args_times, initialize_progress_bar, get_samples
 from unravel.register.affine_initializer_check import affine_initializer_check
 from unravel.warp.warp import warp
@@ -174,32 +175,37 @@ def main():
                         elif args.mask == "None": 
                             fixed_img = bias_correction(str(fixed_img_nii_path), mask_path=None, shrink_factor=2, verbose=args.verbose)
                     else:
-                        fixed_img = fixed_img_nii.get_fdata(dtype=np.float32)
+                        fixed_img = fixed_img_nii.dataobj  # Read slab by slab while padding (unless smoothing)
 
-                    # Pad the fixed image with 25% of voxels on all sides (keeps moving img in frame during initial alignment, avoiding edge effects)
-                    print(f'\n    Adding padding to the registration input\n')
-                    fixed_img = pad(fixed_img, pad_percent=pad_percent)
                     pad_txt = reg_outputs_path / "pad_percent.txt"
                     with open(pad_txt, 'w') as f:
                         f.write(str(pad_percent))
+                    index_path = find_index_path(reg_outputs_path)
+                    if index_path is not None:
+                        update_index(index_path, pad_percent={str(reg_outputs_path.resolve()): pad_percent})
 
-                    # Optionally smooth the fixed image (e.g., when it is an autofluorescence image)
+                    # Header info for the registration input (reference image)
+                    if args.ort_code:  # Set the orientation of the image (use if not already set correctly in the header; check with ``io_nii_info``)
+                        fixed_affine, fixed_header = reorient_nii_header(fixed_img_nii, args.ort_code, zero_origin=True, form_code=1)
+                    else:
+                        fixed_affine, fixed_header = fixed_img_nii.affine.copy(), fixed_img_nii.header
+
+                    # Pad the fixed image with 25% of voxels on all sides (keeps moving img in frame during initial alignment, avoiding edge effects)
+                    print(f'\n    Adding padding to the registration input\n')
                     if args.smooth > 0:
+                        # Optionally smooth the fixed image (e.g., when it is an autofluorescence image). Smoothing extends into the padding, so the padded image is made in memory
                         print(f'\n    Smoothing the registration input\n')
+                        fixed_img = pad(np.asarray(fixed_img, dtype=np.float32), pad_percent=pad_percent)
                         fixed_img = gaussian_filter(fixed_img, sigma=args.smooth)
-
-                    # Create NIfTI, set header info, and save the registration input (reference image) 
-                    print(f'\n    Setting header info for the registration input\n')
-                    fixed_img = fixed_img.astype(np.float32) # Convert the fixed image to FLOAT32 for ANTsPy
-                    reg_inputs_fixed_img_nii = nib.Nifti1Image(fixed_img, fixed_img_nii.affine.copy(), fixed_img_nii.header)
-                    reg_inputs_fixed_img_nii.set_data_dtype(np.float32)
-
-                    # Set the orientation of the image (use if not already set correctly in the header; check with ``io_nii_info``)
-                    if args.ort_code: 
-                        reg_inputs_fixed_img_nii = reorient_nii(reg_inputs_fixed_img_nii, args.ort_code, zero_origin=True, apply=False, form_code=1)
-
-                    # Save the fixed input for registration
-                    nib.save(reg_inputs_fixed_img_nii, fixed_img_for_reg_path)
+                        reg_inputs_fixed_img_nii = nib.Nifti1Image(fixed_img, fixed_affine, fixed_header)
+                        reg_inputs_fixed_img_nii.set_data_dtype(np.float32)
+                        nib.save(reg_inputs_fixed_img_nii, fixed_img_for_reg_path)
+                        if index_path is not None:
+                            unpadded_shape = fixed_img_nii.shape[:3]
+                            cache_padding(index_path, fixed_img_for_reg_path, pad_widths(unpadded_shape, pad_percent), unpadded_shape)
+                    else:
+                        # Save the fixed input for registration (cast to FLOAT32 for ANTsPy) without a padded copy in memory
+                        save_padded_nii(fixed_img, fixed_img_for_reg_path, pad_percent=pad_percent, affine=fixed_affine, header=fixed_header, dtype=np.float32)
 
                 # Generate the initial transform matrix for aligning the moving image to the fixed image
                 init_tform_mat_path = Path(reg_outputs_path, f"ANTsPy_init_tform.mat")
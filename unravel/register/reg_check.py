@@ -15,6 +15,7 @@ Usage:
     reg_check [-td <path/target_output_dir>] [-ro reg_outputs] [-fri fixed_reg_in] [-wa warped_atlas] [-og] [-af autofl_img] [-pad pad_percent] [-d list of paths] [-p sample??] [-v]
 """
 
+import nibabel as nib
 from pathlib import Path
 from rich import print
 from rich.live import Live
@@ -23,8 +24,7 @@ from rich.traceback import install
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 
 from unravel.core.config import Configuration 
-from unravel.core.img_io import load_nii, save_as_nii
-from unravel.core.img_tools import pad
+from unravel.core.img_tools import save_padded_nii
 from unravel.core.utils import get_pad_percent, log_command, verbose_start_msg, verbose_end_msg, initialize_progress_bar, get_samples, copy_files
 
 
@@ -81,12 +81,9 @@ def main():
                     autofl_path = sample_path / args.autofl_img
                     pad_percent = get_pad_percent(sample_path / args.reg_outputs, args.pad_percent)
 
-                    autofl_img = load_nii(autofl_path)
-                    autofl_img_pad = pad(autofl_img, pad_percent=pad_percent)
-
-                    # Save the padded autofluo image
-                    ref_nii = sample_path / args.reg_outputs / args.fixed_reg_in
-                    save_as_nii(autofl_img_pad, autofl_nii_pad_path, reference=ref_nii)
+                    # Save the padded autofluo image (written slab by slab from the unpadded image)
+                    ref_nii = nib.load(sample_path / args.reg_outputs / args.fixed_reg_in)
+                    save_padded_nii(nib.load(autofl_path).dataobj, autofl_nii_pad_path, pad_percent=pad_percent, affine=ref_nii.affine, header=ref_nii.header, dtype=ref_nii.header.get_data_dtype())
 
                 # Copy the padded autofluo image to the target directory
                 copy_files(source_path, target_dir, autofl_nii_pad_path.name, sample_path, args.verbose)
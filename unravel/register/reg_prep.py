@@ -4,7 +4,7 @@
 Use ``reg_prep`` (``rp``) from UNRAVEL to load a full resolution autofluo image and resamples to a lower resolution for registration.
 
 Input examples (path is relative to ./sample??; 1st glob match processed): 
-    `*`.czi, autofluo/`*`.tif series, autofluo, `*`.tif, or `*`.h5 
+    `*`.czi, autofluo/`*`.tif series, autofluo, `*`.tif, `*`.h5, `*`.ims, or `*`.zarr 
 
 Outputs: 
     ./sample??/reg_inputs/autofl_`*`um.nii.gz
@@ -15,13 +15,17 @@ Note:
     - If the current dir is a sample?? dir, it will be processed.
     - If -d is provided, the specified dirs and/or dirs containing sample?? dirs will be processed.
     - If -p is not provided, the default pattern for dirs to process is 'sample??'.
+    - By default (-m zoom), the image is resampled with spline interpolation (-zo), matching the resampling in ``vstats_prep``, ``warp_to_atlas``, and ``vstats_apply_mask``.
+    - With -m area, the image is downsampled by averaging blocks of voxels (e.g., 14 x 14 x 8 for 3.5 x 3.5 x 6 um -> 50 um) and a small residual zoom (-zo).
+      The image is streamed in z-slabs, so the full res image is never in memory at once.
+    - For a multiscale .zarr (e.g., from ``save_as_zarr`` with levels > 1) or an Imaris/BigDataViewer file, the coarsest level with a resolution <= --reg_res is loaded.
 
 Next command: 
     ``seg_copy_tifs`` for ``seg_brain_mask`` or ``reg``
 
 Usage:
 ------
-    reg_prep -i `*`.czi [-md path/metadata.txt] [For .czi: --channel 0] [-o reg_inputs/autofl_50um.nii.gz] [--reg_res 50] [--zoom_order 0] [--miracl] [-d list of paths] [-p sample??] [-v]
+    reg_prep -i `*`.czi [-md path/metadata.txt] [For .czi: --channel 0] [-o reg_inputs/autofl_50um.nii.gz] [--reg_res 50] [--zoom_order 0] [-m area] [--miracl] [-d list of paths] [-p sample??] [-v]
 """
 
 import numpy as np
@@ -32,7 +36,7 @@ from rich.traceback import install
 
 from unravel.core.config import Configuration
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
-from unravel.core.img_io import load_3D_img, load_image_metadata_from_txt, resolve_path, save_as_tifs, save_as_nii
+from unravel.core.img_io import load_3D_img, load_image_metadata_from_txt, resolve_path, save_as_tifs, save_as_nii, h5_levels, zarr_levels
 from unravel.core.img_tools import resample, reorient_axes
 from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg, initialize_progress_bar, get_samples, print_func_name_args_times
 
@@ -49,6 +53,7 @@ def parse_args():
     opts.add_argument('-o', '--output', help='Output path. Default: reg_inputs/autofl_50um.nii.gz', default="reg_inputs/autofl_50um.nii.gz", action=SM)
     opts.add_argument('-r', '--reg_res', help='Resample input to this res in um for reg. Default: 50', default=50, type=int, action=SM)
     opts.add_argument('-zo', '--zoom_order', help='Order for resampling (scipy.ndimage.zoom). Default: 1', default=1, type=int, action=SM)
+    opts.add_argument('-m', '--method', help='Resampling method: area (integer-factor block means streamed in z-slabs + a small residual zoom) or zoom (spline interpolation). Default: zoom', default='zoom', choices=['area', 'zoom'], action=SM)
 
     compatability = parser.add_argument_group('Compatability options')
     compatability.add_argument('-mi', '--miracl', help="Include reorientation step to mimic MIRACL's tif to .nii.gz conversion. Default: False", action='store_true', default=False)
@@ -61,23 +66,59 @@ def parse_args():
     return parser.parse_args()
 
 
+def select_pyramid_level(img_path, xy_res, z_res, reg_res, channel=0):
+    """Select the coarsest level of a multiscale .zarr or .h5/.ims that is not coarser than reg_res.
+    
+    Args:
+        - img_path (Path): path/image.zarr, path/image.h5, or path/image.ims.
+        - xy_res (float): x/y resolution in microns of level 0 (full res).
+        - z_res (float): z resolution in microns of level 0.
+        - reg_res (int): Target resolution in microns for ``reg``.
+        - channel (int): Channel (Imaris) or setup (BigDataViewer) index for .h5/.ims files.
+        
+    Returns:
+        - level (str or None): Level to load (None if the image lacks resolution levels).
+        - xy_res (float): x/y resolution in microns of the level.
+        - z_res (float): z resolution in microns of the level."""
+    if str(img_path).endswith('.zarr'):
+        levels = zarr_levels(img_path)
+    elif str(img_path).endswith('.h5') or str(img_path).endswith('.ims'):
+        levels = h5_levels(img_path, channel)
+    else:
+        levels = []
+    if len(levels) < 2 or any(scale is None for _, _, scale in levels):
+        return None, xy_res, z_res
+
+    # Resolutions of each level relative to level 0 (scales end with z, y, x)
+    level0_scale = levels[0][2]
+    selected = (None, xy_res, z_res)
+    for path, _, scale in levels:
+        level_xy_res = xy_res * scale[-1] / level0_scale[-1]
+        level_z_res = z_res * scale[-3] / level0_scale[-3]
+        if level_xy_res <= reg_res and level_z_res <= reg_res:
+            selected = (path, level_xy_res, level_z_res)
+    return selected
+
+
 @print_func_name_args_times()
-def reg_prep(ndarray, xy_res, z_res, reg_res, zoom_order, miracl):
+def reg_prep(ndarray, xy_res, z_res, reg_res, zoom_order, miracl, target_dims=None, method='zoom'):
     """Prepare the autofluo image for ``reg`` or mimic preprocessing  for ``vstats_prep``.
     
     Args:
-        - ndarray (np.ndarray): full res 3D autofluo image.
+        - ndarray (np.ndarray): full res 3D autofluo image (or an out-of-core array, e.g., a dask array from load_3D_img(..., lazy=True)).
         - xy_res (float): x/y resolution in microns of ndarray.
         - z_res (float): z resolution in microns of ndarray.
         - reg_res (int): Resample input to this resolution in microns for ``reg``.
         - zoom_order (int): Order for resampling (scipy.ndimage.zoom).
         - miracl (bool): Include reorientation step to mimic MIRACL's tif to .nii.gz conversion.
+        - target_dims (tuple): Output dimensions (x, y, z). Used when ndarray is a lower resolution level so that the output matches resampling the full res image. Default: None.
+        - method (str): 'zoom' (spline interpolation) or 'area' (integer-factor block means + residual zoom, streamed in z-slabs). Default: 'zoom'.
         
     Returns:
         - img_resampled (np.ndarray): Resampled image."""
 
     # Resample autofluo image (for registration)
-    img_resampled = resample(ndarray, xy_res, z_res, reg_res, zoom_order=zoom_order)
+    img_resampled = resample(ndarray, xy_res, z_res, reg_res, target_dims=target_dims, zoom_order=zoom_order, method=method)
 
     # Optionally reorient autofluo image (mimics MIRACL's tif to .nii.gz conversion)
     if miracl: 
@@ -110,16 +151,20 @@ def main():
 
             # Load resolutions from metadata
             metadata_path = sample_path / args.metadata
-            xy_res, z_res, _, _, _ = load_image_metadata_from_txt(metadata_path)
+            xy_res, z_res, x_dim, y_dim, z_dim = load_image_metadata_from_txt(metadata_path)
             if xy_res is None:
                 print("    [red1]./sample??/parameters/metadata.txt is missing. Generate w/ io_metadata")
                 import sys ; sys.exit()
 
-            # Load full res autofluo image
-            img = load_3D_img(img_path, args.channel, verbose=args.verbose)
+            # Lazily load the full res autofluo image (or the coarsest sufficient level of a multiscale .zarr/.h5/.ims). Blocks are read as they are resampled
+            level, level_xy_res, level_z_res = select_pyramid_level(img_path, xy_res, z_res, args.reg_res, args.channel)
+            img = load_3D_img(img_path, args.channel, verbose=args.verbose, level=level, lazy=True)
 
-            # Prepare the autofluo image for registration
-            img_resampled = reg_prep(img, xy_res, z_res, args.reg_res, args.zoom_order, args.miracl)
+            # Prepare the autofluo image for registration (dims match resampling the full res image, as expected by ``warp_to_native``)
+            target_dims = None
+            if level is not None and x_dim is not None:
+                target_dims = [round(dim * res / args.reg_res) for dim, res in zip((x_dim, y_dim, z_dim), (xy_res, xy_res, z_res))]
+            img_resampled = reg_prep(img, level_xy_res, level_z_res, args.reg_res, args.zoom_order, args.miracl, target_dims=target_dims, method=args.method)
 
             # Save the prepped autofluo image as tif series (for ``seg_brain_mask``)
             tif_dir = Path(str(output).replace('.nii.gz', '_tifs'))
@@ -12,14 +12,22 @@ Input examples (path is relative to ./sample??; 1st glob match processed):
 Output example:
     - ./sample??/atlas_space/sample??_cfos_rb4_30um_CCF_space.nii.gz
 
+Note:
+    - Rolling ball subtraction streams slabs of the full res image through a process pool (-th workers) into a temporary .npy memmap in ./sample??/atlas_space (deleted afterwards), so memory use is bounded.
+    - -rbm 2D uses a disk in each yz plane (-rbp yz; as in earlier versions, so outputs match) or in each xy plane (-rbp xy; as ``img_rb`` for 2D TIFFs). -rbm 3D uses a ball (in voxels).
+    - With -rbp yz, the lazily loaded image is first copied in z-slabs to a temporary .npy memmap, so that slabs along x can be read without reloading every z-plane.
+    - With -sa, the full res image is loaded into memory for spatial averaging (only the path without -sa has bounded memory use).
+    - -rbd (e.g., 4 for -rb 40) approximates the opening on a downsampled image, which is much faster for large radii.
+
 Next commands for voxel-wise stats: 
     Preprocess atlas space IF images with ``vstats_z_score`` (recommended for c-Fos-IF) or aggregate them with ``utils_agg_files``.
 
 Usage:
 ------
-    vstats_prep -i `*`.czi -o cfos_rb4_30um_CCF_space.nii.gz [-sa 3] [-rb 4] [--channel 1] [--reg_res 50] [-fri reg_outputs/autofl_50um_masked_fixed_reg_input.nii.gz] [-a atlas/atlas_CCFv3_2020_30um.nii.gz] [-dt uint16] [-zo 1] [-inp bSpline] [-md parameters/metadata.txt] [--threads 8] [-mi] [-d list of paths] [-p sample??] [-v]
+    vstats_prep -i `*`.czi -o cfos_rb4_30um_CCF_space.nii.gz [-sa 3] [-rb 4] [-rbm 2D] [-rbp yz] [-rbd 1] [--channel 1] [--reg_res 50] [-fri reg_outputs/autofl_50um_masked_fixed_reg_input.nii.gz] [-a atlas/atlas_CCFv3_2020_30um.nii.gz] [-dt uint16] [-zo 1] [-inp bSpline] [-md parameters/metadata.txt] [--threads 8] [-mi] [-d list of paths] [-p sample??] [-v]
 """
 
+import dask.array as da
 import shutil
 from pathlib import Path
 from rich import print
@@ -31,7 +39,7 @@ from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 
 from unravel.core.config import Configuration
 from unravel.core.img_io import load_3D_img, load_image_metadata_from_txt
-from unravel.core.img_tools import rolling_ball_subtraction_opencv_parallel
+from unravel.core.img_tools import open_output_array, rolling_ball_subtraction_chunked
 from unravel.core.utils import get_pad_percent, log_command, verbose_start_msg, verbose_end_msg, initialize_progress_bar, get_samples
 from unravel.register.reg_prep import reg_prep
 from unravel.warp.to_atlas import to_atlas
@@ -48,6 +56,9 @@ def parse_args():
     opts.add_argument('-a', '--atlas', help='path/atlas.nii.gz (e.g., atlas/atlas_CCFv3_2020_30um.nii.gz)', default='atlas/atlas_CCFv3_2020_30um.nii.gz', action=SM)
     opts.add_argument('-sa', '--spatial_avg', help='Spatial averaging in 2D or 3D (2 or 3). Default: None', default=None, type=int, action=SM)
     opts.add_argument('-rb', '--rb_radius', help='Radius of rolling ball in pixels (Default: None)', default=None, type=int, action=SM)
+    opts.add_argument('-rbm', '--rb_mode', help='Rolling ball shape: 2D (disk in xy planes) or 3D (ball). Default: 2D', default='2D', choices=['2D', '3D'], action=SM)
+    opts.add_argument('-rbp', '--rb_plane', help='Planes for the 2D rolling ball: yz (as in earlier versions) or xy. Default: yz', default='yz', choices=['yz', 'xy'], action=SM)
+    opts.add_argument('-rbd', '--rb_downsample', help='Downsampling factor for approximate rolling ball subtraction (faster for large radii). Default: 1 (exact)', default=1, type=int, action=SM)
     opts.add_argument('-c', '--channel', help='.czi channel index. Default: 1', default=1, type=int, action=SM)
     opts.add_argument('-r', '--reg_res', help='Resolution of registration inputs in microns. Default: 50', default='50',type=int, action=SM)
     opts.add_argument('-fri', '--fixed_reg_in', help='Reference nii header from ``reg``. Default: reg_outputs/autofl_50um_masked_fixed_reg_input.nii.gz', default="reg_outputs/autofl_50um_masked_fixed_reg_input.nii.gz", action=SM)
@@ -55,7 +66,7 @@ def parse_args():
     opts.add_argument('-zo', '--zoom_order', help='SciPy zoom order for resampling the raw image. Default: 1', default=1, type=int, action=SM)
     opts.add_argument('-inp', '--interpol', help='Type of interpolation (linear, bSpline \[default]).', default='bSpline', action=SM)
     opts.add_argument('-md', '--metadata', help='path/metadata.txt. Default: parameters/metadata.txt', default="parameters/metadata.txt", action=SM)
-    opts.add_argument('-th', '--threads', help='Number of threads for rolling ball subtraction. Default: 8', default=8, type=int, action=SM)
+    opts.add_argument('-th', '--threads', help='Number of worker processes for rolling ball subtraction. Default: 8', default=8, type=int, action=SM)
     opts.add_argument('-pad', '--pad_percent', help='Padding percentage from ``reg``. Default: from parameters/pad_percent.txt or 0.25.', type=float, action=SM)
 
     compatability = parser.add_argument_group('Compatability options')
@@ -103,20 +114,47 @@ def main():
                 print("    [red1]./sample??/parameters/metadata.txt is missing. Generate w/ io_metadata")
                 import sys ; sys.exit()
 
-            img = load_3D_img(img_path, args.channel, "xyz", verbose=args.verbose)
-
-            # Apply spatial averaging
-            if args.spatial_avg == 3:
-                img = spatial_average_3D(img, kernel_size=3)
-            elif args.spatial_avg == 2:
-                img = spatial_average_2D(img, apply_2D_mean_filter, kernel_size=(3, 3))
-
-            # Rolling ball background subtraction
-            if args.rb_radius is not None:
-                img = rolling_ball_subtraction_opencv_parallel(img, radius=args.rb_radius, threads=args.threads)  
+            rb_tmp_path = None
+            yz_planes = args.rb_mode == '2D' and args.rb_plane == 'yz'
+            if args.spatial_avg is None:
+                # Lazily load the full res image (blocks are read as they are processed)
+                img = load_3D_img(img_path, args.channel, "zyx", verbose=args.verbose, lazy=True)
+
+                # Rolling ball background subtraction (slabs are streamed to a temporary memmap)
+                if args.rb_radius is not None:
+                    tmp_stem = output.parent / f".{output_name.replace('.nii.gz', '')}"
+                    rb_tmp_path = Path(f"{tmp_stem}_rb_tmp.npy")
+                    if yz_planes:  # Stage the image in a memmap (z-slabs), then stream x-slabs (yz planes) from it
+                        zyx_tmp_path = Path(f"{tmp_stem}_zyx_tmp.npy")
+                        zyx = open_output_array(zyx_tmp_path, img.shape, img.dtype)
+                        da.store(img, zyx, lock=False)
+                        img = rolling_ball_subtraction_chunked(zyx.transpose(2, 1, 0), args.rb_radius, out=rb_tmp_path, axis=0, ball='2D', downsample=args.rb_downsample, workers=args.threads)
+                        del zyx
+                        zyx_tmp_path.unlink()
+                    else:
+                        img = rolling_ball_subtraction_chunked(img, args.rb_radius, out=rb_tmp_path, axis=0, ball=args.rb_mode, downsample=args.rb_downsample, workers=args.threads)
+                        img = img.transpose(2, 1, 0)  # xyz view
+                else:
+                    img = img.transpose(2, 1, 0)  # xyz view
+            else:
+                img = load_3D_img(img_path, args.channel, "xyz", verbose=args.verbose)
+
+                # Apply spatial averaging
+                if args.spatial_avg == 3:
+                    img = spatial_average_3D(img, kernel_size=3)
+                elif args.spatial_avg == 2:
+                    img = spatial_average_2D(img, apply_2D_mean_filter, kernel_size=(3, 3))
+
+                # Rolling ball background subtraction
+                if args.rb_radius is not None and yz_planes:
+                    img = rolling_ball_subtraction_chunked(img, args.rb_radius, axis=0, ball='2D', downsample=args.rb_downsample, workers=args.threads)
+                elif args.rb_radius is not None:
+                    img = rolling_ball_subtraction_chunked(img.transpose(2, 1, 0), args.rb_radius, axis=0, ball=args.rb_mode, downsample=args.rb_downsample, workers=args.threads).transpose(2, 1, 0)
 
             # Resample the rb_img to the resolution of registration (and optionally reorient for compatibility with MIRACL)
             img = reg_prep(img, xy_res, z_res, args.reg_res, args.zoom_order, args.miracl)
+            if rb_tmp_path is not None:
+                rb_tmp_path.unlink()
 
             # Warp the image to atlas space
             fixed_reg_input = Path(sample_path, args.fixed_reg_in)    
@@ -50,7 +50,7 @@ from rich.traceback import install
 
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 from unravel.core.config import Configuration
-from unravel.core.img_io import load_3D_img
+from unravel.core.img_io import load_3D_img, nii_to_ndarray
 from unravel.core.utils import get_pad_percent, log_command, match_files, verbose_start_msg, verbose_end_msg, get_samples, initialize_progress_bar, print_func_name_args_times
 from unravel.warp.to_atlas import to_atlas
 
@@ -102,19 +102,23 @@ def z_score(input_nii_path, mask_img, suffix):
         raise FileNotFoundError(f"\n    [red1]Input image not found: {input_nii_path}\n")
 
     nii = nib.load(input_nii_path)
-    img = np.asanyarray(nii.dataobj, dtype=np.float32).squeeze()
+    img = nii_to_ndarray(nii, dtype=np.float32)  # Decoded straight into float32
 
     # Zero out voxels outside the mask
-    masked_data = img * mask_img
+    masked_data = img
+    masked_data *= mask_img
 
-    # Calculate mean and standard deviation for masked data
+    # Calculate mean and standard deviation for masked data (accumulated in float64)
     masked_nonzero = masked_data[masked_data != 0]  # Exclude zero voxels
 
-    mean_intensity = masked_nonzero.mean()
-    std_dev = masked_nonzero.std()
+    mean_intensity = masked_nonzero.mean(dtype=np.float64)
+    std_dev = masked_nonzero.std(dtype=np.float64)
+    del masked_nonzero
 
-    # Z-score calculation
-    z_scored_img = (masked_data - mean_intensity) / std_dev
+    # Z-score calculation (in place)
+    z_scored_img = masked_data
+    z_scored_img -= np.float32(mean_intensity)
+    z_scored_img /= np.float32(std_dev)
 
     # Set voxels outside the mask to zero
     z_scored_img *= mask_img
@@ -189,8 +193,7 @@ def z_score_mask(sample_path, input_path, fixed_reg_input, atlas_path, tissue_ma
     # If no mask was provided, initialize the mask to include all voxels
     if mask_img is None:
         nii = nib.load(input_path)
-        img = np.asanyarray(nii.dataobj, dtype=np.float32).squeeze()
-        mask_img = np.ones_like(img)  # No mask applied, use all voxels
+        mask_img = np.ones(nii.shape[:3], dtype=np.uint8)  # No mask applied, use all voxels (only the header is read)
 
     return mask_img
 
@@ -24,8 +24,8 @@ from rich.traceback import install
 from unravel.image_io.io_nii import convert_dtype
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 from unravel.core.config import Configuration
-from unravel.core.img_io import load_3D_img, load_image_metadata_from_txt
-from unravel.core.img_tools import pad
+from unravel.core.img_io import load_3D_img, load_image_metadata_from_txt, nii_to_ndarray
+from unravel.core.img_tools import save_padded_nii
 from unravel.core.utils import get_pad_percent, log_command, verbose_start_msg, verbose_end_msg, print_func_name_args_times, initialize_progress_bar, get_samples
 from unravel.register.reg_prep import reg_prep
 from unravel.warp.warp import warp
@@ -84,21 +84,15 @@ def to_atlas(sample_path, img, fixed_reg_in, atlas, output, interpol, dtype='uin
         - output (str): Path to the output.
         - interpol (str): Type of interpolation (linear, bSpline, nearestNeighbor, multiLabel).
         - dtype (str): Desired dtype for output (e.g., uint8, uint16). Default: uint16"""
-    # Pad the image
-    img = pad(img, pad_percent=pad_percent)
-
-    # Create NIfTI, set header info, and save the input for warp()
+    # Set header info and save the padded input for warp() (cast to FLOAT32 for ANTsPy while padding, without a padded copy in memory)
     fixed_reg_input = sample_path / fixed_reg_in
     reg_outputs_path = fixed_reg_input.parent
     warp_inputs_dir = reg_outputs_path / "warp_inputs"
     warp_inputs_dir.mkdir(exist_ok=True, parents=True)
     warp_input_path = str(warp_inputs_dir / Path(output).name)
     print(f'\n    Setting header info and saving the input for warp() here: {warp_input_path}\n')
-    img = img.astype(np.float32) # Convert the fixed image to FLOAT32 for ANTsPy
     fixed_reg_input_nii = nib.load(fixed_reg_input)
-    img_nii = nib.Nifti1Image(img, fixed_reg_input_nii.affine.copy(), fixed_reg_input_nii.header)
-    img_nii.set_data_dtype(np.float32) 
-    nib.save(img_nii, warp_input_path)
+    save_padded_nii(img, warp_input_path, pad_percent=pad_percent, affine=fixed_reg_input_nii.affine.copy(), header=fixed_reg_input_nii.header, dtype=np.float32)
 
     # Warp the image to atlas space
     print(f'\n    Warping image to atlas space\n')
@@ -107,7 +101,7 @@ def to_atlas(sample_path, img, fixed_reg_in, atlas, output, interpol, dtype='uin
     # Optionally lower the dtype of the output if the desired dtype is not float32
     if dtype.lower() != 'float32':
         output_nii = nib.load(output)
-        output_img = output_nii.get_fdata(dtype=np.float32)
+        output_img = nii_to_ndarray(output_nii, dtype=np.float32)
         output_img = convert_dtype(output_img, dtype, scale_mode='none')
         output_nii = nib.Nifti1Image(output_img, output_nii.affine.copy(), output_nii.header)
         output_nii.header.set_data_dtype(dtype)
@@ -21,7 +21,7 @@ from rich.traceback import install
 
 from unravel.core.config import Configuration
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
-from unravel.core.img_io import save_as_nii
+from unravel.core.img_io import img_metadata, save_as_nii
 from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg, print_func_name_args_times
 from unravel.warp.warp import warp
 
@@ -76,12 +76,11 @@ def forward_warp(fixed_img_path, reg_outputs_path, fixed_reg_in, moving_img_path
 
     # Lower bit depth to match atlas space image
     warped_nii = nib.load(warped_nii_path)
-    moving_nii = nib.load(moving_img_path)
-    warped_img = np.asanyarray(warped_nii.dataobj, dtype=moving_nii.header.get_data_dtype()).squeeze()
+    moving_dtype = np.dtype(img_metadata(moving_img_path)["dtype"])
+    warped_img = np.asanyarray(warped_nii.dataobj, dtype=moving_dtype).squeeze()
 
-    # Load unpadded fixed image for determining original dimensions
-    fixed_img_nii = nib.load(fixed_img_path)
-    x_dim, y_dim, z_dim = fixed_img_nii.shape
+    # Get the original dimensions from the header of the unpadded fixed image
+    x_dim, y_dim, z_dim = img_metadata(fixed_img_path)["shape"]
     original_dimensions = np.array([x_dim, y_dim, z_dim])
 
     # Calculate resampled and padded dimensions
@@ -100,7 +99,7 @@ def forward_warp(fixed_img_path, reg_outputs_path, fixed_reg_in, moving_img_path
     # Save as .nii.gz
     Path(output).parent.mkdir(exist_ok=True, parents=True)
     fixed_img_for_reg_path = str(Path(reg_outputs_path) / fixed_reg_in)
-    save_as_nii(warped_img, output, None, None, moving_nii.header.get_data_dtype(), reference=fixed_img_for_reg_path)
+    save_as_nii(warped_img, output, None, None, moving_dtype, reference=fixed_img_for_reg_path)
 
     return warped_img
 
@@ -14,10 +14,9 @@ Python usage:
 
 Usage:
 ------
-    warp_to_native -m <path/image_to_warp_from_atlas_space.nii.gz> [-o <path/native_image.zarr>] [-fri autofl_50um_masked_fixed_reg_input.nii.gz] [-inp multiLabel] [-md parameters/metadata.txt] [-ro reg_outputs] [--reg_res 50] [-zo 0] [-mi] [-d list of paths] [-p sample??] [-v]
+    warp_to_native -m <path/image_to_warp_from_atlas_space.nii.gz> [-o <path/native_image.zarr>] [-fri autofl_50um_masked_fixed_reg_input.nii.gz] [-inp multiLabel] [-md parameters/metadata.txt] [-ro reg_outputs] [--reg_res 50] [-zo 0] [-lv 1] [-mi] [-d list of paths] [-p sample??] [-v]
 """
 
-import nibabel as nib
 import numpy as np
 from pathlib import Path
 from rich import print
@@ -28,8 +27,9 @@ from scipy.ndimage import zoom
 
 from unravel.core.config import Configuration
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
-from unravel.core.img_io import load_image_metadata_from_txt, save_as_zarr, save_as_nii
-from unravel.core.img_tools import reverse_reorient_axes
+from unravel.core.img_io import img_metadata, load_image_metadata_from_txt, read_img_header, read_nii, save_as_zarr, save_as_nii
+from unravel.core.metadata_index import find_index_path
+from unravel.core.img_tools import cached_unpadded_region, reverse_reorient_axes
 from unravel.core.utils import get_pad_percent, log_command, verbose_start_msg, verbose_end_msg, get_samples, initialize_progress_bar, print_func_name_args_times
 from unravel.warp.warp import warp
 
@@ -49,6 +49,7 @@ def parse_args():
     opts.add_argument('-ro', '--reg_outputs', help="Name of folder w/ outputs from registration. Default: reg_outputs", default="reg_outputs", action=SM)
     opts.add_argument('-r', '--reg_res', help='Resolution of registration inputs in microns. Default: 50', default='50',type=int, action=SM)
     opts.add_argument('-zo', '--zoom_order', help='SciPy zoom order for scaling to full res. Default: 0 (nearest-neighbor)', default='0',type=int, action=SM)
+    opts.add_argument('-lv', '--levels', help='Number of resolution levels for a .zarr output (pyramid for fast previews/QC). Default: 1', default=1, type=int, action=SM)
 
     compatability = parser.add_argument_group('Compatability options')
     compatability.add_argument('-mi', '--miracl', help='Mode for compatibility (accounts for tif to nii reorienting)', action='store_true', default=False)
@@ -100,8 +101,8 @@ def scale_to_full_res(ndarray, full_res_dims, zoom_order=0):
     return scaled_img
 
 @print_func_name_args_times()
-def to_native(sample_path, reg_outputs, fixed_reg_in, moving_img_path, metadata_rel_path, reg_res, miracl, zoom_order, interpol, output=None, pad_percent=0.25):
-    """Warp image from atlas space to tissue space and scale to full resolution"""
+def to_native(sample_path, reg_outputs, fixed_reg_in, moving_img_path, metadata_rel_path, reg_res, miracl, zoom_order, interpol, output=None, pad_percent=0.25, levels=1, cache_metadata=True):
+    """Warp image from atlas space to tissue space and scale to full resolution (levels: number of resolution levels for a .zarr output; cache_metadata: cache the moving image header in the sample's metadata index)"""
 
     # Warp the moving image to tissue space
     reg_outputs_path = sample_path / reg_outputs
@@ -114,9 +115,10 @@ def to_native(sample_path, reg_outputs, fixed_reg_in, moving_img_path, metadata_
         warp(reg_outputs_path, moving_img_path, fixed_img_for_reg_path, warped_nii_path, inverse=False, interpol=interpol)
 
     # Lower bit depth to match atlas space image
-    warped_nii = nib.load(warped_nii_path)
-    moving_nii = nib.load(moving_img_path)
-    warped_img = np.asanyarray(warped_nii.dataobj, dtype=moving_nii.header.get_data_dtype()).squeeze()
+    if cache_metadata:
+        moving_dtype = img_metadata(moving_img_path, index_path=find_index_path(sample_path))["dtype"]
+    else:
+        moving_dtype = read_img_header(moving_img_path)["dtype"]
 
     # Load resolutions and dimensions of full res image for scaling 
     metadata_path = sample_path / metadata_rel_path
@@ -126,21 +128,20 @@ def to_native(sample_path, reg_outputs, fixed_reg_in, moving_img_path, metadata_
         import sys ; sys.exit()
     original_dimensions = np.array([x_dim, y_dim, z_dim])
 
-    # Calculate resampled and padded dimensions
-    resampled_dims, padded_dims = calculate_resampled_padded_dimensions(original_dimensions, xy_res, z_res, reg_res, pad_percent=pad_percent, miracl=miracl)
+    # Use the padding offsets cached by ``reg`` for the fixed image (otherwise, calculate resampled and padded dimensions)
+    unpadded_region = cached_unpadded_region(reg_outputs_path / fixed_reg_in)
+    if unpadded_region is None:
+        resampled_dims, padded_dims = calculate_resampled_padded_dimensions(original_dimensions, xy_res, z_res, reg_res, pad_percent=pad_percent, miracl=miracl)
 
-    # Determine where to start cropping (combined padding size) // 2 for padding on one side
-    crop_mins = (padded_dims - resampled_dims) // 2
+        # Determine where to start cropping (combined padding size) // 2 for padding on one side
+        crop_mins = (padded_dims - resampled_dims) // 2
 
-    # Find img dims of warped image lacking padding
-    crop_sizes = resampled_dims
+        # Find img dims of warped image lacking padding
+        crop_sizes = resampled_dims
+        unpadded_region = tuple(slice(int(start), int(start + size)) for start, size in zip(crop_mins, crop_sizes))
 
-    # Perform cropping to remove padding
-    warped_img = warped_img[
-        crop_mins[0]:crop_mins[0] + crop_sizes[0],
-        crop_mins[1]:crop_mins[1] + crop_sizes[1],
-        crop_mins[2]:crop_mins[2] + crop_sizes[2]
-    ]
+    # Read only the unpadded region of the warped image (removes padding)
+    warped_img = read_nii(warped_nii_path, dtype=moving_dtype, slicer=unpadded_region)
 
     # Reorient if needed
     if miracl: 
@@ -152,7 +153,7 @@ def to_native(sample_path, reg_outputs, fixed_reg_in, moving_img_path, metadata_
     # Save as .nii.gz or .zarr
     if output is not None:
         if str(output).endswith(".zarr"):
-            save_as_zarr(native_img, output)
+            save_as_zarr(native_img, output, xy_res=xy_res, z_res=z_res, levels=levels, downsample_method='nearest' if zoom_order == 0 else 'mean')
         elif str(output).endswith(".nii.gz"):
             save_as_nii(native_img, output, xy_res, z_res, native_img.dtype)
 
@@ -178,7 +179,7 @@ def main():
                 output = None
 
             pad_percent = get_pad_percent(sample_path / args.reg_outputs, args.pad_percent)
-            to_native(sample_path, args.reg_outputs, args.fixed_reg_in, args.moving_img, args.metadata, args.reg_res, args.miracl, args.zoom_order, args.interpol, output=output, pad_percent=pad_percent)
+            to_native(sample_path, args.reg_outputs, args.fixed_reg_in, args.moving_img, args.metadata, args.reg_res, args.miracl, args.zoom_order, args.interpol, output=output, pad_percent=pad_percent, levels=args.levels)
 
             progress.update(task_id, advance=1)
 
@@ -33,6 +33,7 @@ from rich.traceback import install
 
 from unravel.core.help_formatter import RichArgumentParser, SuppressMetavar, SM
 from unravel.core.config import Configuration
+from unravel.core.img_io import img_metadata
 from unravel.core.utils import log_command, verbose_start_msg, verbose_end_msg, print_func_name_args_times
 
 
@@ -119,8 +120,7 @@ def warp(reg_outputs_path, moving_img_path, fixed_img_path, output_path, inverse
         warped_img[warped_img < 0] = 0  # Remove negative values
 
     # Convert dtype of warped image to match the moving image
-    moving_img_nii = nib.load(moving_img_path) 
-    data_type = moving_img_nii.header.get_data_dtype()
+    data_type = np.dtype(img_metadata(moving_img_path)["dtype"])
     warped_img = warped_img.astype(data_type)
 
     # Save the transformed image with appropriate header and affine information